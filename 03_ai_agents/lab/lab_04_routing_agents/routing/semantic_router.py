@@ -4,6 +4,7 @@ user queries to the most relevant tools.
 """
 
 import logging
+from typing import Callable
 import numpy as np
 from litellm import embedding
 from tools.registry import registry, Tool
@@ -32,13 +33,27 @@ class SemanticToolSelector:
     """
     Dynamically select tools based on semantic similarity
     between query and tool descriptions.
+
+    `embed_fn` (texts -> one vector per text) replaces the LiteLLM call,
+    e.g. with a local deterministic embedder to benchmark routing offline.
     """
 
-    def __init__(self, embedding_model: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        embedding_model: str = "text-embedding-3-small",
+        embed_fn: Callable[[list[str]], list[list[float]]] | None = None,
+    ):
         self.embedding_model = embedding_model
+        self.embed_fn = embed_fn
         self._tool_embeddings: dict[str, list[float]] = {}
         self._indexed = False
 
+    def _embed(self, texts: list[str]) -> list[list[float]]:
+        if self.embed_fn is not None:
+            return list(self.embed_fn(texts))
+        response = embedding(model=self.embedding_model, input=texts)
+        return [item["embedding"] for item in response.data]
+
     def build_index(self):
         """
         Embed all registered tool descriptions.
@@ -61,13 +76,10 @@ class SemanticToolSelector:
             tool_names.append(tool.name)
 
         # Single batch embedding call (efficient)
-        response = embedding(
-            model=self.embedding_model,
-            input=descriptions,
-        )
+        vectors = self._embed(descriptions)
 
-        for i, tool_name in enumerate(tool_names):
-            self._tool_embeddings[tool_name] = response.data[i]["embedding"]
+        for tool_name, vector in zip(tool_names, vectors):
+            self._tool_embeddings[tool_name] = vector
 
         self._indexed = True
         logger.info(f"Indexed {len(tools)} tools.")
@@ -83,7 +95,7 @@ class SemanticToolSelector:
             self.build_index()
 
         # Embed the query
-        query_embedding = get_embedding_vector(query, self.embedding_model)
+        query_embedding = self._embed([query])[0]
 
         # Score each tool
         scores = []
@@ -1,64 +1,93 @@
 import fitz  # PyMuPDF
 from dataclasses import dataclass, field
-from typing import Optional, Dict
+from typing import Optional, Dict, Iterable, Iterator, Tuple
 from datetime import datetime, timezone
 import re
 import unicodedata
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from openai import OpenAI
 import os
-import faiss
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
 import numpy as np
+import structlog
+
+from src.config import Config
+from src.retrieval.chunk_store import ChunkStore, content_hash
+from src.retrieval.dedup import MinHashDeduplicator
+from src.retrieval.embedding_backends import OpenAIEmbeddingBackend, create_backend
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.embeddings import BatchEmbedder
+from src.retrieval.hybrid import weighted_rrf
+from src.retrieval.keyword_index import KeywordIndex
+from src.retrieval.tokenizer import WORD, TokenOffsets, get_encoding
+from src.retrieval.vector_index import IndexConfig, VectorIndex
+
+logger = structlog.get_logger()
 
 # ------extract_and_clean---------
-pdf_path="/Users/hadeel/SDAIA-Building-Gen-AI-Apps/project_starter/src/gov.pdf"
+def iter_pdf_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """Yield (page_number, raw_text) for every non-empty page, one page in memory at a time."""
+    with fitz.open(pdf_path) as doc:
+        for page_num, page in enumerate(doc, start=1):
+            text = page.get_text("text")
+            if text.strip():
+                yield page_num, text
+
 def extract_pdf_text(pdf_path: str) -> str:
-    doc = fitz.open(pdf_path)
-    pages_text = []
-    for page_num, page in enumerate(doc, start=1):
-        text = page.get_text("text")
-        if text.strip():
-            pages_text.append(f"[page {page_num}]\n{text.strip()}")
-    doc.close()
+    pages_text = [
+        f"[page {page_num}]\n{text.strip()}"
+        for page_num, text in iter_pdf_pages(pdf_path)
+    ]
     full_text = "\n\n".join(pages_text)
     return full_text
 
+# Patterns are compiled once. The steps and their order are the original
+# cleaner's, so chunk texts, and the index and cache keys derived from them,
+# do not change.
+_QUOTES = str.maketrans({"\u2019": "'", "\u201c": '"', "\u201d": '"'})
+_BLANK_LINES = re.compile(r"\n{3,}")  # Max 2 consecutive newlines
+_SPACES = re.compile(r"[ \t]+")  # Collapse spaces/tabs
+_PAGE_FOOTER = re.compile(r"Page \d+ of \d+")
+_HYPHEN_BREAK = re.compile(r"-\n(\w)")  # Fix hyphenated line breaks
+_EXTENDED_ARTIFACTS = (
+    re.compile(r"\S+@\S+\.\S+"),  # Emails
+    re.compile(r"https?://\S+"),  # URLs
+    re.compile(r"^\d+$", flags=re.MULTILINE),  # Bare page numbers
+)
+
 def clean_text(text: str) -> str:
     """Master cleaning function for extracted text."""
     if not text:
         return ""
-    
-    # 1. Fix common encoding artifacts
-    text = text.replace("\u2019", "'").replace("\u201c", '"').replace("\u201d", '"')
-    text = unicodedata.normalize("NFC", text)
-    
-    # 2. Normalize whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text)  # Max 2 consecutive newlines
-    text = re.sub(r"[ \t]+", " ", text)      # Collapse spaces/tabs
-    
-    # 3. Remove common PDF artifacts
-    text = re.sub(r"Page \d+ of \d+", "", text)
-    text = re.sub(r"-\n(\w)", r"\1", text)  # Fix hyphenated line breaks
-    
+    # Fix common encoding artifacts
+    text = unicodedata.normalize("NFC", text.translate(_QUOTES))
+    text = _BLANK_LINES.sub("\n\n", text)
+    text = _SPACES.sub(" ", text)
+    text = _PAGE_FOOTER.sub("", text)
+    text = _HYPHEN_BREAK.sub(r"\1", text)
     return text.strip()
 
 def clean_text_extended(text: str) -> str:
-    """Extended cleaning with additional rules."""
+    """Extended cleaning with additional rules (emails, URLs, bare page numbers)."""
     text = clean_text(text)
-    
-    text = re.sub(r'\S+@\S+\.\S+', '', text)
-    
-    text = re.sub(r'https?://\S+', '', text)
-    
-    text = re.sub(r'^\d+$', '', text, flags=re.MULTILINE)
-    
-    text = re.sub(r'\n{3,}', '\n\n', text)
-    text = re.sub(r'[ \t]+', ' ', text)
-    
+    for pattern in _EXTENDED_ARTIFACTS:
+        text = pattern.sub("", text)
+    text = _BLANK_LINES.sub("\n\n", text)
+    text = _SPACES.sub(" ", text)
     return text.strip()
 
+def iter_clean_pages(pdf_path: str) -> Iterator[Tuple[int, str]]:
+    """Stream (page_number, cleaned_text) pages, skipping pages that clean to nothing."""
+    for page_num, text in iter_pdf_pages(pdf_path):
+        cleaned = clean_text_extended(text)
+        if cleaned:
+            yield page_num, cleaned
+
 # ------Documention---------
 @dataclass
 class Document:
@@ -125,6 +154,10 @@ class BaseChunker(ABC):
     @abstractmethod
     def chunk_document(self, text: str, metadata: dict = None) -> List[Dict[str, Any]]:
         pass
+
+    def split_text(self, text: str) -> List[str]:
+        """Chunk texts only, without building a metadata dict per chunk."""
+        return [chunk["text"] for chunk in self.chunk_document(text)]
     
     def _create_chunk_dict(self, text: str, metadata: dict, chunk_id: int) -> dict:
         chunk_meta = metadata.copy() if metadata else {}
@@ -152,80 +185,541 @@ class RecursiveChunker(BaseChunker):
         text_chunks = self._splitter.split_text(text)
         return [self._create_chunk_dict(t, metadata, i) for i, t in enumerate(text_chunks)]
 
+    def split_text(self, text):
+        return [t.strip() for t in self._splitter.split_text(text)]
 
-client = OpenAI(
-    api_key=os.getenv("OPENROUTER_API_KEY"),
-    base_url="https://openrouter.ai/api/v1"
-)
 
-def generate_embedding(text: str):
-    response = client.embeddings.create(
-        model="openai/text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+class TokenChunker(BaseChunker):
+    """
+    Chunks of at most `chunk_size` tokens, overlapping by about `chunk_overlap` tokens.
 
-# ------search_document---------
-
-def search_document(query, k=3):
-    global index, stored_chunks
-    import numpy as np
-
-    query_vector = generate_embedding(query)
-    query_vector = np.array([query_vector]).astype("float32")
+    Sizes are counted with a local BPE tokenizer (tiktoken, Config.TOKENIZER_ENCODING)
+    instead of characters, so English, Arabic and code chunks carry comparable
+    token counts. Each text is encoded once into a TokenOffsets index; a chunk
+    ends at the strongest boundary (paragraph > line > sentence > word) in the
+    second half of its budget, and the overlap starts on a word boundary.
+    The `token_count` in chunk metadata is counted before whitespace is
+    stripped, so it can overestimate by a token or two but never undercount.
+    """
 
-    distances, indices = index.search(query_vector, k)
+    def __init__(self, chunk_size=256, chunk_overlap=32, encoding_name=None):
+        if not 0 <= chunk_overlap < chunk_size // 2:
+            raise ValueError(f"chunk_overlap must be below half of chunk_size, got {chunk_overlap}/{chunk_size}")
+        super().__init__(chunk_size, chunk_overlap)
+        self.encoding_name = encoding_name or Config.TOKENIZER_ENCODING
+
+    def _spans(self, offsets: TokenOffsets) -> Iterator[Tuple[int, int, int]]:
+        encoding = get_encoding(self.encoding_name)
+        n, start = len(offsets), 0
+        while start < n:
+            # Chunks are stripped, and " word" without its space can take more than one token
+            first = offsets.span_text(start, start + 1)
+            extra = max(len(encoding.encode_ordinary(first.lstrip())) - 1, 0) if first[:1].isspace() else 0
+            limit = start + self.chunk_size - extra
+            if limit >= n:
+                yield start, n, n - start + extra
+                return
+            # Latest strongest boundary in the second half of the budget
+            window = offsets.boundaries[min(start + self.chunk_size // 2, limit):limit + 1]
+            end = limit - int(np.argmax(window[::-1]))
+            yield start, end, end - start + extra
+            words = np.flatnonzero(offsets.boundaries[end - self.chunk_overlap:end] >= WORD)
+            start = end - self.chunk_overlap + int(words[0]) if len(words) else end
+
+    def _chunks(self, text: str) -> Iterator[Tuple[str, int]]:
+        offsets = TokenOffsets(text, self.encoding_name)
+        for start, end, n_tokens in self._spans(offsets):
+            chunk = offsets.span_text(start, end).strip()
+            if chunk:
+                yield chunk, n_tokens
 
-    results = []
-    for i in indices[0]:
-        results.append(stored_chunks[i]["text"])
+    def chunk_document(self, text, metadata=None):
+        chunks = []
+        for i, (chunk, n_tokens) in enumerate(self._chunks(text)):
+            chunk_dict = self._create_chunk_dict(chunk, metadata, i)
+            chunk_dict["metadata"]["token_count"] = n_tokens
+            chunks.append(chunk_dict)
+        return chunks
+
+    def split_text(self, text):
+        return [chunk for chunk, _ in self._chunks(text)]
+
+
+def create_chunker(name: str = None) -> BaseChunker:
+    """Build the chunker named by `name` (default: Config.RAG_CHUNKER)."""
+    name = name or Config.RAG_CHUNKER
+    if name == "recursive":
+        return RecursiveChunker(chunk_size=300, chunk_overlap=50)
+    if name == "token":
+        return TokenChunker(chunk_size=Config.RAG_CHUNK_TOKENS, chunk_overlap=Config.RAG_CHUNK_OVERLAP_TOKENS)
+    raise ValueError(f"Unknown chunker '{name}', expected 'recursive' or 'token'")
+
+
+# ------embeddings---------
+_embedder: BatchEmbedder | None = None
+
+def get_embedder() -> BatchEmbedder:
+    """Build the shared embedder (Config.EMBEDDING_BACKEND + on-disk cache) on first use."""
+    global _embedder
+    if _embedder is None:
+        backend = create_backend()
+        # Local backends are cheaper to recompute than to look up
+        cache = (
+            EmbeddingCache(Config.EMBEDDING_CACHE_PATH, max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES)
+            if Config.EMBEDDING_CACHE_PATH and isinstance(backend, OpenAIEmbeddingBackend) else None
+        )
+        _embedder = BatchEmbedder(backend=backend, cache=cache)
+    return _embedder
 
-    return "\n\n".join(results)
+def generate_embedding(text: str):
+    return get_embedder().embed_one(text).tolist()
 
-#----call the functions------
-raw_text = extract_pdf_text(pdf_path)
-cleaned_text = clean_text_extended(raw_text)
-
-doc = Document(
-    content=cleaned_text,
-    source="gov.pdf",
-    title="Government PDF",
-    doc_type="pdf"
-)
-recursive = RecursiveChunker(chunk_size=300, chunk_overlap=50)
-text = doc.content
-metadata = doc.to_dict()["metadata"]
-chunks = recursive.chunk_document(text, metadata)
+# ------index---------
+@dataclass
+class SearchHit:
+    text: str
+    score: float  # Cosine similarity (vector search) or fused RRF score (hybrid); higher is closer
+    metadata: Dict[str, Any]
+
+
+class RAGIndex:
+    """
+    FAISS index over document chunks with an explicit lifecycle.
+
+    `build(paths)` ingests PDFs, `save(dir)` writes the index and chunk store
+    to disk, and `load(dir)` memory-maps them back so a process can serve
+    searches without re-ingesting anything. Vectors are stored under their
+    chunk ids, so `upsert_document` and `delete_document` can change one
+    document in place instead of rebuilding. A BM25 keyword index over the
+    same chunk ids is kept alongside for hybrid search.
+
+    Between chunking and embedding, chunks whose MinHash similarity to an
+    already indexed chunk reaches `dedup_threshold` are dropped: they stay in
+    the chunk store pointing at their canonical chunk, but get no vector and
+    no keyword postings. A `dedup_threshold` of 0 turns this off.
+    """
+    def __init__(
+        self,
+        embedder: BatchEmbedder = None,
+        chunker: BaseChunker = None,
+        index_config: IndexConfig = None,
+        dedup_threshold: float = None,
+    ):
+        self._embedder = embedder
+        self.chunker = chunker or create_chunker()
+        self.index_config = index_config or IndexConfig.from_config()
+        self.dedup_threshold = Config.RAG_DEDUP_THRESHOLD if dedup_threshold is None else dedup_threshold
+        self.index = None
+        self.store = ChunkStore()
+        self.keywords = KeywordIndex()
+        self.dedup = self._new_deduplicator()
+        self.ingest_stats = None
+        self._search_pool = None
+
+    @property
+    def embedder(self) -> BatchEmbedder:
+        # Resolved lazily so a loaded index only builds a client when it is first searched
+        if self._embedder is None:
+            self._embedder = get_embedder()
+        return self._embedder
+
+    def build(self, paths: List[str], max_workers: int = 1) -> "RAGIndex":
+        """
+        Ingest every PDF in `paths` into a fresh index.
+
+        With `max_workers` > 1, extraction runs in a process pool (see IngestionRunner).
+        """
+        self.index = VectorIndex(self.index_config)
+        self.store = ChunkStore()
+        self.keywords = KeywordIndex()
+        self.dedup = self._new_deduplicator()
+        self.ingest_stats = IngestionRunner(self, max_workers=max_workers).run(paths)
+        self.index.flush()
+        self.keywords.flush()
+
+        if self.index.ntotal == 0:
+            raise ValueError("No text could be extracted from the given documents")
+        return self
+
+    def add_document(self, path: str) -> int:
+        """Register the PDF at `path` (its basename is the document id); returns its document row."""
+        metadata = {
+            "title": os.path.splitext(os.path.basename(path))[0],
+            "type": "pdf",
+            "author": None,
+            "source": os.path.basename(path),
+            "chunker": self.chunker.__class__.__name__,
+        }
+        return self.store.add_document(os.path.basename(path), metadata)
+
+    def _new_deduplicator(self) -> MinHashDeduplicator | None:
+        return MinHashDeduplicator(self.dedup_threshold) if self.dedup_threshold > 0 else None
+
+    def add_page(self, doc: int, page_num: int, text: str) -> Tuple[List[int], List[str]]:
+        """Chunk one cleaned page into the store; returns the chunk ids and texts still to be embedded."""
+        return self._add_chunks(doc, page_num, text, self.chunker.split_text(text))
+
+    def _add_chunks(
+        self,
+        doc: int,
+        page_num: int,
+        text: str,
+        chunk_texts: List[str],
+        ids: List[Optional[int]] = None,
+        canonical: List[Optional[int]] = None,
+    ) -> Tuple[List[int], List[str]]:
+        """
+        Store one page's chunks and return the (ids, texts) that need embedding.
+
+        `ids`/`canonical` carry over chunks kept from a previous version of
+        the document; None ids are new chunks, which get fresh ids and are
+        checked for near-duplicates.
+        """
+        ids = list(ids) if ids is not None else [None] * len(chunk_texts)
+        canonical = list(canonical) if canonical is not None else [None] * len(chunk_texts)
+        fresh = [i for i, chunk_id in enumerate(ids) if chunk_id is None]
+        for i, chunk_id in zip(fresh, self.store.allocate_ids(len(fresh))):
+            ids[i] = chunk_id
+        if self.dedup is not None and fresh:
+            found = self.dedup.add([ids[i] for i in fresh], [chunk_texts[i] for i in fresh])
+            for i, duplicate_of in zip(fresh, found):
+                canonical[i] = duplicate_of
+        self.store.add_page(doc, page_num, text, chunk_texts, ids, canonical)
+        embed = [i for i in fresh if canonical[i] is None]
+        return [ids[i] for i in embed], [chunk_texts[i] for i in embed]
+
+    def index_chunks(self, ids: List[int], texts: List[str]):
+        """Embed chunk texts and add them to the vector and keyword indexes under their chunk ids."""
+        if self.index is None:
+            self.index = VectorIndex(self.index_config)
+        self.index.add(self.embedder.embed(texts), np.asarray(ids, dtype=np.int64))
+        if self.keywords is not None:
+            self.keywords.add(ids, texts)
+
+    def _remove_chunks(self, chunk_ids: np.ndarray) -> Tuple[int, int]:
+        """Remove chunks from every index; returns (vectors removed, duplicates promoted)."""
+        if self.dedup is not None:
+            self.dedup.remove(chunk_ids)
+        if self.keywords is not None:
+            self.keywords.remove(chunk_ids)
+        removed = self.index.remove(chunk_ids) if self.index is not None else 0
+        return removed, self._promote_duplicates(chunk_ids)
+
+    def _promote_duplicates(self, removed_ids: np.ndarray) -> int:
+        # Duplicates of a removed canonical chunk would no longer be searchable:
+        # the oldest one becomes canonical (and is embedded), the rest point to it
+        table = self.store.table
+        orphaned = np.isin(table["canonical"], removed_ids)
+        if not orphaned.any():
+            return 0
+        ids, old = table["chunk_id"][orphaned], table["canonical"][orphaned]
+        groups, first = np.unique(old, return_index=True)
+        heirs = ids[first]
+        new_canonical = heirs[np.searchsorted(groups, old)]
+        new_canonical[first] = -1
+        self.store.set_canonical(ids, new_canonical)
+
+        texts = [self.store.text(self.store.row_of(heir)) for heir in heirs]
+        if self.dedup is not None:
+            for heir, text in zip(heirs.tolist(), texts):
+                self.dedup.register(heir, self.dedup.signature(text))
+        self.index_chunks(heirs.tolist(), texts)
+        logger.info("duplicates_promoted", chunks=len(heirs))
+        return len(heirs)
+
+    def upsert_document(self, path: str) -> "DocumentUpdate":
+        """
+        Add the PDF at `path`, or re-ingest it if its document id is already indexed.
+
+        The new chunks are matched to the old ones by content hash: a chunk
+        whose text is unchanged keeps its chunk id and its vector, only new
+        or edited chunks are embedded, and vectors of chunks that no longer
+        exist are removed from the index.
+        """
+        doc_id = os.path.basename(path)
+        # Read and chunk the new version before touching the index, so a PDF
+        # that cannot be read leaves the old version in place
+        pages = [(page_num, text, self.chunker.split_text(text)) for page_num, text in iter_clean_pages(path)]
+        unchanged = defaultdict(deque)  # content hash -> (chunk id, canonical id)
+        for record in self.store.document_chunks(doc_id):
+            canonical = int(record["canonical"])
+            unchanged[int(record["hash"])].append((int(record["chunk_id"]), None if canonical == -1 else canonical))
+        self.store.delete_document(doc_id)
+
+        doc = self.add_document(path)
+        update = DocumentUpdate(doc_id=doc_id)
+        new_ids, new_texts = [], []
+        for page_num, text, chunk_texts in pages:
+            reused = []
+            for chunk in chunk_texts:
+                candidates = unchanged.get(content_hash(chunk))
+                reused.append(candidates.popleft() if candidates else (None, None))
+            ids, texts = self._add_chunks(
+                doc, page_num, text, chunk_texts, [r[0] for r in reused], [r[1] for r in reused]
+            )
+            new_ids.extend(ids)
+            new_texts.extend(texts)
+            kept = sum(chunk_id is not None for chunk_id, _ in reused)
+            update.chunks += len(chunk_texts)
+            update.reused += kept
+            update.duplicates += len(chunk_texts) - kept - len(texts)
+
+        stale = [chunk_id for chunks in unchanged.values() for chunk_id, _ in chunks]
+        if stale:
+            update.removed, update.promoted = self._remove_chunks(np.asarray(stale, dtype=np.int64))
+        if new_texts:
+            self.index_chunks(new_ids, new_texts)
+        update.embedded = len(new_texts)
+
+        logger.info("document_upserted",
+                    doc_id=doc_id,
+                    chunks=update.chunks,
+                    reused=update.reused,
+                    embedded=update.embedded,
+                    duplicates=update.duplicates,
+                    removed=update.removed,
+                    promoted=update.promoted)
+        return update
+
+    def delete_document(self, doc_id: str) -> int:
+        """Remove a document and its vectors; returns the number of vectors removed."""
+        removed, promoted = self._remove_chunks(self.store.delete_document(doc_id))
+        logger.info("document_deleted", doc_id=doc_id, removed=removed, promoted=promoted)
+        return removed
+
+    def save(self, directory: str):
+        if self.index is None:
+            raise ValueError("Nothing to save: build or load the index first")
+        self.index.save(directory)
+        self.store.save(directory)
+        if self.keywords is not None:
+            self.keywords.save(directory)
+        if self.dedup is not None:
+            self.dedup.save(directory)
+
+    @classmethod
+    def load(cls, directory: str, embedder: BatchEmbedder = None) -> "RAGIndex":
+        """Memory-map a directory written by `save`."""
+        rag_index = cls(embedder=embedder)
+        rag_index.index = VectorIndex.load(directory)
+        rag_index.index_config = rag_index.index.config
+        rag_index.store = ChunkStore.load(directory)
+        # Indexes saved before hybrid search existed have no keyword files; they stay vector-only
+        keywords_saved = os.path.exists(os.path.join(directory, KeywordIndex.VOCAB_FILE))
+        rag_index.keywords = KeywordIndex.load(directory) if keywords_saved else None
+        dedup_saved = os.path.exists(os.path.join(directory, MinHashDeduplicator.CONFIG_FILE))
+        rag_index.dedup = MinHashDeduplicator.load(directory) if dedup_saved else None
+        return rag_index
+
+    def search(self, query: str, k: int = 3, mode: str = None) -> List["SearchHit"]:
+        return self.search_many([query], k, mode)[0]
+
+    def search_many(self, queries: List[str], k: int = 3, mode: str = None) -> List[List["SearchHit"]]:
+        """
+        Search for several queries at once.
+
+        All queries are embedded in one batched call and FAISS searches the
+        stacked matrix in a single pass. Returns one hit list per query.
+        Search-time knobs (nprobe, efSearch) are set via `index.set_search_params`.
+
+        `mode` is "hybrid" or "vector" (default: Config.RAG_SEARCH_MODE). In
+        hybrid mode the BM25 leg runs on a worker thread while the vector leg
+        embeds and searches, each returns `candidates` chunks per query, and
+        the two rankings are fused with weighted reciprocal rank fusion.
+        """
+        if not queries:
+            return []
+        mode = mode or Config.RAG_SEARCH_MODE
+        if mode == "vector" or self.keywords is None:
+            return [self._hits(ranked) for ranked in self._vector_search(queries, k)]
+        if mode != "hybrid":
+            raise ValueError(f"Unknown search mode '{mode}', expected 'hybrid' or 'vector'")
+
+        candidates = max(4 * k, 20)
+        if self._search_pool is None:
+            self._search_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bm25")
+        keyword_future = self._search_pool.submit(self.keywords.search_many, queries, candidates)
+        vector_results = self._vector_search(queries, candidates)
+        keyword_results = keyword_future.result()
+
+        weights = [Config.RAG_KEYWORD_WEIGHT, Config.RAG_VECTOR_WEIGHT]
+        return [
+            self._hits(weighted_rrf([keyword, vector], weights=weights, k=Config.RAG_RRF_K)[:k])
+            for keyword, vector in zip(keyword_results, vector_results)
+        ]
+
+    def _vector_search(self, queries: List[str], k: int) -> List[List[Tuple[int, float]]]:
+        """(chunk_id, cosine similarity) pairs per query, best first."""
+        scores, chunk_ids = self.index.search(self.embedder.embed(queries), k)
+        # FAISS pads with -1 when the index holds fewer than k vectors
+        return [
+            [(int(chunk_id), float(score)) for score, chunk_id in zip(row_scores, row_ids) if chunk_id != -1]
+            for row_scores, row_ids in zip(scores, chunk_ids)
+        ]
+
+    def _hits(self, ranked: List[Tuple[int, float]]) -> List["SearchHit"]:
+        hits = []
+        for chunk_id, score in ranked:
+            row = self.store.row_of(chunk_id)
+            hits.append(SearchHit(text=self.store.text(row), score=score, metadata=self.store.metadata(row)))
+        return hits
 
-print(f"Total chunks created: {len(chunks)}")
-print("Example chunk:", chunks[0])
 
-embedded_chunks = []
+@dataclass
+class DocumentUpdate:
+    """
+    What `RAGIndex.upsert_document` changed for one document.
 
-for chunk in chunks:
-    vector = generate_embedding(chunk["text"])
-    
-    embedded_chunks.append({
-        "embedding": vector,
-        "metadata": chunk["metadata"],
-        "text": chunk["text"]
-    })
+    `chunks == reused + embedded + duplicates`; `promoted` chunks (of any
+    document) were embedded on top of those because the canonical chunk
+    they duplicated was removed.
+    """
+    doc_id: str
+    chunks: int = 0  # chunks now in the document
+    reused: int = 0  # unchanged chunks that kept their id and vector
+    embedded: int = 0  # new or edited chunks sent to the embedder
+    duplicates: int = 0  # new chunks stored as near-duplicates, not embedded
+    removed: int = 0  # vectors of chunks that disappeared
+    promoted: int = 0  # near-duplicates embedded in place of a removed canonical chunk
 
-print("Vector size:", len(embedded_chunks[0]["embedding"]))
 
-embeddings = []
-texts = []
+# ------ingestion---------
+def _extract_document(path: str) -> Tuple[str, List[Tuple[int, str]]]:
+    """Process-pool task: extract and clean one PDF."""
+    return path, list(iter_clean_pages(path))
 
-for chunk in chunks:
-    vector = generate_embedding(chunk["text"])
-    embeddings.append(vector)
-    texts.append(chunk)
 
-embeddings = np.array(embeddings).astype("float32")
+@dataclass
+class IngestionStats:
+    documents: int = 0
+    pages: int = 0
+    chunks: int = 0  # embedded
+    duplicates: int = 0  # stored but dropped as near-duplicates
+    elapsed_s: float = 0.0
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed_s if self.elapsed_s else 0.0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / self.elapsed_s if self.elapsed_s else 0.0
+
+
+class IngestionRunner:
+    """
+    Ingests many PDFs into a RAGIndex.
+
+    Extraction and cleaning (CPU-bound PyMuPDF work) fan out across a process
+    pool, one document per task. Finished documents stream back into chunking
+    and embedding through a bounded window of `max_pending` in-flight tasks:
+    a new document is only submitted once the consumer has taken one, so a
+    slow embedding stage pauses extraction instead of piling pages up in memory.
+    """
+    # Chunks are embedded in groups this size as they stream out of the chunker
+    EMBED_BUFFER_SIZE = 1024
+
+    def __init__(self, rag_index: "RAGIndex", max_workers: int = None, max_pending: int = None):
+        self.rag_index = rag_index
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+
+    def run(self, paths: List[str]) -> IngestionStats:
+        stats = IngestionStats()
+        start = time.perf_counter()
+        stored_before = len(self.rag_index.store)
+        buffer_ids, buffer = [], []
+        for path, pages in self._iter_documents(paths):
+            stats.documents += 1
+            doc = self.rag_index.add_document(path)
+            for page_num, text in pages:
+                stats.pages += 1
+                ids, texts = self.rag_index.add_page(doc, page_num, text)
+                buffer_ids.extend(ids)
+                buffer.extend(texts)
+                if len(buffer) >= self.EMBED_BUFFER_SIZE:
+                    self.rag_index.index_chunks(buffer_ids, buffer)
+                    stats.chunks += len(buffer)
+                    buffer_ids, buffer = [], []
+        if buffer:
+            self.rag_index.index_chunks(buffer_ids, buffer)
+            stats.chunks += len(buffer)
+
+        stats.duplicates = len(self.rag_index.store) - stored_before - stats.chunks
+        stats.elapsed_s = time.perf_counter() - start
+        logger.info("ingestion_completed",
+                    documents=stats.documents,
+                    pages=stats.pages,
+                    chunks=stats.chunks,
+                    duplicates=stats.duplicates,
+                    elapsed_s=round(stats.elapsed_s, 2),
+                    pages_per_sec=round(stats.pages_per_sec, 1),
+                    chunks_per_sec=round(stats.chunks_per_sec, 1))
+        return stats
+
+    def _iter_documents(self, paths: List[str]) -> Iterator[Tuple[str, Iterable[Tuple[int, str]]]]:
+        if self.max_workers == 1 or len(paths) == 1:
+            for path in paths:
+                yield path, iter_clean_pages(path)
+            return
+
+        remaining = iter(paths)
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {pool.submit(_extract_document, path) for path in islice(remaining, self.max_pending)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    next_path = next(remaining, None)
+                    if next_path is not None:
+                        pending.add(pool.submit(_extract_document, next_path))
+                    yield future.result()
 
-dimension = embeddings.shape[1]  # 1536
-index = faiss.IndexFlatL2(dimension)
 
-index.add(embeddings)
+# ------search_document---------
+_default_index: RAGIndex | None = None
+
+def get_default_index() -> RAGIndex:
+    """Load the index saved at Config.RAG_INDEX_DIR on first use."""
+    global _default_index
+    if _default_index is None:
+        _default_index = RAGIndex.load(Config.RAG_INDEX_DIR)
+    return _default_index
+
+def search_document(query, k=3, rag_index: RAGIndex = None):
+    rag_index = rag_index or get_default_index()
+    results = [hit.text for hit in rag_index.search(query, k)]
+    return "\n\n".join(results)
 
-print("Total vectors in FAISS:", index.ntotal) #102
\ No newline at end of file
+#----call the functions------
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m src.RAG file1.pdf [file2.pdf ...]\n"
+              "       python -m src.RAG --update file1.pdf [...]   (add or re-ingest into the saved index)\n"
+              "       python -m src.RAG --delete name.pdf [...]    (remove documents from the saved index)")
+        sys.exit(1)
+
+    if sys.argv[1] in ("--update", "--delete"):
+        rag_index = RAGIndex.load(Config.RAG_INDEX_DIR)
+        for arg in sys.argv[2:]:
+            if sys.argv[1] == "--update":
+                update = rag_index.upsert_document(arg)
+                print(f"{update.doc_id}: {update.chunks} chunks ({update.reused} reused, "
+                      f"{update.embedded} embedded, {update.duplicates} near-duplicates), "
+                      f"{update.removed} removed, {update.promoted} duplicates promoted")
+            else:
+                print(f"{arg}: {rag_index.delete_document(arg)} vectors removed")
+        rag_index.save(Config.RAG_INDEX_DIR)
+        print("Total vectors in FAISS:", rag_index.index.ntotal)
+        sys.exit(0)
+
+    rag_index = RAGIndex().build(sys.argv[1:], max_workers=Config.INGEST_WORKERS)
+    rag_index.save(Config.RAG_INDEX_DIR)
+
+    stats = rag_index.ingest_stats
+    print(f"Ingested {stats.documents} documents, {stats.pages} pages in {stats.elapsed_s:.1f}s "
+          f"({stats.pages_per_sec:.1f} pages/s, {stats.chunks_per_sec:.1f} chunks/s)")
+
+    print(f"Total chunks created: {len(rag_index.store)} ({stats.duplicates} near-duplicates not embedded)")
+    print("Example chunk:", rag_index.store.get(0))
+    print("Total vectors in FAISS:", rag_index.index.ntotal)
+    print(f"Index saved to {Config.RAG_INDEX_DIR}")
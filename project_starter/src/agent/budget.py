@@ -0,0 +1,104 @@
+import time
+from dataclasses import dataclass, field
+
+from src.config import Config
+
+# Stop reasons reported by ObservableAgent when a limit ends the run early
+DEADLINE, INPUT_TOKENS, OUTPUT_TOKENS, COST = "deadline", "input_tokens", "output_tokens", "cost"
+
+
+@dataclass
+class RunBudget:
+    """Limits of one agent run; None means unlimited."""
+    deadline_s: float | None = None  # wall-clock seconds from the start of the run
+    max_input_tokens: int | None = None
+    max_output_tokens: int | None = None
+    max_cost_usd: float | None = None
+
+    @classmethod
+    def from_config(cls) -> "RunBudget":
+        # 0 in the environment means unlimited
+        return cls(
+            deadline_s=Config.AGENT_DEADLINE_S or None,
+            max_input_tokens=Config.AGENT_MAX_INPUT_TOKENS or None,
+            max_output_tokens=Config.AGENT_MAX_OUTPUT_TOKENS or None,
+            max_cost_usd=Config.AGENT_MAX_COST_USD or None,
+        )
+
+
+@dataclass
+class BudgetUsage:
+    """What a run has spent so far, and the averages used to project its next steps."""
+    started: float = field(default_factory=time.monotonic)
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    llm_calls: int = 0
+    llm_s: float = 0.0
+    tool_rounds: int = 0
+    tool_s: float = 0.0
+
+    @property
+    def elapsed_s(self) -> float:
+        return time.monotonic() - self.started
+
+    def add_call(self, input_tokens: int, output_tokens: int, cost_usd: float, duration_s: float):
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += cost_usd
+        self.llm_calls += 1
+        self.llm_s += duration_s
+
+    def add_tool_round(self, duration_s: float):
+        self.tool_rounds += 1
+        self.tool_s += duration_s
+
+    def remaining_s(self, budget: RunBudget) -> float | None:
+        """Seconds left before the deadline (negative once it has passed), or None without one."""
+        return None if budget.deadline_s is None else budget.deadline_s - self.elapsed_s
+
+    def average_call_s(self) -> float:
+        return self.llm_s / self.llm_calls if self.llm_calls else 0.0
+
+    def average_call_usd(self) -> float:
+        return self.cost_usd / self.llm_calls if self.llm_calls else 0.0
+
+    def exhausted(self, budget: RunBudget) -> str | None:
+        """The limit this run has already used up, or None."""
+        if budget.deadline_s is not None and self.elapsed_s >= budget.deadline_s:
+            return DEADLINE
+        if budget.max_input_tokens is not None and self.input_tokens >= budget.max_input_tokens:
+            return INPUT_TOKENS
+        if budget.max_output_tokens is not None and self.output_tokens >= budget.max_output_tokens:
+            return OUTPUT_TOKENS
+        if budget.max_cost_usd is not None and self.cost_usd >= budget.max_cost_usd:
+            return COST
+        return None
+
+    def exceeds(
+        self,
+        budget: RunBudget,
+        input_tokens: int,
+        output_tokens: int,
+        cost_usd: float,
+        calls: int = 1,
+        tool_rounds: int = 0,
+    ) -> str | None:
+        """
+        The limit (DEADLINE, INPUT_TOKENS, OUTPUT_TOKENS or COST) that `calls`
+        more LLM calls, each of up to `input_tokens` in, `output_tokens` out and
+        `cost_usd`, plus `tool_rounds` tool rounds, would break; None if they fit.
+        Durations are projected from this run's averages so far.
+        """
+        if budget.deadline_s is not None:
+            round_s = self.tool_s / self.tool_rounds if self.tool_rounds else 0.0
+            if self.elapsed_s + calls * self.average_call_s() + tool_rounds * round_s >= budget.deadline_s:
+                return DEADLINE
+        if budget.max_input_tokens is not None and self.input_tokens + calls * input_tokens > budget.max_input_tokens:
+            return INPUT_TOKENS
+        # >=: a call needs at least one output token
+        if budget.max_output_tokens is not None and self.output_tokens + calls * output_tokens >= budget.max_output_tokens:
+            return OUTPUT_TOKENS
+        if budget.max_cost_usd is not None and self.cost_usd + calls * cost_usd > budget.max_cost_usd:
+            return COST
+        return None
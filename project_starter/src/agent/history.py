@@ -0,0 +1,196 @@
+import functools
+import sys
+from dataclasses import dataclass
+from typing import Any
+
+import structlog
+
+from src.config import Config
+from src.retrieval.tokenizer import get_encoding
+
+logger = structlog.get_logger()
+
+# Rough per-message cost of role markers and separators in chat formats
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Compaction levels of a tool output
+VERBATIM, TRUNCATED, OMITTED = 0, 1, 2
+
+# Token estimate used when the BPE encoding cannot be loaded
+CHARS_PER_TOKEN = 4
+
+
+def load_encoding(name: str = None):
+    """
+    The tiktoken encoding `name` (default: Config.TOKENIZER_ENCODING), or
+    None if it cannot be loaded (tiktoken downloads it on first use, which
+    fails offline). Cached per encoding, failures included, so only the
+    first call can block: call it where blocking is harmless, e.g. when
+    building an agent.
+    """
+    # Resolved here so that `load_encoding()` and `load_encoding(None)` share one cache entry
+    return _load_encoding(name or Config.TOKENIZER_ENCODING)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_encoding(name: str):
+    try:
+        return get_encoding(name)
+    except Exception as e:
+        logger.warning("tokenizer_unavailable", encoding=name, error=str(e),
+                       fallback=f"{CHARS_PER_TOKEN} characters per token")
+        return None
+
+
+def _field(message, name: str):
+    # Messages are dicts or litellm Message objects
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+
+@dataclass
+class _Entry:
+    message: Any  # as sent to the model
+    tokens: int
+    turn: int  # 0 for the prompt, then one per assistant message
+    level: int = VERBATIM
+    original_tokens: int = 0
+
+
+class ConversationHistory:
+    """
+    The messages of one agent run, kept under an input-token budget.
+
+    Each message is token-counted once, when it is appended, so the running
+    total is always known. Whenever it exceeds `max_tokens`, tool outputs of
+    older turns (a turn is an assistant message plus its tool results) are
+    compacted, oldest first: first cut to their leading
+    `tool_output_tokens` tokens, then, if that is not enough, replaced by a
+    one-line stub. The prompt (system and user messages) and the newest
+    `keep_recent_turns` turns are always sent verbatim, so the total can
+    still exceed the budget if they alone do.
+
+    Without the BPE encoding (see `load_encoding`) tokens are estimated as
+    CHARS_PER_TOKEN characters each.
+
+    A compacted message never changes again, so the start of the
+    conversation stays identical between steps (which keeps response cache
+    and provider prompt cache prefixes stable) and prompt size stops
+    growing once the budget is reached.
+    """
+    def __init__(
+        self,
+        max_tokens: int = None,
+        keep_recent_turns: int = None,
+        tool_output_tokens: int = None,
+        encoding_name: str = None,
+    ):
+        self.max_tokens = max_tokens or Config.AGENT_CONTEXT_TOKENS
+        self.keep_recent_turns = keep_recent_turns or Config.AGENT_KEEP_RECENT_TURNS
+        self.tool_output_tokens = tool_output_tokens or Config.AGENT_COMPACT_TOOL_TOKENS
+        self._encoding = load_encoding(encoding_name)
+        self._entries: list[_Entry] = []
+        self._turn = 0
+        self.tokens = 0
+        self.compacted = 0  # tool outputs truncated or omitted so far
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def messages(self) -> list:
+        """The (possibly compacted) messages to send, in order."""
+        return [entry.message for entry in self._entries]
+
+    def append(self, message):
+        if _field(message, "role") == "assistant":
+            self._turn += 1
+        tokens = self._count(message)
+        self._entries.append(_Entry(message=message, tokens=tokens, turn=self._turn, original_tokens=tokens))
+        self.tokens += tokens
+        if self.tokens > self.max_tokens:
+            self._compact()
+
+    def extend(self, messages: list):
+        for message in messages:
+            self.append(message)
+
+    def _count(self, message) -> int:
+        tokens = MESSAGE_OVERHEAD_TOKENS + self._count_text(_field(message, "content") or "")
+        for call in _field(message, "tool_calls") or []:
+            function = _field(call, "function")
+            tokens += self._count_text((_field(function, "name") or "") + (_field(function, "arguments") or ""))
+        return tokens
+
+    def _count_text(self, text: str) -> int:
+        if self._encoding is None:
+            return -(-len(text) // CHARS_PER_TOKEN)
+        return len(self._encoding.encode_ordinary(text))
+
+    def _head(self, text: str) -> tuple[str, int] | None:
+        # The first tool_output_tokens tokens of `text` and how many were cut, or None if it is short enough
+        if self._encoding is None:
+            limit = self.tool_output_tokens * CHARS_PER_TOKEN
+            if len(text) <= limit:
+                return None
+            return text[:limit], self._count_text(text[limit:])
+        tokens = self._encoding.encode_ordinary(text)
+        if len(tokens) <= self.tool_output_tokens:
+            return None
+        return self._encoding.decode(tokens[:self.tool_output_tokens]), len(tokens) - self.tool_output_tokens
+
+    def _compact(self):
+        before = self.tokens
+        first_recent_turn = self._turn - self.keep_recent_turns + 1
+        for level in (TRUNCATED, OMITTED):
+            for entry in self._entries:
+                if self.tokens <= self.max_tokens:
+                    break
+                if (
+                    entry.level < level
+                    and 0 < entry.turn < first_recent_turn
+                    and _field(entry.message, "role") == "tool"
+                ):
+                    self._shrink(entry, level)
+        if self.tokens < before:
+            logger.info("history_compacted", tokens_before=before, tokens_after=self.tokens, budget=self.max_tokens)
+        if self.tokens > self.max_tokens:
+            logger.warning("history_over_budget", tokens=self.tokens, budget=self.max_tokens,
+                           recent_turns=self.keep_recent_turns)
+
+    def _shrink(self, entry: _Entry, level: int):
+        content = entry.message.get("content") or ""
+        if level == TRUNCATED:
+            head = self._head(content)
+            if head is None:
+                entry.level = TRUNCATED
+                return
+            content = head[0] + f"\n[... {head[1]} more tokens truncated to save context]"
+        else:
+            name = entry.message.get("name") or "tool"
+            content = f"[{name} output of {entry.original_tokens} tokens omitted to save context]"
+        # Copy: the caller may still hold the original dict
+        entry.message = {**entry.message, "content": content}
+        entry.level = level
+        new_tokens = self._count(entry.message)
+        self.tokens += new_tokens - entry.tokens
+        entry.tokens = new_tokens
+        self.compacted += 1
+
+
+if __name__ == "__main__":
+    # Prompt tokens per step with and without compaction: python -m src.agent.history [steps]
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    page = "Regulators published new rules on cross-border data transfers and cloud hosting. " * 120
+    for label, budget in (("unbounded", 10 ** 9), (f"budget {Config.AGENT_CONTEXT_TOKENS}", None)):
+        history = ConversationHistory(max_tokens=budget)
+        history.extend([{"role": "system", "content": "You are a research agent."},
+                        {"role": "user", "content": "Summarize the new data transfer rules."}])
+        per_step = []
+        for step in range(steps):
+            per_step.append(history.tokens)
+            history.append({"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{step}", "type": "function",
+                "function": {"name": "read_webpage", "arguments": f'{{"url": "https://example.com/{step}"}}'},
+            }]})
+            history.append({"role": "tool", "tool_call_id": f"call_{step}", "name": "read_webpage", "content": page})
+        print(f"{label:>14}: prompt tokens at steps 1/5/10/{steps}: "
+              f"{per_step[0]}/{per_step[4]}/{per_step[9]}/{per_step[-1]}, total {sum(per_step):,}")
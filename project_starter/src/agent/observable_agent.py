@@ -1,19 +1,80 @@
 import asyncio
-import json
 import os
 import time
+from contextlib import aclosing, nullcontext
+from dataclasses import dataclass, field, replace
+from typing import AsyncIterator
 
 import structlog
-from litellm import acompletion, completion_cost
+from litellm import acompletion, completion_cost, cost_per_token, stream_chunk_builder
 # from pydantic import ValidationError
 
-from src.observability.cost_tracker import CostTracker
+from src.agent.budget import DEADLINE, BudgetUsage, RunBudget
+from src.agent.history import ConversationHistory, load_encoding
+from src.agent.response_cache import ResponseCache, get_response_cache
+from src.config import Config
+from src.deadline import Deadline
+from src.observability.cost_tracker import CostTracker, QueryCost
 from src.observability.loop_detector import AdvancedLoopDetector
 from src.observability.tracer import AgentStep, AgentTracer, ToolCallRecord
-from src.tools.registry import registry
+from src.tools.registry import registry, toolset_hash
 
 logger = structlog.get_logger()
 
+MAX_TOKENS_PER_CALL = 1024
+# Below this per-call tool timeout (seconds) a tool round is not worth starting
+MIN_TOOL_TIMEOUT_S = 0.5
+
+
+@dataclass
+class RunContext:
+    """State of one `run` call, kept off the agent so concurrent runs never share it."""
+    query: str
+    trace_id: str
+    cost: QueryCost
+    budget: RunBudget = field(default_factory=RunBudget)
+    usage: BudgetUsage = field(default_factory=BudgetUsage)
+    deadline: Deadline | None = None
+    loop_detector: AdvancedLoopDetector = field(default_factory=AdvancedLoopDetector)
+
+
+@dataclass
+class StreamEvent:
+    """
+    One item yielded by `ObservableAgent.stream`.
+
+    `type` is "token" (content as it arrives), "tool_call" (a call whose
+    arguments finished streaming; `data` has id, name and arguments),
+    "tool_result" or "done" (`data` is the dict `run` returns).
+    """
+    type: str
+    content: str = ""
+    step: int = 0
+    data: dict = field(default_factory=dict)
+
+
+@dataclass
+class _CallTiming:
+    start: float
+    end: float = 0.0
+    token_times: list[float] = field(default_factory=list)  # arrival of each streamed delta
+    output_tokens: int = 0
+
+
+def _record_timings(step: AgentStep, timings: list[_CallTiming]):
+    # TTFT is the step's first call; throughput and inter-token latency cover all its streamed calls
+    streamed = [t for t in timings if t.token_times]
+    if not streamed:
+        return
+    step.ttft_ms = (streamed[0].token_times[0] - streamed[0].start) * 1000
+    generating_s = sum(t.end - t.token_times[0] for t in streamed)
+    if generating_s > 0:
+        step.tokens_per_sec = sum(t.output_tokens for t in streamed) / generating_s
+    gaps = [b - a for t in streamed for a, b in zip(t.token_times, t.token_times[1:])]
+    if gaps:
+        step.inter_token_ms = sum(gaps) / len(gaps) * 1000
+
+
 class ObservableAgent:
     """
     Production-grade agent with full observability.
@@ -21,6 +82,10 @@ class ObservableAgent:
     This agent implements the ReAct pattern (Reasoning + Acting) but enhances it 
     with "Observability" - the ability to track, trace, and debug the agent's 
     internal state and actions.
+
+    An instance holds configuration and shared sinks (tracer, cost tracker)
+    only; everything specific to one query lives in a RunContext, so a
+    single agent can serve many overlapping `run` calls (see `run_many`).
     """
     def __init__(
         self,
@@ -55,7 +120,10 @@ class ObservableAgent:
         -   **Formatting**: Present your final answer in clear Markdown (using bolding, lists, and headers).
         """,
         tools: list = None,
-        
+        tool_timeout: float = None,
+        response_cache: ResponseCache = None,
+        max_context_tokens: int = None,
+        budget: RunBudget = None,
     ):
         self.model = model or os.getenv("MODEL_NAME", "ollama/llama3.2")
         self.api_base = api_base or os.getenv("OLLAMA_API_BASE", "http://localhost:11434")
@@ -64,6 +132,14 @@ class ObservableAgent:
         self.system_prompt = system_prompt
         self.tools = tools 
         self.verbose = verbose
+        self.tool_timeout = tool_timeout or Config.TOOL_TIMEOUT_S
+        self.response_cache = response_cache if response_cache is not None else get_response_cache()
+        # Input-token budget of each run's ConversationHistory
+        self.max_context_tokens = max_context_tokens or Config.AGENT_CONTEXT_TOKENS
+        # Load its tokenizer now: the first load may download it, which must not block a run's event loop
+        load_encoding()
+        # Default limits of each run; `run(query, budget=...)` overrides them per call
+        self.budget = budget or RunBudget.from_config()
 
         # TODO: Initialize observability components
         # Observability includes:
@@ -72,14 +148,150 @@ class ObservableAgent:
         # 3. Cost Tracking: Monitoring token usage and cost.
         
         self.tracer = AgentTracer(verbose=verbose)
-        self.loop_detector = AdvancedLoopDetector()
         self.cost_tracker = CostTracker()
-        
-        self.active_trace_id = None
-    
 
-    async def run(self, user_query: str) -> dict:
-        """Execute the agent loop with full observability."""
+    async def _execute_tool(self, tool_name: str, arguments: str, timeout: float) -> tuple[dict, str, float]:
+        """
+        Run one tool call with its own `timeout`, validating the model's raw
+        JSON `arguments` in one pass. Returns (validated arguments, result,
+        duration_ms); errors, invalid arguments included, are results.
+        """
+        tool_start = time.time()
+        tool_args = {"arguments": arguments}  # what the trace shows if validation fails
+        try:
+            tool = registry.get_tool(tool_name)
+            if tool is None:
+                raise ValueError(f"Tool '{tool_name}' not found")
+            tool_args = tool.validate_json(arguments)
+            result = await asyncio.wait_for(registry.arun(tool, tool_args), timeout)
+        except asyncio.TimeoutError:
+            # A thread-pool tool keeps running in the background; its result is dropped
+            result = f"Error: '{tool_name}' timed out after {timeout:g}s"
+        except Exception as e:
+            result = f"Error: {str(e)}"
+        return tool_args, str(result), (time.time() - tool_start) * 1000
+
+    async def _complete(
+        self, stream: bool, step: int, query_cost: QueryCost, tools_hash: str = None, **params
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        One LLM call, answered from the response cache when possible. Yields
+        the events of `_call`; the final "response" event also carries the
+        call's "cost" and whether it was "cached" (cached calls cost nothing).
+        A cached response is replayed as one "token" event plus its
+        "tool_call"s when streaming. `tools_hash` is `toolset_hash` of the
+        tools behind `params["tools"]`, if any.
+        """
+        if self.response_cache is None:
+            lookup = None
+        else:
+            lookup = await asyncio.to_thread(self.response_cache.lookup, params, tools_hash)
+            self.cost_tracker.record_cache(lookup.hit, lookup.cost_usd, query_cost)
+        if lookup is not None and lookup.hit:
+            message = lookup.response.choices[0].message
+            if stream:
+                if message.content:
+                    yield StreamEvent("token", content=message.content, step=step)
+                for call in message.tool_calls or []:
+                    data = {"id": call.id, "name": call.function.name, "arguments": call.function.arguments}
+                    yield StreamEvent("tool_call", content=call.function.name, step=step, data=data)
+            now = time.perf_counter()
+            yield StreamEvent("response", step=step, data={
+                "response": lookup.response, "timing": _CallTiming(start=now, end=now), "cost": 0.0, "cached": True,
+            })
+            return
+
+        async with aclosing(self._call(stream, step, **params)) as events:
+            async for event in events:
+                if event.type == "response":
+                    cost = completion_cost(completion_response=event.data["response"])
+                    if lookup is not None:
+                        await asyncio.to_thread(self.response_cache.store, lookup, event.data["response"], cost)
+                    event.data.update(cost=cost, cached=False)
+                yield event
+
+    async def _call(self, stream: bool, step: int, **params) -> AsyncIterator[StreamEvent]:
+        """
+        One LLM call. When streaming, yields "token" and "tool_call" events as
+        deltas arrive; always ends with a "response" event carrying the full
+        response (rebuilt from the chunks when streaming) and its timing.
+        """
+        timing = _CallTiming(start=time.perf_counter())
+        if not stream:
+            response = await acompletion(**params)
+            timing.end = time.perf_counter()
+            yield StreamEvent("response", step=step, data={"response": response, "timing": timing})
+            return
+
+        chunks = []
+        tool_calls: dict[int, dict] = {}  # index -> {"id", "name", "arguments"} assembled from deltas
+        finished = 0
+        async for chunk in await acompletion(stream=True, stream_options={"include_usage": True}, **params):
+            chunks.append(chunk)
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                timing.token_times.append(time.perf_counter())
+                yield StreamEvent("token", content=delta.content, step=step)
+            for tool_delta in delta.tool_calls or []:
+                timing.token_times.append(time.perf_counter())
+                call = tool_calls.setdefault(tool_delta.index, {"id": None, "name": "", "arguments": ""})
+                call["id"] = tool_delta.id or call["id"]
+                if tool_delta.function:
+                    call["name"] += tool_delta.function.name or ""
+                    call["arguments"] += tool_delta.function.arguments or ""
+                # Deltas arrive in index order: a new index means the earlier calls are complete
+                for index in sorted(tool_calls)[finished:-1]:
+                    yield StreamEvent("tool_call", content=tool_calls[index]["name"], step=step, data=tool_calls[index])
+                    finished += 1
+        for index in sorted(tool_calls)[finished:]:
+            yield StreamEvent("tool_call", content=tool_calls[index]["name"], step=step, data=tool_calls[index])
+        timing.end = time.perf_counter()
+        response = stream_chunk_builder(chunks, messages=params["messages"])
+        yield StreamEvent("response", step=step, data={"response": response, "timing": timing})
+
+    async def run(self, user_query: str, budget: RunBudget = None, deadline: Deadline = None) -> dict:
+        """
+        Execute the agent loop with full observability.
+
+        The loop runs until the model answers without tool calls, for at most
+        `max_steps` LLM calls. Before each call the run's `budget` (default:
+        the agent's) is checked against what the run has spent; when the
+        call and a final answer after it would not fit, or on the last
+        step, the model is asked to answer without tools instead. The
+        result's "stop_reason" says why the run ended: "answer", "loop",
+        "max_steps", or the budget limit that was reached.
+
+        A request `deadline` (default: the current one) also caps the
+        budget's deadline_s. When it passes, or is cancelled, in-flight LLM
+        and tool calls are cancelled, the trace ends as "cancelled" and
+        DeadlineExceeded is raised.
+        """
+        deadline = deadline or Deadline.current()
+        async with deadline.scope() if deadline is not None else nullcontext():
+            async with aclosing(self._events(user_query, stream=False, budget=budget, deadline=deadline)) as events:
+                async for event in events:
+                    if event.type == "done":
+                        return event.data
+
+    def stream(self, user_query: str, budget: RunBudget = None, deadline: Deadline = None) -> AsyncIterator[StreamEvent]:
+        """
+        Execute the agent loop like `run`, streaming every LLM call.
+
+        Yields StreamEvents as they happen: reasoning and answer "token"s,
+        assembled "tool_call"s, "tool_result"s, and finally "done", whose data
+        is the dict `run` returns. Closing the iterator early ends the trace
+        as "cancelled". The consumer owns the task, so a `deadline` is not
+        enforced by cancellation here; it still bounds the budget, HTTP and
+        tool timeouts (a call failing once it has passed raises
+        DeadlineExceeded), or wrap the consuming loop in `deadline.scope()`.
+        """
+        return self._events(user_query, stream=True, budget=budget, deadline=deadline or Deadline.current())
+
+    async def _events(
+        self, user_query: str, stream: bool, budget: RunBudget = None, deadline: Deadline = None
+    ) -> AsyncIterator[StreamEvent]:
         # TODO: Implement the agent loop
         # 1. Start trace and cost tracking
         # 2. Loop until max_steps
@@ -90,144 +302,260 @@ class ObservableAgent:
         # 7. Return final answer
         # 8. Handle errors and end trace
         
-        self.cost_tracker.start_query(user_query)
-         
-        self.active_trace_id = self.tracer.start_trace(
-            agent_name=self.agent_name, 
-            query=user_query, 
-            model=self.model
+        ctx = RunContext(
+            query=user_query,
+            trace_id=self.tracer.start_trace(
+                agent_name=self.agent_name,
+                query=user_query,
+                model=self.model
+            ),
+            cost=QueryCost(query=user_query),
+            budget=budget or self.budget,
+            deadline=deadline,
         )
-        self.loop_detector.reset()
-        
-        messages = [
-            {"role": "system", "content": self.system_prompt or "You are a helpful assistant."},
-            {"role": "user", "content": user_query}
-        ]
+        remaining_s = deadline.remaining() if deadline is not None else None
+        if remaining_s is not None and (ctx.budget.deadline_s is None or remaining_s < ctx.budget.deadline_s):
+            # Answer early, within the budget, rather than be cut off by the request deadline
+            ctx.budget = replace(ctx.budget, deadline_s=remaining_s)
         
         step_count = 0
         final_answer = None
-        
-        current_run_cost = 0.0
+        stop_reason = None
+        # Stays "cancelled" if the caller stops consuming events or the task is cancelled
+        status = "cancelled"
 
         try:
+            history = ConversationHistory(max_tokens=self.max_context_tokens)
+            history.extend([
+                {"role": "system", "content": self.system_prompt or "You are a helpful assistant."},
+                {"role": "user", "content": user_query}
+            ])
+
+            # Tools build their schemas once; they do not change during a run
+            tool_schemas = [t.to_openai_schema() for t in self.tools]
+            tools_hash = toolset_hash(self.tools)
             while step_count < self.max_steps:
                 step_count += 1
                 start_time = time.time()
-                
-                tool_schemas = [t.to_openai_schema() for t in self.tools]
-                response = await acompletion(
+
+                # The last step, or one the budget cannot fit together with a final answer after it, synthesizes
+                if step_count == self.max_steps:
+                    stop_reason = "max_steps"
+                else:
+                    stop_reason = self._over_budget(ctx, history, calls=2, tool_rounds=1)
+                if stop_reason:
+                    break
+
+                async with aclosing(self._complete(
+                    stream,
+                    step_count,
+                    ctx.cost,
+                    tools_hash,
                     model=self.model,
-                    messages=messages,
+                    messages=history.messages(),
                     tools=tool_schemas,
                     tool_choice="auto",
                     api_base=self.api_base,
-                    max_tokens=1024
-                )
-                
-                # cost = completion_cost(response)
-                cost = completion_cost(completion_response=response)
-                self.cost_tracker.add_cost(cost)
-                
-                # self.cost_tracker.log_completion(
-                #     step_number=step_count, 
-                #     response=response, 
-                #     is_tool_call=False
-                # )
-                
-                response_message = response.choices[0].message
-                messages.append(response_message)
-
-                usage = response.get("usage", {})
-
-                current_step = AgentStep(                    
-                    step_number=step_count,
-                    reasoning=response_message.content or "Executing tool calls...",
-                    input_tokens=usage.get("prompt_tokens", 0),
-                    output_tokens=usage.get("completion_tokens", 0),
-                    cost_usd=cost,
-                    duration_ms=(time.time() - start_time) * 1000
-                )
+                    max_tokens=self._max_tokens(ctx),
+                    timeout=self._llm_timeout(ctx),
+                )) as events:
+                    async for event in events:
+                        if event.type != "response":
+                            yield event
+                current_step = self._record_call(ctx, step_count, event, start_time)
+                response_message = event.data["response"].choices[0].message
+                history.append(response_message)
 
-                if response_message.tool_calls:
-                    for tool_call in response_message.tool_calls:
-                        tool_name = tool_call.function.name
-                        tool_args_str = tool_call.function.arguments
-                        tool_args = json.loads(tool_call.function.arguments)
-                        
-                        loop_result = self.loop_detector.check_tool_call(
-                            tool_name=tool_name, 
-                            tool_input=tool_args_str
-                        )
-                        
-                        if loop_result.is_looping:
-                            logger.warning(f"Loop detected: {loop_result.message}")
-                            final_answer = f"Terminated due to loop: {loop_result.message}"
-                            break 
-                        
-                        tool_start = time.time()
-                         
-                        try:
-                            result = registry.execute_tool(tool_name, **tool_args)
-                        except Exception as e:
-                            result = f"Error: {str(e)}"
-                            
-                        tool_duration = (time.time() - tool_start) * 1000    
-
-                        current_step.tool_calls.append(
-                            ToolCallRecord( 
-                                tool_name=tool_name,
-                                tool_input=tool_args,
-                                tool_output=str(result),
-                                duration_ms=tool_duration
-                            )
-                        )
+                if not response_message.tool_calls:
+                    final_answer = response_message.content
+                    stop_reason = "answer"
+                    self.tracer.log_step(ctx.trace_id, current_step)
+                    break
 
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "name": tool_name,
-                            "content": str(result)
-                        })
-                    if not final_answer:
-                        final_response = await acompletion(
-                            model=self.model,
-                            messages=messages,
-                            api_base=self.api_base
+                # Loop checks run in call order; calls up to the first looping one are executed
+                calls = []
+                for tool_call in response_message.tool_calls:
+                    tool_name = tool_call.function.name
+                    tool_args_str = tool_call.function.arguments
+                    
+                    loop_result = ctx.loop_detector.check_tool_call(
+                        tool_name=tool_name, 
+                        tool_input=tool_args_str
+                    )
+                    
+                    if loop_result.is_looping:
+                        logger.warning(f"Loop detected: {loop_result.message}")
+                        final_answer = f"Terminated due to loop: {loop_result.message}"
+                        stop_reason = "loop"
+                        break 
+                    calls.append((tool_call, tool_name, tool_args_str))
+
+                timeout = self._tool_timeout(ctx)
+                if timeout is None:
+                    # Too little time left for the tools: answer instead of filling the history with timeouts
+                    stop_reason = DEADLINE
+                    skipped = "Not run: the deadline budget for this task ran out."
+                    results = [({"arguments": tool_args_str}, skipped, 0.0) for _, _, tool_args_str in calls]
+                else:
+                    # Independent calls run concurrently: the step takes as long as the slowest one
+                    tools_start = time.monotonic()
+                    results = await asyncio.gather(
+                        *(self._execute_tool(tool_name, tool_args_str, timeout) for _, tool_name, tool_args_str in calls)
+                    )
+                    ctx.usage.add_tool_round(time.monotonic() - tools_start)
+                for (tool_call, tool_name, _), (tool_args, result, tool_duration) in zip(calls, results):
+                    current_step.tool_calls.append(
+                        ToolCallRecord( 
+                            tool_name=tool_name,
+                            tool_input=tool_args,
+                            tool_output=result,
+                            duration_ms=tool_duration
                         )
-                        final_answer = final_response.choices[0].message.content
-                        final_cost = completion_cost(completion_response=final_response)
-                        self.cost_tracker.add_cost(final_cost)
-                        current_step.cost_usd += final_cost
-                        current_step.duration_ms = (time.time() - start_time) * 1000
-                    self.tracer.log_step(self.active_trace_id, current_step)
+                    )
+
+                    history.append({
+                        "role": "tool",
+                        "tool_call_id": tool_call.id,
+                        "name": tool_name,
+                        "content": result
+                    })
+                    yield StreamEvent("tool_result", content=result, step=step_count,
+                                      data={"id": tool_call.id, "name": tool_name, "duration_ms": tool_duration})
+                current_step.duration_ms = (time.time() - start_time) * 1000
+                self.tracer.log_step(ctx.trace_id, current_step)
+                if final_answer or stop_reason == DEADLINE:
                     break
-                else:
-                    final_answer = response_message.content
-                    self.tracer.log_step(self.active_trace_id, current_step)
-                    break               
-                # self.tracer.add_step(current_step)
-                self.tracer.log_step(self.active_trace_id, current_step)
 
-            if not final_answer:
-                final_answer = "Exceeded maximum steps without reaching a conclusion."
+            if final_answer is None:
+                # Out of steps or budget: answer from what has been gathered, without tools
+                stop_reason = stop_reason or "max_steps"
+                if stop_reason != "max_steps":
+                    logger.info("budget_exhausted", trace_id=ctx.trace_id, reason=stop_reason, step=step_count)
+                start_time = time.time()
+                limit = "step limit" if stop_reason == "max_steps" else f"{stop_reason.replace('_', ' ')} budget"
+                note = {"role": "user", "content": (
+                    f"The {limit} for this task is reached. Do not call tools. "
+                    "Write the final answer now from the information gathered so far."
+                )}
+                # Only a limit that is already used up skips it: an answer that may overrun a little beats none
+                if ctx.usage.exhausted(ctx.budget):
+                    final_answer = f"Stopped before answering: the {limit} ran out."
+                else:
+                    async with aclosing(self._complete(
+                        stream,
+                        step_count,
+                        ctx.cost,
+                        model=self.model,
+                        messages=history.messages() + [note],
+                        api_base=self.api_base,
+                        max_tokens=self._max_tokens(ctx),
+                        timeout=self._llm_timeout(ctx),
+                    )) as events:
+                        async for event in events:
+                            if event.type != "response":
+                                yield event
+                    current_step = self._record_call(ctx, step_count, event, start_time)
+                    final_answer = event.data["response"].choices[0].message.content
+                    self.tracer.log_step(ctx.trace_id, current_step)
 
         except Exception as e:
-            logger.error("agent_error", error=str(e))
             final_answer = f"An error occurred: {str(e)}"
+            if ctx.deadline is not None and ctx.deadline.expired:
+                # e.g. the LLM request's HTTP timeout, set from the deadline
+                logger.warning("agent_cancelled", trace_id=ctx.trace_id, error=str(e))
+                status = "cancelled"
+                # Raised once `finally` has closed the trace, as when the deadline scope cancels the call
+                raise ctx.deadline.exceeded() from e
+            logger.error("agent_error", error=str(e))
             status = "error"
         else:
-                status = "completed"
+            status = "completed"
         finally:
-            self.cost_tracker.end_query()
-            if self.active_trace_id:
+            self.cost_tracker.end_query(ctx.cost)
+            if ctx.trace_id:
                 self.tracer.end_trace(
-                    trace_id=self.active_trace_id,
+                    trace_id=ctx.trace_id,
                     output=str(final_answer),
                     status=status
                 )
-        return {
+        yield StreamEvent("done", step=step_count, data={
             "answer": final_answer,
-            "trace_id": self.active_trace_id,
-            "total_cost": self.cost_tracker.get_total_cost(),
-            "steps": step_count
-        }
\ No newline at end of file
+            "trace_id": ctx.trace_id,
+            "total_cost": ctx.cost.total_cost_usd,
+            "steps": step_count,
+            "stop_reason": stop_reason,
+        })
+
+    def _record_call(self, ctx: RunContext, step_count: int, event: StreamEvent, start_time: float) -> AgentStep:
+        """Account for one finished LLM call (its "response" event) and start the step it belongs to."""
+        response, timing = event.data["response"], event.data["timing"]
+        cost = event.data["cost"]
+        self.cost_tracker.add_cost(cost, ctx.cost)
+        # A cached response consumed no tokens
+        usage = {} if event.data["cached"] else response.get("usage", {})
+        current_step = AgentStep(
+            step_number=step_count,
+            reasoning=response.choices[0].message.content or "Executing tool calls...",
+            input_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            cost_usd=cost,
+            duration_ms=(time.time() - start_time) * 1000,
+            cache_hits=int(event.data["cached"]),
+        )
+        ctx.usage.add_call(current_step.input_tokens, current_step.output_tokens, cost, timing.end - timing.start)
+        timing.output_tokens = current_step.output_tokens
+        _record_timings(current_step, [timing])
+        return current_step
+
+    def _over_budget(self, ctx: RunContext, history: ConversationHistory, calls: int, tool_rounds: int = 0) -> str | None:
+        """
+        The budget limit that `calls` more LLM calls over the current history
+        (plus `tool_rounds` tool rounds) are projected to break, or None.
+        """
+        usage = ctx.usage
+        output_tokens = usage.output_tokens // usage.llm_calls if usage.llm_calls else 0
+        call_usd = 0.0
+        if ctx.budget.max_cost_usd is not None:
+            # Price-map estimate for the current history, or what calls have cost so far if that is more
+            call_usd = usage.average_call_usd()
+            try:
+                prompt_usd, completion_usd = cost_per_token(
+                    model=self.model, prompt_tokens=history.tokens, completion_tokens=output_tokens
+                )
+                call_usd = max(call_usd, prompt_usd + completion_usd)
+            except Exception:
+                pass  # model missing from the litellm price map
+        return usage.exceeds(ctx.budget, history.tokens, output_tokens, call_usd, calls=calls, tool_rounds=tool_rounds)
+
+    def _max_tokens(self, ctx: RunContext) -> int:
+        """max_tokens of the next LLM call: MAX_TOKENS_PER_CALL, capped by the output tokens left in the budget."""
+        if ctx.budget.max_output_tokens is None:
+            return MAX_TOKENS_PER_CALL
+        return min(MAX_TOKENS_PER_CALL, ctx.budget.max_output_tokens - ctx.usage.output_tokens)
+
+    @staticmethod
+    def _llm_timeout(ctx: RunContext) -> float | None:
+        """HTTP timeout of the next LLM request: the time left before the request deadline (None: litellm's)."""
+        return ctx.deadline.timeout() if ctx.deadline is not None else None
+
+    def _tool_timeout(self, ctx: RunContext) -> float | None:
+        """
+        Per-call tool timeout, shortened so that a final answer still fits
+        before the deadline; None if that leaves less than
+        MIN_TOOL_TIMEOUT_S, i.e. no time for tools.
+        """
+        remaining_s = ctx.usage.remaining_s(ctx.budget)
+        if remaining_s is None:
+            return self.tool_timeout
+        timeout = min(self.tool_timeout, remaining_s - ctx.usage.average_call_s())
+        return timeout if timeout >= min(MIN_TOOL_TIMEOUT_S, self.tool_timeout) else None
+
+    async def run_many(self, queries: list[str], concurrency: int = 8) -> list[dict]:
+        """Run `queries` on this agent with at most `concurrency` in flight; results keep the input order."""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run_one(query: str) -> dict:
+            async with semaphore:
+                return await self.run(query)
+
+        return await asyncio.gather(*(run_one(query) for query in queries))
\ No newline at end of file
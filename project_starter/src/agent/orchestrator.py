@@ -1,7 +1,152 @@
 import src.tools.search_tool
 from src.tools.registry import registry
 from src.agent.specialists import create_researcher, create_analyst, create_writer
+from src.agent.workflow import Node, NodeRun, Workflow, WorkflowError
+from src.config import Config
+from src.deadline import Deadline
+import asyncio
 import json
+import re
+import time
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from functools import partial
+from typing import AsyncIterator, Iterable
+
+import structlog
+
+logger = structlog.get_logger()
+
+STAGES = ("research", "analysis", "writing")
+
+# A name: capitalized words joined by spaces or "&" ("Saudi Arabia", "Johnson & Johnson", "Coca-Cola",
+# "iPhone 15")
+_WORD = r"\b(?:[A-Z0-9]|[a-z]+(?=[A-Z]))[\w.+#'-]*"
+_NAME = rf"{_WORD}(?:(?:\s+|\s*&\s*){_WORD})*"
+# An entity: a name, or a single lowercase word ("python vs rust for web backends")
+_ENTITY = rf"(?:{_NAME}|[\w.+#'-]+)"
+_ARTICLE = r"(?:(?:the|a|an)\s+)?"
+_VS = r"\s+(?:vs\.?|versus)\s+"
+_LIST_SEPARATOR = r"\s*,\s*(?:and\s+|or\s+)?|\s+(?:and|or|with|to|vs\.?|versus)\s+"
+# Comparison cues: without one a query is never split, so "Bonnie and Clyde" stays one topic
+_COMPARE = re.compile(r"\b(?:compar\w*|contrast\w*|differences?\s+between)\b", re.IGNORECASE)
+_VERSUS = re.compile(rf"{_ARTICLE}({_ENTITY}(?:{_VS}{_ARTICLE}{_ENTITY})+)")
+_THAN = re.compile(
+    rf"({_ENTITY})\s+(?:is\s+|are\s+)?(?:better|worse|faster|slower|cheaper|safer|bigger|smaller|larger"
+    rf"|stronger|weaker|easier|harder|(?:more|less)\s+\w+)\s+than\s+{_ARTICLE}({_ENTITY})"
+)
+# What follows a "compare" cue: "AWS, Azure and GCP"; lowercase lists only when no names are listed
+_NAME_LIST = re.compile(rf"{_ARTICLE}({_NAME}(?:(?:{_LIST_SEPARATOR}){_ARTICLE}{_NAME})+)")
+_ENTITY_LIST = re.compile(rf"{_ARTICLE}({_ENTITY}(?:(?:{_LIST_SEPARATOR}){_ARTICLE}{_ENTITY})+)")
+# Words that start a question or an instruction, not a name ("Is Coca-Cola better than Pepsi?")
+_LEADING_WORDS = {
+    "compare", "contrast", "what", "which", "how", "why", "is", "are", "does", "do", "should", "can",
+    "research", "summarize", "explain", "evaluate", "analyze", "describe", "list",
+}
+# Never an entity: a question word or pronoun there means the pattern matched something else
+_NOT_ENTITIES = _LEADING_WORDS | {"it", "this", "that", "they", "these", "those", "something", "anything"}
+
+
+def plan_research(query: str, max_branches: int = None) -> list[str]:
+    """
+    The entities a comparison question is about, one research branch each:
+    "Compare AWS, Azure and GCP pricing" gives ["AWS", "Azure", "GCP"],
+    "python vs rust for web backends" ["python", "rust"] and "Is Coca-Cola
+    better than Pepsi?" ["Coca-Cola", "Pepsi"]. Only an explicit cue
+    ("compare", "vs", "versus", "difference between", "better than")
+    splits a query. Empty when it is best researched as a whole, when it
+    names more than `max_branches` (default: Config.WORKFLOW_MAX_BRANCHES)
+    entities, or when Config.WORKFLOW_FAN_OUT is off.
+    """
+    if not Config.WORKFLOW_FAN_OUT:
+        return []
+    max_branches = max_branches or Config.WORKFLOW_MAX_BRANCHES
+    names = []
+    # Sentence by sentence; "vs." does not end one
+    for sentence in re.split(r"[?!;]|(?<!\bvs)\.\s", query):
+        if cue := _COMPARE.search(sentence):
+            after = sentence[cue.end():]
+            if match := _NAME_LIST.search(after) or _ENTITY_LIST.search(after):
+                names = re.split(_LIST_SEPARATOR, match.group(1))
+        elif match := _VERSUS.search(sentence):
+            names = re.split(_VS, match.group(1))
+        elif match := _THAN.search(sentence):
+            names = [match.group(1), match.group(2)]
+        if names:
+            break
+    names = [re.sub(r"^(?:the|a|an)\s+", "", name.strip()) for name in names]
+    if names:
+        first, _, rest = names[0].partition(" ")
+        if rest and first.lower() in _LEADING_WORDS:
+            names[0] = rest
+    names = list(dict.fromkeys(name for name in names if name))
+    if any(name.lower() in _NOT_ENTITIES for name in names):
+        return []
+    return names if 2 <= len(names) <= max_branches else []
+
+
+@dataclass
+class StageLatency:
+    """When one pipeline stage was working, in seconds from the start of the request."""
+    start_s: float | None = None  # its first agent run started
+    first_token_s: float | None = None  # its first answer token arrived
+    end_s: float | None = None  # its last agent run finished
+    busy_s: float = 0.0  # total time inside agent runs
+    runs: int = 0
+
+
+def latency_report(latency: dict[str, StageLatency], total_s: float) -> dict:
+    """
+    Per-stage latency plus the end-to-end time. "overlap_s" is the time
+    saved compared with making the same agent runs one after another (0
+    when the stages do not overlap).
+    """
+    busy_s = sum(stage.busy_s for stage in latency.values())
+    report = {name: asdict(stage) for name, stage in latency.items()}
+    report.update(total_s=total_s, overlap_s=max(busy_s - total_s, 0.0))
+    return report
+
+
+class _Segmenter:
+    """Cuts streamed text into chunks of at least `min_chars`, at paragraph, line or sentence ends."""
+    def __init__(self, min_chars: int):
+        self.min_chars = min_chars
+        self.text = ""
+
+    def feed(self, text: str) -> str | None:
+        self.text += text
+        for separator in ("\n\n", "\n", ". "):
+            cut = self.text.rfind(separator)
+            if cut >= self.min_chars:
+                cut += len(separator)
+                chunk, self.text = self.text[:cut], self.text[cut:]
+                return chunk.strip()
+        return None
+
+    def flush(self) -> str:
+        chunk, self.text = self.text.strip(), ""
+        return chunk
+
+    def reset(self):
+        self.text = ""
+
+
+async def _batches(queue: asyncio.Queue) -> AsyncIterator[tuple[list[str], bool]]:
+    """
+    Everything put on `queue` since the previous batch (waiting for at least
+    one item), and whether the producer has finished (put None).
+    """
+    while True:
+        items = [await queue.get()]
+        while not queue.empty():
+            items.append(queue.get_nowait())
+        chunks = [item for item in items if item is not None]
+        last = len(chunks) < len(items)
+        if chunks:
+            yield chunks, last
+        if last:
+            return
+
 def format_answer(answer: str) -> str:
     try:
         data = json.loads(answer.strip())
@@ -38,35 +183,243 @@ class Orchestrator:
         self.researcher = create_researcher()
         self.analyst = create_analyst()
         self.writer = create_writer()
+        # Shared by every agent run of this orchestrator, across concurrent requests
+        self.limiter = asyncio.Semaphore(Config.WORKFLOW_CONCURRENCY)
 
-    async def run(self, query: str) -> dict:
-        # Stage 1
-        research_result = await self.researcher.run(query)
-        if "Loop detected" in str(research_result.get("answer", "")):
-            return {"error": "Research failed: agent stuck in loop"}
-        if "error" in research_result:
-            return {"error": f"Research failed: {research_result['error']}"}
-
-        # Stage 2
-        analysis_result = await self.analyst.run(
-            f"Analyze these findings: {research_result['answer']}"
-        )
-        if "error" in analysis_result:
-            return {"error": f"Analysis failed: {analysis_result['error']}"}
+    async def run(self, query: str, deadline: Deadline = None, pipelined: bool = None) -> dict:
+        """
+        Run the research -> analysis -> writing pipeline. Comparison and
+        multi-entity questions fan out into one research branch per entity
+        (see `plan_research`), run concurrently and merged for the analyst.
+        At most Config.WORKFLOW_CONCURRENCY agent runs go at a time. With a
+        request `deadline`, every stage's LLM and tool calls are bounded by
+        it and cancelled when it passes (DeadlineExceeded is raised).
 
-        # Stage 3
-        writing_result = await self.writer.run(
-            f"Write a report based on: {analysis_result['answer']}"
-        )
-        if "error" in writing_result:
-            return {"error": f"Writing failed: {writing_result['error']}"}
+        `pipelined` (default: Config.ORCHESTRATOR_PIPELINED) overlaps the
+        stages, see `_run_pipelined`. Either way the result's "latency" has
+        each stage's timings and the end-to-end time.
+        """
+        if pipelined is None:
+            pipelined = Config.ORCHESTRATOR_PIPELINED
+        run = self._run_pipelined if pipelined else self._run
+        if deadline is None:
+            return await run(query)
+        async with deadline.scope():
+            return await run(query)
 
-        total_cost = (
-            research_result.get("cost", 0.0) +
-            analysis_result.get("cost", 0.0) +
-            writing_result.get("cost", 0.0)
+    async def _run(self, query: str) -> dict:
+        # Agents pick up the current deadline themselves
+        start = time.perf_counter()
+        topics = plan_research(query)
+        prompts = self._research_prompts(query, topics)
+        research = [f"research_{i}" for i in range(len(prompts))]
+        workflow = Workflow([
+            # Stage 1, fanned out: the branches run concurrently
+            *(Node(name, self.researcher, prompt=lambda inputs, prompt=prompt: prompt,
+                   check=partial(self._stage_error, "Research"))
+              for name, prompt in zip(research, prompts)),
+            # Stage 2 fans in every branch's findings
+            Node("analysis", self.analyst, after=tuple(research),
+                 prompt=lambda inputs: "Analyze these findings: "
+                 + self._fan_in(topics, [inputs[name] for name in research])["answer"],
+                 check=partial(self._stage_error, "Analysis")),
+            # Stage 3
+            Node("writing", self.writer, after=("analysis",),
+                 prompt=lambda inputs: f"Write a report based on: {inputs['analysis']['answer']}",
+                 check=partial(self._stage_error, "Writing")),
+        ], limiter=self.limiter)
+        try:
+            runs = await workflow.run()
+        except WorkflowError as e:
+            return {"error": str(e)}
+
+        latency = {
+            "research": self._stage_latency(runs[name] for name in research),
+            "analysis": self._stage_latency([runs["analysis"]]),
+            "writing": self._stage_latency([runs["writing"]]),
+        }
+        research_result = self._fan_in(topics, [runs[name].result for name in research])
+        return self._result(research_result, runs["analysis"].result, runs["writing"].result,
+                            latency, start, pipelined=False)
+
+    async def _run_pipelined(self, query: str) -> dict:
+        """
+        The same three stages, overlapped. The researcher's answer (each
+        branch's, labelled, for a fanned-out query) streams into the analyst in chunks of about Config.PIPELINE_CHUNK_CHARS
+        characters; the analyst analyzes whatever findings have arrived while
+        the research goes on, and streams its analysis on to the writer in
+        the same way. The writer drafts from the analysis so far, and once the
+        analysis is complete, reconciles: it writes the final answer from the
+        complete analysis, revising its latest draft, unless that draft
+        already covered all of it.
+
+        End-to-end latency drops by the time the later stages spent working
+        during earlier ones; the price is extra (partial) analyst and writer
+        calls.
+        """
+        start = time.perf_counter()
+        latency = {stage: StageLatency() for stage in STAGES}
+        findings, analyses = asyncio.Queue(), asyncio.Queue()
+
+        async with asyncio.TaskGroup() as group:
+            analysis_task = group.create_task(self._analyze(findings, analyses, latency["analysis"], start))
+            writing_task = group.create_task(self._write(analyses, latency["writing"], start))
+
+            topics = plan_research(query)
+            branches = await asyncio.gather(*(
+                self._stream_stage(self.researcher, prompt, findings, latency["research"], start, label=topic)
+                for prompt, topic in zip(self._research_prompts(query, topics), topics or [None])
+            ))
+            findings.put_nowait(None)
+            error = next(filter(None, (self._stage_error("Research", branch) for branch in branches)), None)
+            research_result = self._fan_in(topics, branches)
+            if error:
+                analysis_task.cancel()
+                writing_task.cancel()
+                return {"error": error}
+
+            analysis_result = await analysis_task
+            error = self._stage_error("Analysis", analysis_result)
+            if error:
+                writing_task.cancel()
+                return {"error": error}
+
+            writing_result = await writing_task
+            error = self._stage_error("Writing", writing_result)
+            if error:
+                return {"error": error}
+
+        return self._result(research_result, analysis_result, writing_result, latency, start, pipelined=True)
+
+    async def _analyze(self, findings: asyncio.Queue, analyses: asyncio.Queue, latency: StageLatency, start: float) -> dict:
+        """Analyze each batch of findings as it arrives; the analysis is the batches' analyses in order."""
+        answers, cost = [], 0.0
+        async for chunks, last in _batches(findings):
+            more = "" if last else " (part of the research; more may follow)"
+            result = await self._stream_stage(
+                self.analyst, f"Analyze these findings{more}: " + "\n\n".join(chunks), analyses, latency, start
+            )
+            answers.append(result["answer"] or "")
+            cost += result.get("total_cost", 0.0)
+        analyses.put_nowait(None)
+        return {"answer": "\n\n".join(answers), "total_cost": cost, "runs": latency.runs}
+
+    async def _write(self, analyses: asyncio.Queue, latency: StageLatency, start: float) -> dict:
+        """Draft from the analysis so far whenever more arrives, then reconcile once it is complete."""
+        received, draft, cost = [], None, 0.0
+        drafting = None
+        try:
+            async for chunks, last in _batches(analyses):
+                received.extend(chunks)
+                if drafting is not None and drafting.done():
+                    draft = drafting.result()["answer"]
+                    cost += drafting.result().get("total_cost", 0.0)
+                    drafting = None
+                prompt = "Write a report based on: " + "\n\n".join(received)
+                if not last:
+                    if drafting is None:
+                        drafting = asyncio.create_task(self._stream_stage(self.writer, prompt, None, latency, start))
+                    continue
+                if drafting is not None:
+                    # Stale now: reconcile from the last finished draft instead of waiting for it
+                    drafting.cancel()
+                    await asyncio.wait([drafting])
+                if draft is not None:
+                    prompt += (
+                        "\n\nRevise this draft, written from part of the analysis above, "
+                        f"into the final answer: {draft}"
+                    )
+                result = await self._stream_stage(self.writer, prompt, None, latency, start)
+                draft = result["answer"]
+                cost += result.get("total_cost", 0.0)
+        finally:
+            if drafting is not None:
+                drafting.cancel()  # e.g. the whole pipeline was cancelled
+        return {"answer": draft or "", "total_cost": cost, "runs": latency.runs}
+
+    async def _stream_stage(self, agent, prompt: str, outbox: asyncio.Queue | None, latency: StageLatency,
+                            start: float, label: str = None) -> dict:
+        """One streamed agent run; its answer goes to `outbox` in chunks (prefixed with `label`) as it is generated."""
+        async with self.limiter:
+            return await self._stream_run(agent, prompt, outbox, latency, start, label)
+
+    @staticmethod
+    async def _stream_run(agent, prompt: str, outbox: asyncio.Queue | None, latency: StageLatency,
+                          start: float, label: str | None) -> dict:
+        prefix = f"[{label}] " if label else ""
+        run_start = time.perf_counter()
+        if latency.start_s is None:
+            latency.start_s = run_start - start
+        segmenter = _Segmenter(Config.PIPELINE_CHUNK_CHARS)
+        result = {}
+        try:
+            async with aclosing(agent.stream(prompt)) as events:
+                async for event in events:
+                    if event.type == "token" and event.content:
+                        if latency.first_token_s is None:
+                            latency.first_token_s = time.perf_counter() - start
+                        chunk = segmenter.feed(event.content)
+                        if chunk and outbox is not None:
+                            outbox.put_nowait(prefix + chunk)
+                    elif event.type == "tool_call":
+                        # Text before a tool call is not part of the answer
+                        segmenter.reset()
+                    elif event.type == "done":
+                        result = event.data
+            chunk = segmenter.flush()
+            if chunk and outbox is not None:
+                outbox.put_nowait(prefix + chunk)
+        finally:
+            # Cancelled runs count too: they kept the stage busy
+            end = time.perf_counter()
+            latency.busy_s += end - run_start
+            latency.end_s = end - start
+            latency.runs += 1
+        return result
+
+    @staticmethod
+    def _research_prompts(query: str, topics: list[str]) -> list[str]:
+        if not topics:
+            return [query]
+        return [f"Research {topic} for this question: {query}" for topic in topics]
+
+    @staticmethod
+    def _fan_in(topics: list[str], results: list[dict]) -> dict:
+        """The research branches' results as one, each answer under its topic."""
+        if len(results) == 1:
+            return results[0]
+        return {
+            "answer": "\n\n".join(f"## {topic}\n{result['answer']}" for topic, result in zip(topics, results)),
+            "total_cost": sum(result.get("total_cost", 0.0) for result in results),
+        }
+
+    @staticmethod
+    def _stage_latency(runs: Iterable[NodeRun]) -> StageLatency:
+        runs = list(runs)
+        return StageLatency(
+            start_s=min(run.start_s for run in runs),
+            end_s=max(run.end_s for run in runs),
+            busy_s=sum(run.end_s - run.start_s for run in runs),
+            runs=len(runs),
         )
 
+    @staticmethod
+    def _stage_error(stage: str, result: dict) -> str | None:
+        if stage == "Research" and "Loop detected" in str(result.get("answer", "")):
+            return "Research failed: agent stuck in loop"
+        if "error" in result:
+            return f"{stage} failed: {result['error']}"
+        return None
+
+    @staticmethod
+    def _result(research_result: dict, analysis_result: dict, writing_result: dict,
+                latency: dict[str, StageLatency], start: float, pipelined: bool) -> dict:
+        report = latency_report(latency, time.perf_counter() - start)
+        logger.info("orchestrator_latency", pipelined=pipelined, total_s=round(report["total_s"], 3),
+                    overlap_s=round(report["overlap_s"], 3),
+                    **{f"{stage}_s": round(report[stage]["busy_s"], 3) for stage in STAGES})
+        # Agents report their cost as "total_cost"
+        total_cost = sum(result.get("total_cost", 0.0) for result in (research_result, analysis_result, writing_result))
         return {
             "answer": format_answer(writing_result["answer"]),
             "cost": total_cost,
@@ -74,7 +427,8 @@ class Orchestrator:
                 "research": research_result["answer"],
                 "analysis": analysis_result["answer"],
                 "writing": writing_result["answer"],
-            }
+            },
+            "latency": report,
         }
         
     async def run_with_retry(self, agent, query, retries=2):
@@ -0,0 +1,271 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import numpy as np
+from litellm import ModelResponse
+
+from src.config import Config
+from src.tools.registry import schema_hash
+
+# Request fields that never change the response
+_TRANSPORT_PARAMS = ("messages", "tools", "api_base", "api_key", "stream", "stream_options", "timeout")
+
+
+def _message_fields(message) -> dict:
+    # Messages are dicts or litellm Message objects; keep only what the model sees
+    if not isinstance(message, dict):
+        message = message.model_dump()
+    fields = {key: message[key] for key in ("role", "content", "name", "tool_call_id") if message.get(key)}
+    if message.get("tool_calls"):
+        fields["tool_calls"] = [
+            {"id": call["id"], "name": call["function"]["name"], "arguments": call["function"]["arguments"]}
+            for call in message["tool_calls"]
+        ]
+    return fields
+
+
+def _has_tool_calls(response: ModelResponse) -> bool:
+    return any(choice.message.tool_calls for choice in response.choices)
+
+
+@dataclass
+class CacheLookup:
+    """Result of `ResponseCache.lookup`; pass it back to `store` after a miss."""
+    key: str
+    scope: str
+    embedding: np.ndarray | None = None
+    response: ModelResponse | None = None
+    cost_usd: float = 0.0  # what the cached call originally cost
+    tier: str | None = None  # "exact" or "semantic" on a hit
+
+    @property
+    def hit(self) -> bool:
+        return self.response is not None
+
+
+class ResponseCache:
+    """
+    On-disk cache of LLM responses, consulted before every acompletion call.
+
+    The exact tier keys a response by a SHA-256 of (model, messages, tool
+    schema hash, remaining request params). With an `embed_fn`, a semantic
+    tier also serves requests whose user messages are close to a cached
+    prompt: cosine similarity at least `similarity_threshold`, within the
+    same scope (model, tools, params and system prompt). It only applies to
+    conversations that have no assistant or tool turns yet, so a cached
+    answer is never reused across different tool results, and only serves
+    answers, never tool calls (their arguments were written for the other
+    prompt).
+
+    Entries expire `ttl_s` seconds after they were stored; past
+    `max_entries` the least recently used ones are evicted. Rows live in
+    SQLite like the embedding cache.
+    """
+    def __init__(
+        self,
+        path: str,
+        ttl_s: float = 3600,
+        max_entries: int = 10_000,
+        embed_fn: Callable[[list[str]], np.ndarray] = None,
+        similarity_threshold: float = 0.95,
+    ):
+        self.path = path
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " scope TEXT NOT NULL,"
+            " response TEXT NOT NULL,"
+            " cost_usd REAL NOT NULL,"
+            " embedding BLOB,"
+            " created REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses(last_used)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses(scope)")
+        self._conn.commit()
+        # scope -> (keys, unit embeddings), loaded from disk on first semantic lookup in that scope
+        self._semantic: dict[str, tuple[list[str], np.ndarray]] = {}
+
+    @staticmethod
+    def make_keys(params: dict, tools_hash: str = None) -> tuple[str, str, str | None]:
+        """
+        (exact key, semantic scope, prompt text or None when the semantic tier
+        does not apply). `tools_hash` saves hashing `params["tools"]` again when
+        the caller has `toolset_hash` of the tools at hand; both give the same key.
+        """
+        messages = [_message_fields(message) for message in params["messages"]]
+        settings = {key: value for key, value in params.items() if key not in _TRANSPORT_PARAMS}
+        tools = tools_hash or schema_hash([schema_hash(tool) for tool in params.get("tools") or []])
+        system = [m for m in messages if m["role"] == "system"]
+
+        def digest(payload) -> str:
+            text = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+            return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+        key = digest({"settings": settings, "tools": tools, "messages": messages})
+        scope = digest({"settings": settings, "tools": tools, "system": system})
+        prompt = None
+        if all(m["role"] in ("system", "user") for m in messages):
+            prompt = "\n".join(m.get("content", "") for m in messages if m["role"] == "user")
+        return key, scope, prompt
+
+    def lookup(self, params: dict, tools_hash: str = None) -> CacheLookup:
+        """Find a cached response for the acompletion keyword arguments `params` (see `make_keys`)."""
+        key, scope, prompt = self.make_keys(params, tools_hash)
+        lookup = CacheLookup(key=key, scope=scope)
+        with self._lock:
+            if self._fetch(lookup, key):
+                lookup.tier = "exact"
+                self.hits += 1
+                return lookup
+
+        if self.embed_fn is not None and prompt:
+            embedding = np.asarray(self.embed_fn([prompt])[0], dtype="float32")
+            lookup.embedding = embedding / max(float(np.linalg.norm(embedding)), 1e-12)
+            with self._lock:
+                for match in self._neighbours(scope, lookup.embedding):
+                    if not self._fetch(lookup, match):
+                        # Expired, or removed by another process sharing the file
+                        self._forget(scope, {match})
+                        continue
+                    if not _has_tool_calls(lookup.response):
+                        lookup.tier = "semantic"
+                        self.hits += 1
+                        self.semantic_hits += 1
+                        return lookup
+                    # Stored before tool calls were kept out of the semantic tier
+                    lookup.response, lookup.cost_usd = None, 0.0
+        with self._lock:
+            self.misses += 1
+        return lookup
+
+    def _fetch(self, lookup: CacheLookup, key: str) -> bool:
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT response, cost_usd, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False
+        if now - row[2] > self.ttl_s:
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._conn.commit()
+            return False
+        self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+        self._conn.commit()
+        lookup.response = ModelResponse(**json.loads(row[0]))
+        lookup.cost_usd = row[1]
+        return True
+
+    def _neighbours(self, scope: str, embedding: np.ndarray) -> list[str]:
+        """Keys in `scope` at least `similarity_threshold` similar to `embedding`, most similar first."""
+        if scope not in self._semantic:
+            rows = self._conn.execute(
+                "SELECT key, embedding FROM responses WHERE scope = ? AND embedding IS NOT NULL", (scope,)
+            ).fetchall()
+            vectors = [np.frombuffer(blob, dtype="float32") for _, blob in rows]
+            self._semantic[scope] = (
+                [key for key, _ in rows],
+                np.vstack(vectors) if vectors else np.empty((0, len(embedding)), dtype="float32"),
+            )
+        keys, vectors = self._semantic[scope]
+        if not keys:
+            return []
+        similarities = vectors @ embedding
+        order = np.argsort(-similarities, kind="stable")
+        return [keys[i] for i in order if similarities[i] >= self.similarity_threshold]
+
+    def _forget(self, scope: str, keys: set[str]):
+        """Drop `keys` from the in-memory embeddings of `scope` (if loaded)."""
+        if scope not in self._semantic:
+            return
+        scope_keys, vectors = self._semantic[scope]
+        keep = [i for i, key in enumerate(scope_keys) if key not in keys]
+        self._semantic[scope] = ([scope_keys[i] for i in keep], vectors[keep])
+
+    def store(self, lookup: CacheLookup, response: ModelResponse, cost_usd: float):
+        """Cache `response` (which cost `cost_usd`) under a missed `lookup`."""
+        if not response.choices:
+            return
+        now = time.time()
+        # Tool calls are only replayed for the exact same request
+        semantic = lookup.embedding is not None and not _has_tool_calls(response)
+        embedding = lookup.embedding.tobytes() if semantic else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, scope, response, cost_usd, embedding, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (lookup.key, lookup.scope, response.model_dump_json(), cost_usd, embedding, now, now),
+            )
+            if semantic and lookup.scope in self._semantic:
+                keys, vectors = self._semantic[lookup.scope]
+                self._semantic[lookup.scope] = (keys + [lookup.key], np.vstack([vectors, lookup.embedding]))
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        evicted = self._conn.execute(
+            "SELECT key, scope FROM responses WHERE created < ?", (now - self.ttl_s,)
+        ).fetchall()
+        self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_s,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            least_used = self._conn.execute(
+                "SELECT key, scope FROM responses ORDER BY last_used ASC LIMIT ?", (overflow,)
+            ).fetchall()
+            self._conn.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key, _ in least_used])
+            evicted += least_used
+        # Keep the in-memory embeddings in step, or they grow without bound
+        for scope in {scope for _, scope in evicted} & self._semantic.keys():
+            self._forget(scope, {key for key, key_scope in evicted if key_scope == scope})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_response_cache: ResponseCache | None = None
+
+
+def get_response_cache() -> ResponseCache | None:
+    """The shared response cache from Config (None when LLM_CACHE_PATH is empty), built on first use."""
+    global _response_cache
+    if _response_cache is None and Config.LLM_CACHE_PATH:
+        embed_fn = None
+        if Config.LLM_CACHE_SEMANTIC_THRESHOLD > 0:
+            from src.retrieval.embedding_backends import create_backend
+            from src.retrieval.embeddings import BatchEmbedder
+            embed_fn = BatchEmbedder(backend=create_backend()).embed
+        _response_cache = ResponseCache(
+            Config.LLM_CACHE_PATH,
+            ttl_s=Config.LLM_CACHE_TTL_S,
+            max_entries=Config.LLM_CACHE_MAX_ENTRIES,
+            embed_fn=embed_fn,
+            similarity_threshold=Config.LLM_CACHE_SEMANTIC_THRESHOLD,
+        )
+    return _response_cache
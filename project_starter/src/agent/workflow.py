@@ -0,0 +1,113 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable
+
+import structlog
+
+from src.config import Config
+
+logger = structlog.get_logger()
+
+
+class WorkflowError(Exception):
+    """A node's result failed its check; the nodes still running were cancelled."""
+    def __init__(self, node: str, message: str):
+        super().__init__(message)
+        self.node = node
+
+
+@dataclass
+class Node:
+    """
+    One specialist run in a Workflow: `agent.run(prompt(inputs))`, where
+    `inputs` maps each node named in `after` to its result dict (the edges
+    carry whole results). `check` returns an error message for a result
+    that should stop the workflow.
+    """
+    name: str
+    agent: Any  # anything with `async run(prompt) -> dict`, usually an ObservableAgent
+    prompt: Callable[[dict[str, dict]], str]
+    after: tuple[str, ...] = ()
+    check: Callable[[dict], str | None] | None = None
+
+
+@dataclass
+class NodeRun:
+    """A finished node: its result, and its timings in seconds from the start of the workflow."""
+    result: dict
+    ready_s: float  # its inputs were complete
+    start_s: float  # it got a concurrency slot
+    end_s: float
+
+
+class Workflow:
+    """
+    A DAG of agent runs. Each node starts as soon as every node it depends
+    on has finished, so independent nodes (e.g. the research branches of a
+    comparison) run concurrently, at most `limiter`'s value at a time
+    across all workflows sharing it (default: a new limiter of
+    Config.WORKFLOW_CONCURRENCY). A failed check cancels the nodes still
+    running and raises WorkflowError.
+    """
+    def __init__(self, nodes: list[Node], limiter: asyncio.Semaphore = None):
+        self.nodes: dict[str, Node] = {}
+        for node in nodes:
+            if node.name in self.nodes:
+                raise ValueError(f"Duplicate workflow node {node.name!r}")
+            self.nodes[node.name] = node
+        for node in nodes:
+            for dependency in node.after:
+                if dependency not in self.nodes:
+                    raise ValueError(f"Node {node.name!r} depends on unknown node {dependency!r}")
+        self.order = self._topological_order()
+        self.limiter = limiter if limiter is not None else asyncio.Semaphore(Config.WORKFLOW_CONCURRENCY)
+
+    def _topological_order(self) -> list[str]:
+        # Kahn's algorithm; nodes left over are on a cycle
+        waiting_on = {name: len(node.after) for name, node in self.nodes.items()}
+        dependents = {name: [] for name in self.nodes}
+        for node in self.nodes.values():
+            for dependency in node.after:
+                dependents[dependency].append(node.name)
+        ready = deque(name for name, count in waiting_on.items() if count == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in dependents[name]:
+                waiting_on[dependent] -= 1
+                if waiting_on[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) < len(self.nodes):
+            raise ValueError("Workflow has a cycle through " + ", ".join(sorted(set(self.nodes) - set(order))))
+        return order
+
+    async def run(self) -> dict[str, NodeRun]:
+        """Run every node; returns their runs by name."""
+        start = time.perf_counter()
+        tasks: dict[str, asyncio.Task] = {}
+        try:
+            async with asyncio.TaskGroup() as group:
+                # In topological order, so the tasks a node waits for already exist
+                for name in self.order:
+                    tasks[name] = group.create_task(self._run_node(self.nodes[name], tasks, start))
+        except ExceptionGroup as errors:
+            raise errors.exceptions[0]
+        return {name: task.result() for name, task in tasks.items()}
+
+    async def _run_node(self, node: Node, tasks: dict[str, asyncio.Task], start: float) -> NodeRun:
+        inputs = {dependency: (await tasks[dependency]).result for dependency in node.after}
+        ready = time.perf_counter()
+        # The slot is taken only once the inputs are there, so waiting nodes never block running ones
+        async with self.limiter:
+            run_start = time.perf_counter()
+            result = await node.agent.run(node.prompt(inputs))
+        end = time.perf_counter()
+        logger.info("workflow_node_done", node=node.name, waited_s=round(run_start - ready, 3),
+                    duration_s=round(end - run_start, 3))
+        error = node.check(result) if node.check is not None else None
+        if error:
+            raise WorkflowError(node.name, error)
+        return NodeRun(result=result, ready_s=ready - start, start_s=run_start - start, end_s=end - start)
@@ -5,5 +5,76 @@ load_dotenv()
 
 class Config:
     OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+    OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
     MODEL_NAME = os.getenv("MODEL_NAME", "openrouter/stepfun/step-3.5-flash:free")
+
+    # Deadline of one request in src.main (seconds, 0 = none); work still running then is cancelled
+    REQUEST_TIMEOUT_S = float(os.getenv("REQUEST_TIMEOUT_S", "300"))
+
+    # Orchestrator: overlap research, analysis and writing, handing text on in chunks of about this many characters
+    ORCHESTRATOR_PIPELINED = os.getenv("ORCHESTRATOR_PIPELINED", "false").lower() == "true"
+    PIPELINE_CHUNK_CHARS = int(os.getenv("PIPELINE_CHUNK_CHARS", "400"))
+    # At most this many agent runs at a time per orchestrator
+    WORKFLOW_CONCURRENCY = int(os.getenv("WORKFLOW_CONCURRENCY", "4"))
+    # Comparison questions ("X vs Y") fan out to one research run per entity, up to WORKFLOW_MAX_BRANCHES
+    WORKFLOW_FAN_OUT = os.getenv("WORKFLOW_FAN_OUT", "true").lower() == "true"
+    WORKFLOW_MAX_BRANCHES = int(os.getenv("WORKFLOW_MAX_BRANCHES", "4"))
+
+    # Agent tools: a call taking longer than this (seconds) is reported to the model as an error
+    TOOL_TIMEOUT_S = float(os.getenv("TOOL_TIMEOUT_S", "30"))
+    # Agent history: older tool outputs are compacted to keep prompts under AGENT_CONTEXT_TOKENS
+    AGENT_CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "8000"))
+    AGENT_KEEP_RECENT_TURNS = int(os.getenv("AGENT_KEEP_RECENT_TURNS", "2"))
+    AGENT_COMPACT_TOOL_TOKENS = int(os.getenv("AGENT_COMPACT_TOOL_TOKENS", "256"))
+    # Default per-run budget (0 = unlimited); a run about to exceed it stops calling tools and answers
+    AGENT_DEADLINE_S = float(os.getenv("AGENT_DEADLINE_S", "0"))
+    AGENT_MAX_INPUT_TOKENS = int(os.getenv("AGENT_MAX_INPUT_TOKENS", "0"))
+    AGENT_MAX_OUTPUT_TOKENS = int(os.getenv("AGENT_MAX_OUTPUT_TOKENS", "0"))
+    AGENT_MAX_COST_USD = float(os.getenv("AGENT_MAX_COST_USD", "0"))
+
+    # LLM response cache, off unless LLM_CACHE_PATH is set (e.g. ".cache/llm_responses.sqlite")
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+    LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+    # Serve prompts at least this similar (cosine, EMBEDDING_BACKEND embeddings) to a cached one; 0 disables
+    LLM_CACHE_SEMANTIC_THRESHOLD = float(os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "0"))
+
+    # Embeddings
+    # Backend: "openai" (the API below) or "hashing" (local and deterministic, for offline benchmarks and tests)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+    EMBEDDING_HASHING_DIMENSION = int(os.getenv("EMBEDDING_HASHING_DIMENSION", "384"))
+    EMBEDDING_HASHING_SEED = int(os.getenv("EMBEDDING_HASHING_SEED", "0"))
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "openai/text-embedding-3-small")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "128"))
+    EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+    # Set EMBEDDING_CACHE_PATH to an empty string to disable the on-disk cache
+    EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+    # RAG index
+    RAG_INDEX_DIR = os.getenv("RAG_INDEX_DIR", ".cache/rag_index")
+    # Index type: flat, hnsw, ivf_flat or ivf_pq (see src/retrieval/vector_index.py)
+    RAG_INDEX_TYPE = os.getenv("RAG_INDEX_TYPE", "flat")
+    RAG_INDEX_NLIST = int(os.getenv("RAG_INDEX_NLIST", "1024"))
+    RAG_INDEX_NPROBE = int(os.getenv("RAG_INDEX_NPROBE", "16"))
+    RAG_INDEX_EF_SEARCH = int(os.getenv("RAG_INDEX_EF_SEARCH", "64"))
+    # First-pass codes: none, int8 or binary; candidates are rescored against float16 originals
+    RAG_INDEX_QUANTIZATION = os.getenv("RAG_INDEX_QUANTIZATION", "none")
+    RAG_INDEX_RESCORE_FACTOR = int(os.getenv("RAG_INDEX_RESCORE_FACTOR", "4"))
+    # Matryoshka truncation: index the first N embedding dimensions (0 = all), optionally reranking at full size
+    RAG_INDEX_DIMENSION = int(os.getenv("RAG_INDEX_DIMENSION", "0"))
+    RAG_INDEX_FULL_RERANK = os.getenv("RAG_INDEX_FULL_RERANK", "false").lower() == "true"
+    INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))
+    # Chunker: "recursive" (300 characters, 50 overlap) or "token" (sizes in TOKENIZER_ENCODING tokens)
+    RAG_CHUNKER = os.getenv("RAG_CHUNKER", "recursive")
+    RAG_CHUNK_TOKENS = int(os.getenv("RAG_CHUNK_TOKENS", "256"))
+    RAG_CHUNK_OVERLAP_TOKENS = int(os.getenv("RAG_CHUNK_OVERLAP_TOKENS", "32"))
+    TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "cl100k_base")
+    # Chunks at least this similar (MinHash Jaccard) to an indexed chunk are not embedded; 0 disables
+    RAG_DEDUP_THRESHOLD = float(os.getenv("RAG_DEDUP_THRESHOLD", "0.9"))
+    # Retrieval: "hybrid" fuses BM25 and vector results with weighted RRF, "vector" skips BM25
+    RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "hybrid")
+    RAG_KEYWORD_WEIGHT = float(os.getenv("RAG_KEYWORD_WEIGHT", "1.0"))
+    RAG_VECTOR_WEIGHT = float(os.getenv("RAG_VECTOR_WEIGHT", "1.0"))
+    RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
     # Add other configuration as needed
@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+class DeadlineExceeded(TimeoutError):
+    """A request ran out of time, or was cancelled, before it finished."""
+
+
+_current: contextvars.ContextVar["Deadline | None"] = contextvars.ContextVar("deadline", default=None)
+
+
+class Deadline:
+    """
+    The point in time by which one request must be done, shared by all the
+    work done for it (orchestrator, agents, LLM calls and tools).
+
+    `scope()` enforces it: awaits inside the scope are cancelled when it
+    passes, or as soon as `cancel()` is called (e.g. because the client went
+    away), and the scope then raises DeadlineExceeded. The deadline is also
+    the current one inside the scope (`Deadline.current()`), and the tool
+    registry carries that into thread-pool tools, so blocking code that
+    cannot be cancelled can at least bound its own I/O with `timeout()`.
+    """
+    def __init__(self, timeout_s: float | None = None):
+        self.expires_at = None if timeout_s is None else time.monotonic() + timeout_s
+        self.cancelled = False
+        self._timeouts: list[asyncio.Timeout] = []
+
+    @staticmethod
+    def current() -> "Deadline | None":
+        """The deadline of the enclosing `scope()`, if any."""
+        return _current.get()
+
+    def remaining(self) -> float | None:
+        """Seconds left (0 once expired or cancelled), or None without a time limit."""
+        if self.cancelled:
+            return 0.0
+        if self.expires_at is None:
+            return None
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() == 0.0
+
+    def timeout(self, default: float | None = None) -> float | None:
+        """A timeout for one blocking call: `default`, shortened to the time left."""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        # Never 0: HTTP clients treat that as "no timeout" or reject it
+        remaining = max(remaining, 0.001)
+        return remaining if default is None else min(default, remaining)
+
+    def exceeded(self) -> DeadlineExceeded:
+        """The error to raise for work stopped by this deadline."""
+        return DeadlineExceeded("request cancelled" if self.cancelled else "request deadline exceeded")
+
+    def cancel(self):
+        """Expire the deadline now, cancelling whatever its scopes are awaiting (call it on the event loop)."""
+        self.cancelled = True
+        for timeout in self._timeouts:
+            timeout.reschedule(asyncio.get_running_loop().time())
+
+    @asynccontextmanager
+    async def scope(self) -> AsyncIterator["Deadline"]:
+        """Make this the current deadline and enforce it on the enclosed awaits."""
+        if _current.get() is self:
+            # Already enforced by an outer scope of the same request
+            yield self
+            return
+        remaining = self.remaining()
+        loop = asyncio.get_running_loop()
+        token = _current.set(self)
+        timeout = None
+        try:
+            async with asyncio.timeout_at(None if remaining is None else loop.time() + remaining) as timeout:
+                self._timeouts.append(timeout)
+                try:
+                    yield self
+                finally:
+                    self._timeouts.remove(timeout)
+        except TimeoutError as e:
+            if timeout is None or not timeout.expired():
+                raise  # a timeout of the enclosed code, not ours
+            raise self.exceeded() from e
+        finally:
+            _current.reset(token)
+
+
+def request_timeout(default: float | None = None) -> float | None:
+    """`default` shortened to the time left on the current deadline (for HTTP and other blocking calls)."""
+    deadline = Deadline.current()
+    return default if deadline is None else deadline.timeout(default)
@@ -1,10 +1,13 @@
 import asyncio
 #import os
+import signal
 import sys
 
 from dotenv import load_dotenv
 
 from src.agent.orchestrator import Orchestrator
+from src.config import Config
+from src.deadline import Deadline, DeadlineExceeded
 from src.observability.tracer import tracer # TODO: Unleash the tracer
 from src.observability.cost_tracker import CostTracker
 import litellm
@@ -32,9 +35,18 @@ async def main():
     trace_id = tracer.start_trace(agent_name="MainAgent", query=query)
     cost_tracker.start_query(query)
 
+    # One deadline for the whole request; Ctrl+C or SIGTERM cancels the work still in flight
+    deadline = Deadline(Config.REQUEST_TIMEOUT_S or None)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, deadline.cancel)
+        except NotImplementedError:
+            pass  # Windows: Ctrl+C still interrupts, without the cancelled trace
+
     try:
         orchestrator = Orchestrator()
-        result = await orchestrator.run(query)
+        result = await orchestrator.run(query, deadline=deadline)
 
         if "error" in result:
             print(f"Failed: {result['error']}")
@@ -45,6 +57,9 @@ async def main():
             tracer._traces[trace_id].total_duration_ms = (time.time() - start_time) * 1000
             tracer.end_trace(trace_id, output=result["answer"], status="completed")
 
+    except DeadlineExceeded as e:
+        tracer.end_trace(trace_id, output="", status="cancelled")
+        print(f"Cancelled: {e}")
     except Exception as e:
         tracer.end_trace(trace_id, output="", status="failed")
         print(f"Error: {e}")
@@ -21,6 +21,9 @@ class QueryCost:
     total_cost_usd: float = 0.0
     total_input_tokens: int = 0
     total_output_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_saved_usd: float = 0.0
 
     def add_step(self, step: StepCost):
         self.steps.append(step)
@@ -35,18 +38,40 @@ class CostTracker:
     def __init__(self):
         self.queries: list[QueryCost] = []
         self._current_query: QueryCost | None = None
+        # LLM response cache lookups across all queries
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_saved_usd = 0.0
 
-    def start_query(self, query: str):
+    def start_query(self, query: str) -> QueryCost:
         self._current_query = QueryCost(query=query)
-    
-    def add_cost(self, cost: float):
-        """Add cost manually (used by Agent)."""
-        if self._current_query:
+        return self._current_query
+
+    def add_cost(self, cost: float, query: QueryCost | None = None):
+        """
+        Add cost manually (used by Agent).
+
+        Concurrent runs each pass their own `query` (see ObservableAgent);
+        without one the cost goes to the current query.
+        """
+        if query is not None:
+            query.total_cost_usd += cost
+        elif self._current_query:
             self._current_query.total_cost_usd += cost
         else:
             self.start_query("unknown_query")
             self._current_query.total_cost_usd += cost 
             
+    def record_cache(self, hit: bool, saved_usd: float = 0.0, query: QueryCost | None = None):
+        """Count one LLM response cache lookup; a hit saves what the cached call originally cost."""
+        query = query or self._current_query
+        for counts in (self, query) if query is not None else (self,):
+            if hit:
+                counts.cache_hits += 1
+                counts.cache_saved_usd += saved_usd
+            else:
+                counts.cache_misses += 1
+
     def get_total_cost(self) -> float:
         """Get current total cost (used by Agent)."""
         if self._current_query:
@@ -78,8 +103,12 @@ class CostTracker:
         is_tool_call=is_tool_call)
         self._current_query.add_step_cost(step_cost)
 
-    def end_query(self):
-        if self._current_query:
+    def end_query(self, query: QueryCost | None = None):
+        if query is not None:
+            self.queries.append(query)
+            if query is self._current_query:
+                self._current_query = None
+        elif self._current_query:
             self.queries.append(self._current_query)
             self._current_query = None
 
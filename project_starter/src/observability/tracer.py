@@ -25,6 +25,12 @@ class AgentStep:
     cost_usd: float = 0.0
     duration_ms: float = 0.0
     timestamp: float = field(default_factory=time.time)
+    # Streamed LLM calls only (see ObservableAgent.stream)
+    ttft_ms: Optional[float] = None
+    tokens_per_sec: Optional[float] = None
+    inter_token_ms: Optional[float] = None
+    # LLM calls of this step answered from the response cache (they cost nothing)
+    cache_hits: int = 0
 
 @dataclass
 class Trace:
@@ -78,11 +84,19 @@ class AgentTracer:
         trace.total_cost_usd += step.cost_usd
         trace.total_duration_ms += step.duration_ms
 
+        extra = {}
+        if step.ttft_ms is not None:
+            extra["ttft_ms"] = round(step.ttft_ms, 0)
+        if step.tokens_per_sec is not None:
+            extra["tokens_per_sec"] = round(step.tokens_per_sec, 1)
+        if step.cache_hits:
+            extra["cache_hits"] = step.cache_hits
         logger.info("step_completed",
                     trace_id=trace_id,
                     step_number=step.step_number,
                     duration_ms=round(step.duration_ms, 0),
-                    cost_usd=round(step.cost_usd, 4))
+                    cost_usd=round(step.cost_usd, 4),
+                    **extra)
 
     def end_trace(self, trace_id: str, output: str, status: str = "completed", error: str = None):
         """Mark a trace as complete."""
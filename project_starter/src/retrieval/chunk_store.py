@@ -0,0 +1,306 @@
+import hashlib
+import json
+import os
+from array import array
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+CHUNK_DTYPE = np.dtype([
+    ("chunk_id", "<i8"),
+    ("doc", "<i4"),
+    ("page", "<i4"),
+    ("start", "<i8"),  # byte offsets into the document buffer
+    ("end", "<i8"),
+    ("hash", "<i8"),  # content_hash of the chunk text
+    ("canonical", "<i8"),  # chunk this one near-duplicates (not embedded), or -1
+])
+
+
+def _replace_file(path: str, write):
+    # Write next to `path` and rename over it: a process (or this store) that
+    # memory-mapped the old file keeps reading the old inode, untouched.
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def content_hash(text: str) -> int:
+    """64-bit hash of a chunk's text, used to spot unchanged chunks on re-ingestion."""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+class ChunkStore:
+    """
+    Columnar store for chunk text and metadata.
+
+    Each document's cleaned text is kept once, as a UTF-8 buffer; a chunk is
+    just a (start, end) byte range into it plus its page number, so
+    overlapping chunks share storage. Document metadata is stored once per
+    document and shared by its chunks instead of being copied into each one.
+    Rows are kept sorted by chunk id, so id -> row is a binary search over
+    the `chunk_id` column.
+
+    Near-duplicate chunks are stored for provenance but point at their
+    `canonical` chunk, the only one of the group that is embedded.
+
+    `delete_document` drops a document's rows immediately; its text and its
+    slot in `documents` are reclaimed by the next `save`. `save` writes three
+    files in one bulk write each; `load` memory-maps the text buffer and the
+    chunk columns.
+    """
+    TEXTS_FILE = "texts.bin"
+    CHUNKS_FILE = "chunks.npy"
+    DOCUMENTS_FILE = "documents.json"
+
+    def __init__(self):
+        self.documents: List[Dict[str, Any]] = []  # {"doc_id", "metadata"}
+        self._buffers: List[bytearray] = []
+        self._columns = {name: array("q") for name in CHUNK_DTYPE.names}
+        self._table: np.ndarray | None = np.empty(0, dtype=CHUNK_DTYPE)
+        self._blob: np.ndarray | None = None  # memory-mapped texts after load
+        self._doc_offsets: np.ndarray | None = None
+        self._doc_rows: Dict[str, int] = {}
+        self._next_id = 0
+        self._last_id = -1
+        self._unsorted = False
+
+    # ------writing---------
+    def add_document(self, doc_id: str, metadata: dict) -> int:
+        """Register a document and return its row, to be passed to `add_page`."""
+        if doc_id in self._doc_rows:
+            raise ValueError(f"Document '{doc_id}' is already in the store; delete it first")
+        self._materialize_buffers()
+        self.documents.append({"doc_id": doc_id, "metadata": dict(metadata)})
+        self._buffers.append(bytearray())
+        self._doc_rows[doc_id] = len(self.documents) - 1
+        return len(self.documents) - 1
+
+    def add_page(
+        self,
+        doc: int,
+        page_num: int,
+        text: str,
+        chunk_texts: List[str],
+        chunk_ids: List[Optional[int]] = None,
+        canonical: List[Optional[int]] = None,
+    ) -> List[int]:
+        """
+        Append one page of `doc` and the chunks cut from it; return their chunk ids.
+
+        Chunks are located in `text` as substrings. A chunk the chunker
+        rewrote (so it is not found verbatim) is appended to the buffer on
+        its own. `chunk_ids` lets a re-ingested document keep the ids of
+        chunks that did not change (or use ids from `allocate_ids`); None
+        entries get fresh ids. `canonical` gives, per chunk, the id of the
+        chunk it duplicates, or None.
+        """
+        buffer = self._buffers[doc]
+        if buffer:
+            buffer += b"\n\n"
+        page_start = len(buffer)
+        buffer += text.encode("utf-8")
+
+        ids = []
+        char_pos, byte_pos = 0, page_start
+        for i, chunk in enumerate(chunk_texts):
+            found = text.find(chunk, char_pos)
+            if found == -1:
+                start = len(buffer) + 2
+                buffer += b"\n\n" + chunk.encode("utf-8")
+            else:
+                # Chunks arrive in page order, so byte offsets advance incrementally
+                byte_pos += len(text[char_pos:found].encode("utf-8"))
+                char_pos = found
+                start = byte_pos
+            end = start + len(chunk.encode("utf-8"))
+            chunk_id = chunk_ids[i] if chunk_ids is not None else None
+            duplicate_of = canonical[i] if canonical is not None and canonical[i] is not None else -1
+            ids.append(self._append_row(doc, page_num, start, end, content_hash(chunk), duplicate_of, chunk_id))
+        return ids
+
+    def allocate_ids(self, n: int) -> List[int]:
+        """Reserve `n` fresh chunk ids, for callers that need ids before the chunks are added."""
+        ids = list(range(self._next_id, self._next_id + n))
+        self._next_id += n
+        return ids
+
+    def _append_row(
+        self, doc: int, page: int, start: int, end: int, chunk_hash: int, canonical: int, chunk_id: int = None
+    ) -> int:
+        if chunk_id is None:
+            chunk_id = self._next_id
+            self._next_id += 1
+        if chunk_id < self._last_id:
+            # A reused id lands among newer rows; re-sort before the next lookup
+            self._unsorted = True
+        self._last_id = chunk_id
+        columns = self._columns
+        columns["chunk_id"].append(chunk_id)
+        columns["doc"].append(doc)
+        columns["page"].append(page)
+        columns["start"].append(start)
+        columns["end"].append(end)
+        columns["hash"].append(chunk_hash)
+        columns["canonical"].append(canonical)
+        return chunk_id
+
+    def delete_document(self, doc_id: str) -> np.ndarray:
+        """Drop a document and its chunks; return the deleted chunk ids (empty if unknown)."""
+        doc = self._doc_rows.pop(doc_id, None)
+        if doc is None:
+            return np.empty(0, dtype=np.int64)
+        self._materialize_buffers()
+        table = self.table
+        mask = table["doc"] == doc
+        deleted = table["chunk_id"][mask].copy()
+        self._table = table[~mask]
+        self.documents[doc] = None
+        self._buffers[doc] = bytearray()
+        return deleted
+
+    def set_canonical(self, chunk_ids: np.ndarray, canonical: np.ndarray):
+        """Re-point chunks at a new canonical chunk (-1 makes them canonical themselves)."""
+        table = self.table if self.table.flags.writeable else np.array(self.table)
+        rows = np.searchsorted(table["chunk_id"], chunk_ids)
+        table["canonical"][rows] = canonical
+        self._table = table
+
+    @property
+    def table(self) -> np.ndarray:
+        """All chunk rows as one structured array, sorted by chunk id."""
+        if len(self._columns["chunk_id"]):
+            new = np.empty(len(self._columns["chunk_id"]), dtype=CHUNK_DTYPE)
+            for name, column in self._columns.items():
+                new[name] = np.frombuffer(column, dtype="<i8")
+            self._table = np.concatenate([self._table, new])
+            self._columns = {name: array("q") for name in CHUNK_DTYPE.names}
+        if self._unsorted:
+            self._table = self._table[np.argsort(self._table["chunk_id"], kind="stable")]
+            self._last_id = int(self._table["chunk_id"][-1])
+            self._unsorted = False
+        return self._table
+
+    # ------reading---------
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def document_chunks(self, doc_id: str) -> np.ndarray:
+        """Rows of `doc_id`'s chunks (empty if the document is not in the store)."""
+        doc = self._doc_rows.get(doc_id)
+        if doc is None:
+            return self.table[:0]
+        return self.table[self.table["doc"] == doc]
+
+    def row_of(self, chunk_id: int) -> int:
+        ids = self.table["chunk_id"]
+        row = int(np.searchsorted(ids, chunk_id))
+        if row == len(ids) or ids[row] != chunk_id:
+            raise KeyError(chunk_id)
+        return row
+
+    def text(self, row: int) -> str:
+        record = self.table[row]
+        return self._document_bytes(int(record["doc"]), int(record["start"]), int(record["end"])).decode("utf-8")
+
+    def metadata(self, row: int) -> Dict[str, Any]:
+        record = self.table[row]
+        metadata = dict(self.documents[int(record["doc"])]["metadata"])
+        metadata.update({
+            "chunk_id": int(record["chunk_id"]),
+            "page": int(record["page"]),
+            "char_length": len(self.text(row)),
+        })
+        if record["canonical"] != -1:
+            metadata["duplicate_of"] = int(record["canonical"])
+        return metadata
+
+    def duplicates_of(self, chunk_id: int) -> np.ndarray:
+        """Ids of the chunks that were dropped as near-duplicates of `chunk_id`."""
+        table = self.table
+        return table["chunk_id"][table["canonical"] == chunk_id]
+
+    def get(self, row: int) -> Dict[str, Any]:
+        return {"text": self.text(row), "metadata": self.metadata(row)}
+
+    def _document_bytes(self, doc: int, start: int, end: int) -> bytes:
+        if doc < len(self._buffers):
+            return bytes(self._buffers[doc][start:end])
+        base = int(self._doc_offsets[doc])
+        return self._blob[base + start:base + end].tobytes()
+
+    def _materialize_buffers(self):
+        # After `load`, documents live in the memory-mapped blob; copy them
+        # into writable buffers before the store is extended.
+        if self._blob is None:
+            return
+        self._buffers = [
+            bytearray(self._blob[self._doc_offsets[i]:self._doc_offsets[i + 1]])
+            for i in range(len(self.documents))
+        ]
+        self._blob = None
+        self._doc_offsets = None
+        self._table = np.array(self._table)
+
+    def _compact(self):
+        # Reclaim the slots (and text) of deleted documents, renumbering rows
+        alive = [i for i, document in enumerate(self.documents) if document is not None]
+        if len(alive) == len(self.documents):
+            return
+        remap = np.full(len(self.documents), -1, dtype=np.int32)
+        remap[alive] = np.arange(len(alive), dtype=np.int32)
+        table = np.array(self.table)
+        table["doc"] = remap[table["doc"]]
+        self._table = table
+        self.documents = [self.documents[i] for i in alive]
+        self._buffers = [self._buffers[i] for i in alive]
+        self._doc_rows = {document["doc_id"]: i for i, document in enumerate(self.documents)}
+
+    # ------persistence---------
+    def save(self, directory: str):
+        self._materialize_buffers()
+        self._compact()
+        os.makedirs(directory, exist_ok=True)
+        offsets = np.zeros(len(self._buffers) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(b) for b in self._buffers])
+        blob = b"".join(self._buffers)
+        table = self.table
+
+        def write_texts(path):
+            with open(path, "wb") as f:
+                f.write(blob)
+
+        def write_chunks(path):
+            with open(path, "wb") as f:
+                np.save(f, table)
+
+        def write_documents(path):
+            with open(path, "w") as f:
+                json.dump({
+                    "documents": self.documents,
+                    "doc_offsets": offsets.tolist(),
+                    "next_id": self._next_id,
+                }, f)
+
+        _replace_file(os.path.join(directory, self.TEXTS_FILE), write_texts)
+        _replace_file(os.path.join(directory, self.CHUNKS_FILE), write_chunks)
+        _replace_file(os.path.join(directory, self.DOCUMENTS_FILE), write_documents)
+
+    @classmethod
+    def load(cls, directory: str) -> "ChunkStore":
+        store = cls()
+        with open(os.path.join(directory, cls.DOCUMENTS_FILE)) as f:
+            state = json.load(f)
+        store.documents = state["documents"]
+        store._doc_rows = {document["doc_id"]: i for i, document in enumerate(store.documents)}
+        store._next_id = state["next_id"]
+        store._last_id = state["next_id"] - 1
+        store._buffers = []
+        store._doc_offsets = np.array(state["doc_offsets"], dtype=np.int64)
+        store._table = np.load(os.path.join(directory, cls.CHUNKS_FILE), mmap_mode="r")
+        store._blob = (
+            np.memmap(os.path.join(directory, cls.TEXTS_FILE), dtype=np.uint8, mode="r")
+            if store._doc_offsets[-1] > 0 else np.empty(0, dtype=np.uint8)
+        )
+        return store
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+_PRIME = 4294967311  # smallest prime above 2**32
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate detection for chunks with MinHash signatures and LSH banding.
+
+    A chunk is shingled into word n-grams and summarized by `num_perm`
+    min-hashes; the fraction of equal min-hashes between two chunks estimates
+    the Jaccard similarity of their shingle sets. Signatures are cut into
+    bands of `rows` min-hashes and each band is bucketed, so only chunks
+    sharing a bucket are compared. The band size is chosen so the LSH
+    S-curve rises just below `threshold` (favouring recall); every candidate
+    is then checked against `threshold` on its full signature.
+
+    `add` registers chunks in order and returns, for each one, the id of the
+    earlier canonical chunk it duplicates (or None). Only canonical chunks
+    are registered, so a chain of edits is always mapped to its first copy.
+    Buckets of recently added chunks live in dicts and are merged into
+    sorted arrays (one per band) every `MERGE_THRESHOLD` chunks.
+    """
+    CONFIG_FILE = "minhash.json"
+    SIGNATURES_FILE = "minhash_signatures.npy"
+    IDS_FILE = "minhash_ids.npy"
+    MERGE_THRESHOLD = 50_000
+
+    def __init__(self, threshold: float = 0.9, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        self.rows = self._band_rows(threshold, num_perm)
+        self.bands = num_perm // self.rows
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 2 ** 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)
+        self._band_mix = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        # Merged state: signatures sorted by id, and per band (sorted keys, their ids)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._keys = [np.empty(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._key_ids = [np.empty(0, dtype=np.int64) for _ in range(self.bands)]
+        # Recently added canonical chunks
+        self._recent: dict[int, np.ndarray] = {}
+        self._recent_buckets = [{} for _ in range(self.bands)]
+        self._removed: set[int] = set()
+
+    @staticmethod
+    def _band_rows(threshold: float, num_perm: int) -> int:
+        # Largest band size whose S-curve midpoint (1/b)^(1/r) stays <= threshold
+        best = 1
+        for rows in range(1, num_perm + 1):
+            if (1 / (num_perm // rows)) ** (1 / rows) <= threshold:
+                best = rows
+        return best
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._recent) - len(self._removed)
+
+    def signature(self, text: str) -> np.ndarray | None:
+        """MinHash signature of `text`, or None if it has no words."""
+        tokens = _TOKEN.findall(text.lower())
+        if not tokens:
+            return None
+        n = min(self.shingle_size, len(tokens))
+        shingles = {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        # Universal hashing (a * x + b) mod p, one row per permutation; a * x < 2**64
+        permuted = (self._a[:, None] * hashes[None, :] % np.uint64(_PRIME) + self._b[:, None]) % np.uint64(_PRIME)
+        return permuted.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        # (n, bands) uint64 keys; uint64 arithmetic wraps, which is what we want here
+        bands = signatures[..., :self.bands * self.rows].reshape(*signatures.shape[:-1], self.bands, self.rows)
+        return (bands.astype(np.uint64) * self._band_mix).sum(axis=-1, dtype=np.uint64)
+
+    def _signature_of(self, chunk_id: int) -> np.ndarray:
+        if chunk_id in self._recent:
+            return self._recent[chunk_id]
+        return self._signatures[np.searchsorted(self._ids, chunk_id)]
+
+    def _match(self, signature: np.ndarray) -> int | None:
+        keys = self._band_keys(signature)
+        candidates = set()
+        for band, key in enumerate(keys):
+            key = int(key)
+            if key in self._recent_buckets[band]:
+                candidates.update(self._recent_buckets[band][key])
+            start, end = np.searchsorted(self._keys[band], key), np.searchsorted(self._keys[band], key, side="right")
+            candidates.update(self._key_ids[band][start:end].tolist())
+        best, best_similarity = None, 0.0
+        for candidate in sorted(candidates - self._removed):
+            similarity = float(np.mean(self._signature_of(candidate) == signature))
+            if similarity >= self.threshold and similarity > best_similarity:
+                best, best_similarity = candidate, similarity
+        return best
+
+    def add(self, ids: list[int], texts: list[str]) -> list[int | None]:
+        """
+        Check each chunk against everything registered so far (earlier
+        chunks of this call included); return its canonical id, or None for
+        a new chunk, which is registered under its id.
+        """
+        canonical = []
+        for chunk_id, text in zip(ids, texts):
+            signature = self.signature(text)
+            if signature is None:
+                canonical.append(None)
+                continue
+            match = self._match(signature)
+            canonical.append(match)
+            if match is None:
+                self.register(int(chunk_id), signature)
+        if len(self._recent) >= self.MERGE_THRESHOLD:
+            self.flush()
+        return canonical
+
+    def register(self, chunk_id: int, signature: np.ndarray):
+        """Make `chunk_id` a canonical chunk that later chunks can be matched to."""
+        self._recent[chunk_id] = signature
+        for band, key in enumerate(self._band_keys(signature)):
+            self._recent_buckets[band].setdefault(int(key), []).append(chunk_id)
+
+    def remove(self, ids: np.ndarray):
+        """Unregister canonical chunks (ids that were never registered are ignored)."""
+        ids = np.asarray(ids, dtype=np.int64)
+        for chunk_id in ids[np.isin(ids, self._ids)].tolist():
+            self._removed.add(chunk_id)
+        for chunk_id in ids.tolist():
+            signature = self._recent.pop(chunk_id, None)
+            if signature is None:
+                continue
+            for band, key in enumerate(self._band_keys(signature)):
+                self._recent_buckets[band][int(key)].remove(chunk_id)
+
+    def flush(self):
+        """Merge recent chunks into the sorted arrays and drop removed ones."""
+        ids, signatures = self._ids, self._signatures
+        if self._removed:
+            keep = ~np.isin(ids, np.fromiter(self._removed, dtype=np.int64))
+            ids, signatures = ids[keep], signatures[keep]
+            self._removed = set()
+        if self._recent:
+            ids = np.concatenate([ids, np.fromiter(self._recent, dtype=np.int64, count=len(self._recent))])
+            signatures = np.concatenate([signatures, np.stack(list(self._recent.values()))])
+            order = np.argsort(ids, kind="stable")
+            ids, signatures = ids[order], signatures[order]
+        self._ids, self._signatures = ids, signatures
+        self._recent = {}
+        self._recent_buckets = [{} for _ in range(self.bands)]
+        self._index_bands()
+
+    def _index_bands(self):
+        keys = self._band_keys(self._signatures) if len(self._ids) else np.empty((0, self.bands), np.uint64)
+        for band in range(self.bands):
+            order = np.argsort(keys[:, band], kind="stable")
+            self._keys[band] = keys[order, band]
+            self._key_ids[band] = self._ids[order]
+
+    # ------persistence---------
+    def save(self, directory: str):
+        self.flush()
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, self.CONFIG_FILE), "w") as f:
+            json.dump({
+                "threshold": self.threshold,
+                "num_perm": self.num_perm,
+                "shingle_size": self.shingle_size,
+                "seed": self.seed,
+            }, f)
+        for name, array in ((self.SIGNATURES_FILE, self._signatures), (self.IDS_FILE, self._ids)):
+            path = os.path.join(directory, name)
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, array)
+            os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, directory: str) -> "MinHashDeduplicator":
+        with open(os.path.join(directory, cls.CONFIG_FILE)) as f:
+            deduplicator = cls(**json.load(f))
+        deduplicator._signatures = np.load(os.path.join(directory, cls.SIGNATURES_FILE))
+        deduplicator._ids = np.load(os.path.join(directory, cls.IDS_FILE))
+        deduplicator._index_bands()
+        return deduplicator
@@ -0,0 +1,117 @@
+import re
+import sys
+import time
+import zlib
+from abc import ABC, abstractmethod
+
+import numpy as np
+from openai import OpenAI
+from tenacity import retry, stop_after_attempt, wait_exponential
+
+from src.config import Config
+
+EMBEDDING_BACKENDS = ("openai", "hashing")
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns one batch of texts into vectors.
+
+    Batching, de-duplication, concurrency and caching live in BatchEmbedder;
+    a backend only answers a single request. `model` names the vector space
+    (it is part of the embedding cache key), so two backends that produce
+    different vectors must never share a `model`.
+    """
+    model: str
+    dimensions: int | None = None
+
+    @abstractmethod
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """One float32 row per text, in input order."""
+
+
+class OpenAIEmbeddingBackend(EmbeddingBackend):
+    """The OpenAI-compatible embeddings endpoint (OpenRouter by default)."""
+
+    def __init__(self, client: OpenAI = None, model: str = None, dimensions: int = None):
+        self.client = client or OpenAI(
+            api_key=Config.OPENROUTER_API_KEY,
+            base_url=Config.OPENROUTER_BASE_URL,
+        )
+        self.model = model or Config.EMBEDDING_MODEL
+        self.dimensions = dimensions
+
+    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, max=10), reraise=True)
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        params = {"dimensions": self.dimensions} if self.dimensions else {}
+        response = self.client.embeddings.create(model=self.model, input=texts, **params)
+        # The API does not guarantee response order; `index` does
+        data = sorted(response.data, key=lambda item: item.index)
+        return np.array([item.embedding for item in data], dtype="float32")
+
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Local, deterministic embeddings: a hashing vectorizer followed by a
+    sparse random projection.
+
+    Each word and word bigram is hashed with CRC32 (stable across processes,
+    unlike `hash`) into one of `n_features` buckets; every bucket projects
+    onto `nonzeros` output dimensions with random signs, drawn once from
+    `seed`. Texts that share words get similar vectors, which is enough for
+    exercising ingestion, search and routing offline. The vectors carry no
+    semantics beyond lexical overlap, so never mix them with API vectors.
+    """
+
+    def __init__(self, dimensions: int = None, seed: int = None, n_features: int = 2 ** 18, nonzeros: int = 8):
+        self.dimensions = dimensions or Config.EMBEDDING_HASHING_DIMENSION
+        self.seed = Config.EMBEDDING_HASHING_SEED if seed is None else seed
+        self.n_features = n_features
+        self.model = f"hashing-{self.dimensions}d-{n_features}f-{nonzeros}nz-seed{self.seed}"
+        rng = np.random.default_rng(self.seed)
+        self._targets = rng.integers(0, self.dimensions, size=(n_features, nonzeros), dtype=np.int64)
+        self._signs = rng.choice(np.array([-1.0, 1.0], dtype="float32"), size=(n_features, nonzeros))
+
+    def _features(self, text: str) -> list[int]:
+        tokens = _TOKEN.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        return [zlib.crc32(gram.encode("utf-8")) % self.n_features for gram in grams]
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        features = [self._features(text) for text in texts]
+        rows = np.repeat(np.arange(len(texts)), [len(f) for f in features])
+        buckets = np.fromiter((b for f in features for b in f), dtype=np.int64, count=len(rows))
+        # Every (text, bucket) hit adds the bucket's signed projection row
+        cells = (rows[:, None] * self.dimensions + self._targets[buckets]).ravel()
+        vectors = np.bincount(
+            cells, weights=self._signs[buckets].ravel(), minlength=len(texts) * self.dimensions
+        ).reshape(len(texts), self.dimensions)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return (vectors / np.where(norms == 0, 1, norms)).astype("float32")
+
+
+def create_backend(name: str = None, **kwargs) -> EmbeddingBackend:
+    """Build the backend named by `name` (default: Config.EMBEDDING_BACKEND)."""
+    name = name or Config.EMBEDDING_BACKEND
+    if name == "openai":
+        return OpenAIEmbeddingBackend(**kwargs)
+    if name == "hashing":
+        return HashingEmbeddingBackend(**kwargs)
+    raise ValueError(f"Unknown embedding backend '{name}', expected one of {EMBEDDING_BACKENDS}")
+
+
+if __name__ == "__main__":
+    # Offline throughput: python -m src.retrieval.embedding_backends [n_texts]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(20_000)]
+    texts = [" ".join(rng.choice(words, size=50)) for _ in range(n)]
+    backend = HashingEmbeddingBackend()
+    start = time.perf_counter()
+    for i in range(0, n, 128):
+        backend.embed_batch(texts[i:i + 128])
+    elapsed = time.perf_counter() - start
+    print(f"{backend.model}: {n / elapsed:,.0f} texts/s")
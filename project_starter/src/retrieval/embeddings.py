@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import structlog
+from openai import OpenAI
+
+from src.config import Config
+from src.retrieval.embedding_backends import EmbeddingBackend, OpenAIEmbeddingBackend
+from src.retrieval.embedding_cache import EmbeddingCache
+
+logger = structlog.get_logger()
+
+
+class BatchEmbedder:
+    """
+    Embeds many texts with as few API calls as possible.
+
+    Texts are de-duplicated, split into batches of `batch_size` and sent to
+    the backend with at most `max_concurrency` requests in flight. The
+    returned matrix has one float32 row per input text, in input order.
+    When a cache is given, only texts it does not already hold reach the
+    backend. Without a `backend`, one is built for the OpenAI-compatible API
+    from `client`, `model` and `dimensions`.
+    """
+    def __init__(
+        self,
+        client: OpenAI = None,
+        model: str = None,
+        batch_size: int = None,
+        max_concurrency: int = None,
+        dimensions: int = None,
+        cache: EmbeddingCache = None,
+        backend: EmbeddingBackend = None,
+    ):
+        self.backend = backend or OpenAIEmbeddingBackend(client=client, model=model, dimensions=dimensions)
+        self.batch_size = batch_size or Config.EMBEDDING_BATCH_SIZE
+        self.max_concurrency = max_concurrency or Config.EMBEDDING_CONCURRENCY
+        self.cache = cache
+
+    @property
+    def model(self) -> str:
+        return self.backend.model
+
+    @property
+    def dimensions(self) -> int | None:
+        return self.backend.dimensions
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """Embed `texts`, sending each distinct text to the API only once."""
+        if not texts:
+            return np.empty((0, 0), dtype="float32")
+
+        # dict.fromkeys keeps first-seen order, so batches are deterministic
+        unique_texts = list(dict.fromkeys(texts))
+        vector_of = {}
+        keys = {}
+        if self.cache is not None:
+            keys = {
+                text: EmbeddingCache.make_key(self.model, self.dimensions, text)
+                for text in unique_texts
+            }
+            cached = self.cache.get_many(list(keys.values()))
+            vector_of = {text: cached[key] for text, key in keys.items() if key in cached}
+
+        missing = [text for text in unique_texts if text not in vector_of]
+        batches = [
+            missing[i:i + self.batch_size]
+            for i in range(0, len(missing), self.batch_size)
+        ]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as pool:
+                fresh = np.vstack(list(pool.map(self.backend.embed_batch, batches)))
+            vector_of.update(zip(missing, fresh))
+            if self.cache is not None:
+                self.cache.put_many({keys[text]: vector for text, vector in zip(missing, fresh)})
+
+        logger.info("embeddings_generated",
+                    texts=len(texts),
+                    unique_texts=len(unique_texts),
+                    cache_hits=len(unique_texts) - len(missing),
+                    api_calls=len(batches))
+
+        return np.vstack([vector_of[text] for text in texts])
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
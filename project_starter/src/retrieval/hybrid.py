@@ -0,0 +1,27 @@
+def reciprocal_rank_fusion(ranked_lists, k=60):
+    """
+    Combine multiple ranked result lists using RRF.
+
+    RRF Score = sum(1 / (rank + k)) across all lists
+
+    Args:
+        ranked_lists: List of lists, each containing (doc_id, score) tuples sorted by score desc
+        k: Smoothing constant (default 60)
+
+    Returns:
+        List of (doc_id, fused_score) sorted by fused score descending
+    """
+    return weighted_rrf(ranked_lists, k=k)
+
+
+def weighted_rrf(ranked_lists, weights=None, k=60):
+    """RRF with configurable weights per result list."""
+    if weights is None:
+        weights = [1.0] * len(ranked_lists)
+
+    fused_scores = {}
+    for result_list, weight in zip(ranked_lists, weights):
+        for rank, (doc_id, _score) in enumerate(result_list):
+            fused_scores[doc_id] = fused_scores.get(doc_id, 0.0) + weight / (rank + k)
+
+    return sorted(fused_scores.items(), key=lambda x: x[1], reverse=True)
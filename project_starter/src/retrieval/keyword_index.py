@@ -0,0 +1,312 @@
+import json
+import math
+import os
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+
+import numpy as np
+
+_TOKEN = re.compile(r"\w+")
+# Terms that occur in nearly every chunk carry almost no BM25 weight but have
+# the longest posting lists, so they are dropped from chunks and queries alike
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have he her his i in into is it its
+of on or our she so that the their them then there these they this to was we
+were which will with you your
+""".split())
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class KeywordIndex:
+    """
+    BM25 inverted index over chunk texts.
+
+    Postings live in CSR form: `offsets[t]:offsets[t + 1]` slices the
+    (position, term frequency) pairs of term t out of flat arrays, where a
+    position is a chunk's slot in `ids`. Each posting also stores its BM25
+    term-frequency component, tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avgdl)),
+    computed when postings are merged; a query then costs one idf-weighted
+    scatter-add per query term, so latency tracks the terms' document
+    frequencies rather than the corpus size. (avgdl is refreshed on every
+    merge, so impacts drift only by what was added or removed since.)
+
+    Chunks added after the last merge go to a small unsorted delta that is
+    scanned directly; once it grows past `MERGE_THRESHOLD` postings it is
+    merged into the CSR arrays. Removed chunks are masked out of scoring and
+    of the BM25 statistics, and dropped for good on `save`. `load`
+    memory-maps the postings.
+    """
+    VOCAB_FILE = "keywords.json"
+    ARRAY_FILES = ("offsets", "positions", "tfs", "impacts", "ids", "lengths")
+    MERGE_THRESHOLD = 50_000
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab: dict[str, int] = {}
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._positions = np.empty(0, dtype=np.int32)
+        self._tfs = np.empty(0, dtype=np.int32)
+        self._impacts = np.empty(0, dtype=np.float32)
+        self._ids = np.empty(0, dtype=np.int64)
+        self._lengths = np.empty(0, dtype=np.int32)
+        # Delta postings, merged into the arrays above by `flush`
+        self._delta_terms = array("i")
+        self._delta_positions = array("i")
+        self._delta_tfs = array("i")
+        self._delta_ids = array("q")
+        self._delta_lengths = array("i")
+        self._dead = np.empty(0, dtype=np.int64)  # removed positions
+        self._live_docs = 0
+        self._live_length = 0
+        self._norms: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return self._live_docs
+
+    @property
+    def _n_positions(self) -> int:
+        return len(self._ids) + len(self._delta_ids)
+
+    # ------writing---------
+    def add(self, ids: list[int], texts: list[str]):
+        """Index `texts` under their chunk ids."""
+        for chunk_id, text in zip(ids, texts):
+            position = self._n_positions
+            terms = Counter(tokenize(text))
+            for term, tf in terms.items():
+                term_id = self.vocab.setdefault(term, len(self.vocab))
+                self._delta_terms.append(term_id)
+                self._delta_positions.append(position)
+                self._delta_tfs.append(tf)
+            length = sum(terms.values())
+            self._delta_ids.append(int(chunk_id))
+            self._delta_lengths.append(length)
+            self._live_docs += 1
+            self._live_length += length
+        self._norms = None
+        if len(self._delta_terms) >= self.MERGE_THRESHOLD:
+            self.flush()
+
+    def remove(self, ids: np.ndarray) -> int:
+        """Stop returning the given chunk ids; returns how many were indexed."""
+        self.flush()
+        dead = np.flatnonzero(np.isin(self._ids, ids))
+        dead = np.setdiff1d(dead, self._dead)
+        self._dead = np.union1d(self._dead, dead)
+        self._live_docs -= len(dead)
+        self._live_length -= int(self._lengths[dead].sum())
+        self._norms = None
+        return len(dead)
+
+    def flush(self):
+        """Merge the delta postings into the CSR arrays."""
+        if not len(self._delta_ids):
+            return
+        n_terms = len(self.vocab)
+        old_terms = np.repeat(np.arange(len(self._offsets) - 1, dtype=np.int32), np.diff(self._offsets))
+        delta_terms = np.frombuffer(self._delta_terms, dtype=np.int32)
+        order = np.argsort(delta_terms, kind="stable")
+        # Both halves are sorted by term, so the stable sort is a linear merge
+        terms = np.concatenate([old_terms, delta_terms[order]])
+        merge = np.argsort(terms, kind="stable")
+        self._positions = np.concatenate([
+            self._positions, np.frombuffer(self._delta_positions, dtype=np.int32)[order]
+        ])[merge]
+        self._tfs = np.concatenate([self._tfs, np.frombuffer(self._delta_tfs, dtype=np.int32)[order]])[merge]
+        self._offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(np.bincount(terms, minlength=n_terms))
+        self._ids = np.concatenate([self._ids, np.frombuffer(self._delta_ids, dtype=np.int64)])
+        self._lengths = np.concatenate([self._lengths, np.frombuffer(self._delta_lengths, dtype=np.int32)])
+        self._delta_terms, self._delta_positions, self._delta_tfs = array("i"), array("i"), array("i")
+        self._delta_ids, self._delta_lengths = array("q"), array("i")
+        self._update_impacts()
+
+    def _update_impacts(self):
+        self._norms = None
+        norms = self._doc_norms()
+        tfs = self._tfs.astype(np.float32)
+        self._impacts = tfs * (self.k1 + 1) / (tfs + norms[self._positions])
+
+    # ------searching---------
+    def _doc_norms(self) -> np.ndarray:
+        # k1 * (1 - b + b * length / avgdl) per position; changes whenever avgdl does
+        if self._norms is None:
+            lengths = np.concatenate([self._lengths, np.frombuffer(self._delta_lengths, dtype=np.int32)])
+            avgdl = self._live_length / self._live_docs if self._live_docs else 1.0
+            self._norms = (self.k1 * (1 - self.b + self.b * lengths / avgdl)).astype(np.float32)
+        return self._norms
+
+    def _postings(self, term_id: int) -> tuple[np.ndarray, np.ndarray]:
+        """Positions holding `term_id` and their BM25 tf components."""
+        # Terms first seen since the last merge have no CSR slice yet
+        start, end = (self._offsets[term_id], self._offsets[term_id + 1]) if term_id + 1 < len(self._offsets) else (0, 0)
+        positions, impacts = self._positions[start:end], self._impacts[start:end]
+        if len(self._delta_terms):
+            match = np.frombuffer(self._delta_terms, dtype=np.int32) == term_id
+            if match.any():
+                delta_positions = np.frombuffer(self._delta_positions, dtype=np.int32)[match]
+                tfs = np.frombuffer(self._delta_tfs, dtype=np.int32)[match].astype(np.float32)
+                delta_impacts = tfs * (self.k1 + 1) / (tfs + self._doc_norms()[delta_positions])
+                positions = np.concatenate([positions, delta_positions])
+                impacts = np.concatenate([impacts, delta_impacts])
+        return positions, impacts
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Top-k (chunk_id, BM25 score) pairs, best first; chunks sharing no term with `query` are never returned."""
+        if not self._live_docs:
+            return []
+        terms = []  # (weight, positions, impacts)
+        for term, count in Counter(tokenize(query)).items():
+            term_id = self.vocab.get(term)
+            if term_id is None:
+                continue
+            positions, impacts = self._postings(term_id)
+            df = len(positions) - (int(np.isin(positions, self._dead).sum()) if len(self._dead) else 0)
+            if df > 0:
+                idf = math.log(1 + (self._live_docs - df + 0.5) / (df + 0.5))
+                terms.append((np.float32(count * idf), positions, impacts))
+        if not terms:
+            return []
+
+        # MaxScore: a term contributes at most weight * (k1 + 1). Common
+        # (low-weight) terms whose bounds sum below a known k-th score cannot
+        # lift a chunk into the top k on their own, so only the postings of
+        # the remaining terms generate candidates; the common terms are
+        # looked up for those candidates alone.
+        terms.sort(key=lambda term: term[0])
+        threshold = self._threshold(terms, k)
+        bound, n_lookup = 0.0, 0
+        for weight, _, _ in terms:
+            if bound + float(weight) * (self.k1 + 1) >= threshold:
+                break
+            bound += float(weight) * (self.k1 + 1)
+            n_lookup += 1
+
+        scores = np.zeros(self._n_positions, dtype=np.float32)
+        for weight, positions, impacts in terms[n_lookup:]:
+            # Positions are unique within one term's postings, so `+=` does not lose updates
+            scores[positions] += weight * impacts
+        if len(self._dead):
+            scores[self._dead] = 0
+        candidates = np.flatnonzero(scores)
+        for weight, positions, impacts in terms[:n_lookup]:
+            scores[candidates] += weight * self._lookup(positions, impacts, candidates)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        ids = self._chunk_ids(candidates)
+        return [(int(chunk_id), float(scores[p])) for chunk_id, p in zip(ids, candidates)]
+
+    def _threshold(self, terms: list, k: int) -> float:
+        """A lower bound on the k-th best score: exact scores of the rarest term's k best postings."""
+        _, positions, impacts = terms[-1]
+        if len(positions) > k:
+            positions = positions[np.argpartition(-impacts, k)[:k]]
+        if len(self._dead):
+            positions = positions[~np.isin(positions, self._dead)]
+        if len(positions) < k:
+            return 0.0
+        seeds = np.sort(positions)
+        scores = np.zeros(len(seeds), dtype=np.float32)
+        for weight, term_positions, term_impacts in terms:
+            scores += weight * self._lookup(term_positions, term_impacts, seeds)
+        return float(scores.min())
+
+    @staticmethod
+    def _lookup(positions: np.ndarray, impacts: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Impacts of `targets` in one term's postings (sorted by position), 0 where absent."""
+        found = np.minimum(np.searchsorted(positions, targets), len(positions) - 1)
+        return np.where(positions[found] == targets, impacts[found], 0)
+
+    def search_many(self, queries: list[str], k: int) -> list[list[tuple[int, float]]]:
+        return [self.search(query, k) for query in queries]
+
+    def _chunk_ids(self, positions: np.ndarray) -> np.ndarray:
+        if not len(self._delta_ids):
+            return self._ids[positions]
+        return np.concatenate([self._ids, np.frombuffer(self._delta_ids, dtype=np.int64)])[positions]
+
+    # ------persistence---------
+    def _compact(self):
+        # Drop removed chunks and their postings, renumbering positions
+        if not len(self._dead):
+            return
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[self._dead] = False
+        new_position = np.cumsum(keep, dtype=np.int64) - 1
+        live_postings = keep[self._positions]
+        terms = np.repeat(np.arange(len(self._offsets) - 1), np.diff(self._offsets))[live_postings]
+        self._positions = new_position[self._positions[live_postings]].astype(np.int32)
+        self._tfs = self._tfs[live_postings]
+        self._impacts = self._impacts[live_postings]
+        self._offsets = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        self._offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(self.vocab)))
+        self._ids = self._ids[keep]
+        self._lengths = self._lengths[keep]
+        self._dead = np.empty(0, dtype=np.int64)
+        self._update_impacts()
+
+    def save(self, directory: str):
+        self.flush()
+        self._compact()
+        os.makedirs(directory, exist_ok=True)
+        for name in self.ARRAY_FILES:
+            path = os.path.join(directory, f"keyword_{name}.npy")
+            # Rename over the old file so a memory-mapped copy of it stays valid
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, getattr(self, f"_{name}"))
+            os.replace(path + ".tmp", path)
+        with open(os.path.join(directory, self.VOCAB_FILE), "w") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "terms": list(self.vocab),
+                "live_length": self._live_length,
+            }, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "KeywordIndex":
+        with open(os.path.join(directory, cls.VOCAB_FILE)) as f:
+            state = json.load(f)
+        index = cls(k1=state["k1"], b=state["b"])
+        index.vocab = {term: i for i, term in enumerate(state["terms"])}
+        for name in cls.ARRAY_FILES:
+            setattr(index, f"_{name}", np.load(os.path.join(directory, f"keyword_{name}.npy"), mmap_mode="r"))
+        index._live_docs = len(index._ids)
+        index._live_length = state["live_length"]
+        return index
+
+
+if __name__ == "__main__":
+    # Latency on a synthetic corpus: python -m src.retrieval.keyword_index [n_chunks]
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = np.random.default_rng(0)
+    # ~50 tokens per chunk from a 100k-word vocabulary with Zipfian word
+    # frequencies (as left after stopword removal); queries are 2-5 words
+    # drawn from the same distribution
+    words = np.array([f"w{i}" for i in range(100_000)])
+    weights = 1 / np.arange(100, 100_100) ** 1.1
+    weights /= weights.sum()
+    tokens = rng.choice(len(words), size=(n, 50), p=weights)
+    texts = [" ".join(words[row]) for row in tokens]
+
+    keyword_index = KeywordIndex()
+    start = time.perf_counter()
+    keyword_index.add(list(range(n)), texts)
+    keyword_index.flush()
+    print(f"indexed {n} chunks in {time.perf_counter() - start:.1f}s, {len(keyword_index.vocab)} terms")
+
+    queries = [" ".join(words[rng.choice(len(words), size=rng.integers(2, 6), p=weights)]) for _ in range(500)]
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        keyword_index.search(query, 50)
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms per query (k=50)")
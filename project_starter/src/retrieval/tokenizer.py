@@ -0,0 +1,114 @@
+import functools
+import sys
+import time
+
+import numpy as np
+import tiktoken
+
+from src.config import Config
+
+# How good a split point the start of a token is, strongest first
+PARAGRAPH, LINE, SENTENCE, WORD, INSIDE_WORD = 4, 3, 2, 1, 0
+NOT_A_BOUNDARY = -1  # the token starts inside a multi-byte character
+
+# Byte -> class lookup tables
+_IS_SPACE = np.zeros(256, dtype=bool)
+_IS_SPACE[list(b" \t\r\n")] = True
+_IS_SENTENCE_END = np.zeros(256, dtype=bool)
+_IS_SENTENCE_END[list(b".!?")] = True
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(name: str = None) -> tiktoken.Encoding:
+    """The tiktoken BPE encoding `name` (default: Config.TOKENIZER_ENCODING), loaded once per process."""
+    return tiktoken.get_encoding(name or Config.TOKENIZER_ENCODING)
+
+
+@functools.lru_cache(maxsize=None)
+def _token_byte_lengths(name: str) -> np.ndarray:
+    # UTF-8 length of every token id, so offsets come from one lookup instead of decoding
+    encoding = get_encoding(name)
+    lengths = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+    for token in range(len(lengths)):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:
+            pass  # unused ids between the vocabulary and the special tokens
+    return lengths
+
+
+class TokenOffsets:
+    """
+    Token-offset index of one text.
+
+    The text is encoded once. `char_offsets[i]` is where token i starts in
+    the text (`char_offsets[len(self)] == len(text)`) and `boundaries[i]` how
+    good a split point that is, from PARAGRAPH down to NOT_A_BOUNDARY. The
+    token count of any span between two tokens is then the difference of
+    their indexes, and its text a slice, with no re-encoding.
+    """
+
+    def __init__(self, text: str, encoding_name: str = None):
+        name = encoding_name or Config.TOKENIZER_ENCODING
+        self.text = text
+        self.tokens = np.asarray(get_encoding(name).encode_ordinary(text), dtype=np.int64)
+        data = np.frombuffer(text.encode("utf-8"), dtype=np.uint8)
+        byte_offsets = np.zeros(len(self.tokens) + 1, dtype=np.int64)
+        np.cumsum(_token_byte_lengths(name)[self.tokens], out=byte_offsets[1:])
+
+        # Continuation bytes are 0b10xxxxxx; the extra True is the end of the text
+        char_starts = np.append((data & 0xC0) != 0x80, True)
+        self.char_offsets = (np.cumsum(char_starts) - 1)[byte_offsets]
+        self.boundaries = self._boundaries(data, byte_offsets, char_starts[byte_offsets])
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def span_text(self, start: int, end: int) -> str:
+        """Text of tokens [start, end)."""
+        return self.text[self.char_offsets[start]:self.char_offsets[end]]
+
+    @staticmethod
+    def _boundaries(data: np.ndarray, byte_offsets: np.ndarray, on_char: np.ndarray) -> np.ndarray:
+        padded = np.concatenate([np.zeros(2, np.uint8), data, np.zeros(1, np.uint8)])
+        before2, before, at = (padded[byte_offsets + shift] for shift in (0, 1, 2))
+        newline = ord("\n")
+        after_space, at_space = _IS_SPACE[before], _IS_SPACE[at]
+
+        boundaries = np.where(after_space | at_space, WORD, INSIDE_WORD)
+        boundaries[_IS_SENTENCE_END[before] & at_space] = SENTENCE
+        boundaries[before == newline] = LINE
+        boundaries[(before == newline) & (before2 == newline)] = PARAGRAPH
+        boundaries[~on_char] = NOT_A_BOUNDARY
+        return boundaries
+
+
+if __name__ == "__main__":
+    # Chunker throughput and chunk token spread: python -m src.retrieval.tokenizer [file.pdf]
+    from src.RAG import RecursiveChunker, TokenChunker, iter_clean_pages
+
+    if len(sys.argv) > 1:
+        pages = [text for _, text in iter_clean_pages(sys.argv[1])]
+    else:
+        rng = np.random.default_rng(0)
+        samples = [
+            "The ministry published new guidance on data protection for cloud providers. ",
+            "تنص اللائحة على حماية البيانات الشخصية في الخدمات السحابية الحكومية. ",
+            "def load(path):\n    with open(path) as f:\n        return json.load(f)\n",
+        ]
+        pages = []
+        for _ in range(2_000):
+            paragraphs = ("".join(rng.choice(samples, size=rng.integers(2, 8))) for _ in range(4))
+            pages.append("\n\n".join(paragraphs))
+    encoding = get_encoding()
+    _token_byte_lengths(encoding.name)  # one-off table build, not part of the timing
+    size = sum(len(page) for page in pages)
+
+    for chunker in (RecursiveChunker(chunk_size=300, chunk_overlap=50), TokenChunker(chunk_size=64, chunk_overlap=8)):
+        start = time.perf_counter()
+        chunks = [chunk for page in pages for chunk in chunker.split_text(page)]
+        elapsed = time.perf_counter() - start
+        counts = np.array([len(encoding.encode_ordinary(chunk)) for chunk in chunks])
+        print(f"{chunker.__class__.__name__:>16}: {size / elapsed / 1e6:.2f} M chars/s, {len(chunks)} chunks, "
+              f"tokens/chunk min {counts.min()} mean {counts.mean():.0f} max {counts.max()} "
+              f"(std {counts.std():.1f})")
@@ -0,0 +1,575 @@
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, replace
+
+import faiss
+import numpy as np
+
+from src.config import Config
+
+INDEX_KINDS = ("flat", "hnsw", "ivf_flat", "ivf_pq")
+QUANTIZATIONS = ("none", "int8", "binary")
+
+
+@dataclass
+class IndexConfig:
+    """Which FAISS index to build and how to tune it."""
+    kind: str = "flat"  # "flat", "hnsw", "ivf_flat" or "ivf_pq"
+    # IVF
+    nlist: int = 1024
+    nprobe: int = 16
+    # PQ (pq_m must divide the embedding dimension)
+    pq_m: int = 64
+    pq_nbits: int = 8
+    # HNSW
+    hnsw_m: int = 32
+    ef_construction: int = 200
+    ef_search: int = 64
+    # Training uses a random sample of at most this many vectors
+    train_sample: int = 100_000
+    # Compressed codes for the first pass: "none", "int8" or "binary". Lossy
+    # indexes keep float16 originals on disk and rescore the top
+    # k * rescore_factor candidates against them.
+    quantization: str = "none"
+    rescore_factor: int = 4
+    # Matryoshka truncation: index only the first `truncate_dim` dimensions
+    # (0 keeps them all). With `full_rerank`, float16 originals at the full
+    # dimension are kept too and the top candidates are rescored against them.
+    truncate_dim: int = 0
+    full_rerank: bool = False
+
+    def __post_init__(self):
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Unknown index kind '{self.kind}', expected one of {INDEX_KINDS}")
+        if self.quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization '{self.quantization}', expected one of {QUANTIZATIONS}")
+        if self.quantization != "none" and self.kind == "ivf_pq":
+            raise ValueError("ivf_pq already compresses vectors; use quantization='none'")
+        if self.quantization == "binary" and self.kind not in ("flat", "hnsw"):
+            raise ValueError("binary quantization supports the flat and hnsw kinds only")
+        if self.truncate_dim < 0:
+            raise ValueError(f"truncate_dim must be >= 0, got {self.truncate_dim}")
+
+    @classmethod
+    def from_config(cls) -> "IndexConfig":
+        return cls(
+            kind=Config.RAG_INDEX_TYPE,
+            nlist=Config.RAG_INDEX_NLIST,
+            nprobe=Config.RAG_INDEX_NPROBE,
+            ef_search=Config.RAG_INDEX_EF_SEARCH,
+            quantization=Config.RAG_INDEX_QUANTIZATION,
+            rescore_factor=Config.RAG_INDEX_RESCORE_FACTOR,
+            truncate_dim=Config.RAG_INDEX_DIMENSION,
+            full_rerank=Config.RAG_INDEX_FULL_RERANK,
+        )
+
+    @property
+    def needs_training(self) -> bool:
+        return self.kind in ("ivf_flat", "ivf_pq") or self.quantization == "int8"
+
+    @property
+    def is_lossy(self) -> bool:
+        return self.quantization != "none" or self.kind == "ivf_pq"
+
+    @property
+    def rescores(self) -> bool:
+        """Whether float16 originals are kept and the top candidates rescored against them."""
+        return self.is_lossy or (self.truncate_dim > 0 and self.full_rerank)
+
+    def bytes_per_vector(self, dimension: int) -> float:
+        """Size of one stored code in the in-memory index (excluding graph/list overhead)."""
+        if self.kind == "ivf_pq":
+            return self.pq_m * self.pq_nbits / 8
+        return {"none": 4 * dimension, "int8": dimension, "binary": dimension / 8}[self.quantization]
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return an L2-normalized float32 copy, so inner product equals cosine similarity."""
+    vectors = np.array(vectors, dtype="float32", order="C", copy=True)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def create_index(dimension: int, config: IndexConfig, n_train: int = None):
+    """
+    Build an empty index of the configured kind, addressed by caller-given ids.
+
+    Float indexes use inner product; binary ones use Hamming distance over
+    sign bits. IVF indexes store ids natively; the other kinds are wrapped in
+    an ID map. For IVF kinds `nlist` is capped so every list gets enough
+    training points (FAISS wants ~39 per centroid) when only `n_train`
+    vectors are available.
+    """
+    if config.quantization == "binary":
+        if config.kind == "hnsw":
+            index = faiss.IndexBinaryHNSW(dimension, config.hnsw_m)
+            index.hnsw.efConstruction = config.ef_construction
+        else:
+            index = faiss.IndexBinaryFlat(dimension)
+        return faiss.IndexBinaryIDMap2(index)
+
+    nlist = config.nlist
+    if config.kind in ("ivf_flat", "ivf_pq") and n_train is not None:
+        nlist = max(1, min(nlist, n_train // 39))
+
+    storage = "SQ8" if config.quantization == "int8" else "Flat"
+    description = {
+        "flat": storage,
+        "hnsw": f"HNSW{config.hnsw_m}" + (",SQ8" if config.quantization == "int8" else ""),
+        "ivf_flat": f"IVF{nlist},{storage}",
+        "ivf_pq": f"IVF{nlist},PQ{config.pq_m}x{config.pq_nbits}",
+    }[config.kind]
+    index = faiss.index_factory(dimension, description, faiss.METRIC_INNER_PRODUCT)
+    if config.kind == "hnsw":
+        index.hnsw.efConstruction = config.ef_construction
+    if config.kind in ("ivf_flat", "ivf_pq"):
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def binary_codes(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed 8 per byte."""
+    return np.packbits(vectors > 0, axis=1)
+
+
+def _replace_file(path: str, write):
+    # Write next to `path` and rename over it: a process (or this index) that
+    # memory-mapped the old file keeps reading the old inode, untouched.
+    tmp_path = path + ".tmp"
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _save_array(path: str, array: np.ndarray):
+    with open(path, "wb") as f:
+        np.save(f, array)
+
+
+class VectorIndex:
+    """
+    Cosine-similarity vector index backed by a configurable FAISS index.
+
+    Vectors are normalized on the way in and queries on the way out. Every
+    vector is stored under a caller-given int64 id (the RAG pipeline uses
+    chunk ids), which is what `search` returns and what `remove` takes.
+    Indexes that need training hold their vectors back until `train_sample`
+    of them have arrived (or `flush` is called), then train on a random
+    sample and add everything.
+
+    HNSW graphs cannot drop nodes, so removing from an HNSW index records a
+    tombstone instead; tombstoned ids are filtered out inside the search via
+    an ID selector.
+
+    Lossy indexes (int8, binary, IVF-PQ) also keep float16 copies of the
+    vectors. The compressed index only proposes candidates; their final
+    scores are exact inner products against the originals, which live in a
+    memory-mapped file once the index has been saved and loaded.
+
+    With `truncate_dim`, the FAISS index holds only the leading dimensions of
+    each vector, re-normalized, which is how Matryoshka-trained embeddings
+    (such as text-embedding-3) are meant to be shortened. Originals, when
+    kept, are always full-dimensional, so rescoring doubles as the
+    full-dimension rerank.
+    """
+    INDEX_FILE = "index.faiss"
+    CONFIG_FILE = "index_config.json"
+    ORIGINALS_FILE = "originals.f16"
+    ORIGINAL_IDS_FILE = "original_ids.npy"
+    TOMBSTONES_FILE = "tombstones.npy"
+
+    def __init__(self, config: IndexConfig = None):
+        self.config = config or IndexConfig()
+        self.index = None
+        self._pending: list[tuple[np.ndarray, np.ndarray]] = []  # (vectors, ids)
+        self._pending_count = 0
+        self._originals_parts: list[tuple[np.ndarray, np.ndarray]] = []
+        self._originals: np.ndarray | None = None
+        self._original_ids: np.ndarray | None = None
+        self._removed: set[int] = set()  # ids whose originals are dropped on the next save
+        self._tombstones: set[int] = set()  # HNSW only: removed ids still in the graph
+        self._mmap_path: str | None = None
+
+    @property
+    def ntotal(self) -> int:
+        """Number of live (searchable) vectors."""
+        stored = self.index.ntotal if self.index is not None else 0
+        return stored - len(self._tombstones) + self._pending_count
+
+    @property
+    def dimension(self) -> int | None:
+        if self.index is not None:
+            return self.index.d
+        return self._pending[0][0].shape[1] if self._pending else None
+
+    @property
+    def originals(self) -> np.ndarray | None:
+        """float16 copies of the vectors, row-aligned with `original_ids` (lossy indexes only)."""
+        self._merge_originals()
+        return self._originals
+
+    @property
+    def original_ids(self) -> np.ndarray | None:
+        """Sorted ids of the rows in `originals`."""
+        self._merge_originals()
+        return self._original_ids
+
+    def _merge_originals(self):
+        if not self._originals_parts:
+            return
+        parts = self._originals_parts
+        # An empty array from `load` may not have the full dimension; it adds nothing anyway
+        if self._originals is not None and len(self._originals):
+            parts = [(self._originals, self._original_ids)] + parts
+        vectors = np.concatenate([p[0] for p in parts])
+        ids = np.concatenate([p[1] for p in parts])
+        if np.any(ids[1:] <= ids[:-1]):
+            order = np.argsort(ids, kind="stable")
+            vectors, ids = vectors[order], ids[order]
+        self._originals, self._original_ids = vectors, ids
+        self._originals_parts = []
+
+    @property
+    def uses_tombstones(self) -> bool:
+        return self.config.kind == "hnsw"
+
+    def _truncate(self, vectors: np.ndarray) -> np.ndarray:
+        dim = self.config.truncate_dim
+        if not dim or dim == vectors.shape[1]:
+            return vectors
+        if dim > vectors.shape[1]:
+            raise ValueError(f"truncate_dim={dim} exceeds the embedding dimension {vectors.shape[1]}")
+        return normalize(vectors[:, :dim])
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray):
+        """Add `vectors` under `ids` (one unique int64 id per row, not already in the index)."""
+        vectors = normalize(vectors)
+        ids = np.asarray(ids, dtype="int64")
+        if len(ids) != len(vectors):
+            raise ValueError(f"Got {len(vectors)} vectors but {len(ids)} ids")
+        if self.config.rescores:
+            self._originals_parts.append((vectors.astype("float16"), ids))
+        vectors = self._truncate(vectors)
+        if self.index is None and self.config.needs_training:
+            self._pending.append((vectors, ids))
+            self._pending_count += len(vectors)
+            if self._pending_count >= self.config.train_sample:
+                self.flush()
+            return
+        if self.index is None:
+            self.index = create_index(vectors.shape[1], self.config)
+            self.set_search_params()
+        self._add_to_index(vectors, ids)
+
+    def _add_to_index(self, vectors: np.ndarray, ids: np.ndarray):
+        self._make_writable()
+        if self.config.quantization == "binary":
+            self.index.add_with_ids(binary_codes(vectors), ids)
+        else:
+            self.index.add_with_ids(vectors, ids)
+
+    def _make_writable(self):
+        # Memory-mapped IVF lists are read-only; re-read the file fully the
+        # first time a loaded index is modified.
+        if self._mmap_path is not None:
+            self.index = faiss.read_index(self._mmap_path)
+            self._mmap_path = None
+            self.set_search_params()
+
+    def remove(self, ids: np.ndarray) -> int:
+        """Remove the vectors stored under `ids`; unknown ids are ignored. Returns how many were removed."""
+        ids = np.unique(np.asarray(ids, dtype="int64"))
+        if len(ids) == 0:
+            return 0
+        removed = 0
+        if self._pending:
+            kept = []
+            for vectors, pending_ids in self._pending:
+                keep = ~np.isin(pending_ids, ids)
+                removed += int(np.count_nonzero(~keep))
+                kept.append((vectors[keep], pending_ids[keep]))
+            self._pending = kept
+            self._pending_count -= removed
+
+        if self.index is not None:
+            if self.uses_tombstones:
+                stored = faiss.vector_to_array(self.index.id_map)
+                new = set(ids[np.isin(ids, stored)].tolist()) - self._tombstones
+                self._tombstones |= new
+                removed += len(new)
+            else:
+                self._make_writable()
+                removed += self.index.remove_ids(ids)
+
+        if self.config.rescores:
+            self._removed.update(ids.tolist())
+        return removed
+
+    def flush(self):
+        """Train on the vectors held back so far and add them to the index."""
+        if not self._pending:
+            return
+        vectors = np.vstack([p[0] for p in self._pending])
+        ids = np.concatenate([p[1] for p in self._pending])
+        self._pending = []
+        self._pending_count = 0
+        if len(vectors) == 0:
+            return
+
+        self.index = create_index(vectors.shape[1], self.config, n_train=len(vectors))
+        sample = vectors
+        if len(vectors) > self.config.train_sample:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), self.config.train_sample, replace=False)]
+        if self.config.kind == "ivf_pq" and len(sample) < 2 ** self.config.pq_nbits:
+            raise ValueError(
+                f"ivf_pq needs at least {2 ** self.config.pq_nbits} training vectors, got {len(sample)}"
+            )
+        self.index.train(sample)
+        self._add_to_index(vectors, ids)
+        self.set_search_params()
+
+    def set_search_params(self, nprobe: int = None, ef_search: int = None, rescore_factor: int = None):
+        """Apply search-time knobs; arguments override (and update) the config."""
+        if nprobe is not None:
+            self.config.nprobe = nprobe
+        if ef_search is not None:
+            self.config.ef_search = ef_search
+        if rescore_factor is not None:
+            self.config.rescore_factor = rescore_factor
+        if self.index is None:
+            return
+        if self.config.quantization == "binary":
+            if self.config.kind == "hnsw":
+                faiss.downcast_IndexBinary(self.index.index).hnsw.efSearch = self.config.ef_search
+            return
+        params = faiss.ParameterSpace()
+        if self.config.kind in ("ivf_flat", "ivf_pq"):
+            params.set_index_parameter(self.index, "nprobe", self.config.nprobe)
+        elif self.config.kind == "hnsw":
+            params.set_index_parameter(self.index, "efSearch", self.config.ef_search)
+
+    def search(self, queries: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Return (scores, ids); scores are cosine similarities, ids are -1 where padded."""
+        self.flush()
+        if self.index is None or self.index.ntotal == 0:
+            empty = np.full((len(queries), k), -1, dtype="int64")
+            return np.zeros((len(queries), k), dtype="float32"), empty
+
+        queries = normalize(queries)
+        index_queries = self._truncate(queries)
+        params = self._search_params()
+        if not self.config.rescores:
+            return self.index.search(index_queries, k, params=params)
+
+        n_candidates = min(k * max(self.config.rescore_factor, 1), self.index.ntotal)
+        if self.config.quantization == "binary":
+            _, candidates = self.index.search(binary_codes(index_queries), n_candidates, params=params)
+        else:
+            _, candidates = self.index.search(index_queries, n_candidates, params=params)
+        return self._rescore(queries, candidates, k)
+
+    def _search_params(self):
+        if not self._tombstones:
+            return None
+        # Skip tombstoned ids during the graph walk, so k live results still come back
+        tombstones = np.fromiter(self._tombstones, dtype="int64", count=len(self._tombstones))
+        return faiss.SearchParametersHNSW(
+            efSearch=self.config.ef_search,
+            sel=faiss.IDSelectorNot(faiss.IDSelectorBatch(tombstones)),
+        )
+
+    def _rescore(self, queries: np.ndarray, candidates: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        valid = candidates >= 0
+        # Gather (n_queries, n_candidates, dim) originals, then one dot product per candidate
+        positions = np.searchsorted(self.original_ids, np.where(valid, candidates, 0))
+        vectors = self.originals[np.minimum(positions, len(self.original_ids) - 1)].astype("float32")
+        scores = np.einsum("qcd,qd->qc", vectors, queries)
+        scores[~valid] = -np.inf
+
+        top = np.argsort(-scores, axis=1)[:, :k]
+        ids = np.take_along_axis(candidates, top, axis=1)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        missing = ~np.isfinite(top_scores)
+        ids[missing] = -1
+        top_scores[missing] = 0.0
+        if ids.shape[1] < k:
+            pad = k - ids.shape[1]
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+            top_scores = np.pad(top_scores, ((0, 0), (0, pad)))
+        return top_scores.astype("float32"), ids
+
+    def memory_bytes(self) -> int:
+        """Approximate RAM taken by the stored codes."""
+        if self.dimension is None:
+            return 0
+        return int(self.ntotal * self.config.bytes_per_vector(self.dimension))
+
+    def save(self, directory: str):
+        """
+        Write the index to `directory`.
+
+        Files are replaced atomically, so saving over the directory this
+        index (or another process) was loaded from is safe. Originals of
+        removed vectors are dropped here rather than on every `remove`.
+        """
+        self.flush()
+        os.makedirs(directory, exist_ok=True)
+        index_path = os.path.join(directory, self.INDEX_FILE)
+        if self.config.quantization == "binary":
+            _replace_file(index_path, lambda path: faiss.write_index_binary(self.index, path))
+        else:
+            _replace_file(index_path, lambda path: faiss.write_index(self.index, path))
+        with open(os.path.join(directory, self.CONFIG_FILE), "w") as f:
+            json.dump(asdict(self.config), f)
+        if self.config.rescores:
+            originals, original_ids = self.originals, self.original_ids
+            if self._removed:
+                keep = ~np.isin(original_ids, np.fromiter(self._removed, dtype="int64"))
+                originals, original_ids = originals[keep], original_ids[keep]
+            self._originals, self._original_ids = originals, original_ids
+            self._removed = set()
+            _replace_file(os.path.join(directory, self.ORIGINALS_FILE), originals.tofile)
+            _replace_file(
+                os.path.join(directory, self.ORIGINAL_IDS_FILE),
+                lambda path: _save_array(path, original_ids),
+            )
+        tombstones = np.array(sorted(self._tombstones), dtype="int64")
+        _replace_file(
+            os.path.join(directory, self.TOMBSTONES_FILE),
+            lambda path: _save_array(path, tombstones),
+        )
+
+    @classmethod
+    def load(cls, directory: str) -> "VectorIndex":
+        with open(os.path.join(directory, cls.CONFIG_FILE)) as f:
+            vector_index = cls(IndexConfig(**json.load(f)))
+        index_path = os.path.join(directory, cls.INDEX_FILE)
+        if vector_index.config.quantization == "binary":
+            vector_index.index = faiss.read_index_binary(index_path)
+        else:
+            try:
+                vector_index.index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+                if vector_index.config.kind in ("ivf_flat", "ivf_pq"):
+                    vector_index._mmap_path = index_path
+            except RuntimeError:
+                # Not every index type can be memory-mapped
+                vector_index.index = faiss.read_index(index_path)
+        if vector_index.config.rescores:
+            original_ids = np.load(os.path.join(directory, cls.ORIGINAL_IDS_FILE), mmap_mode="r")
+            if len(original_ids):
+                originals = np.memmap(os.path.join(directory, cls.ORIGINALS_FILE), dtype="float16", mode="r")
+                # Originals keep the full dimension, which differs from index.d when truncating
+                vector_index._originals = originals.reshape(len(original_ids), -1)
+            else:
+                # Every vector was removed, and an empty file cannot be memory-mapped. The
+                # dimension is unknown if they were removed before the index was trained
+                vector_index._originals = np.empty((0, vector_index.dimension or 0), dtype="float16")
+            vector_index._original_ids = original_ids
+        tombstones_path = os.path.join(directory, cls.TOMBSTONES_FILE)
+        if os.path.exists(tombstones_path):
+            vector_index._tombstones = set(np.load(tombstones_path).tolist())
+        vector_index.set_search_params()
+        return vector_index
+
+
+# ------benchmark---------
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    configs: list[IndexConfig],
+    k: int = 10,
+) -> list[dict]:
+    """
+    Measure recall@k, search latency and code memory of each config against exact flat search.
+
+    Returns one row per config, starting with the flat baseline.
+    """
+    def run(config: IndexConfig) -> tuple[dict, np.ndarray]:
+        start = time.perf_counter()
+        vector_index = VectorIndex(replace(config))
+        vector_index.add(vectors, np.arange(len(vectors)))
+        vector_index.flush()
+        build_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, found = vector_index.search(queries, k)
+        latency = (time.perf_counter() - start) * 1000 / len(queries)
+
+        params = {
+            "hnsw": f"M={config.hnsw_m} efSearch={config.ef_search}",
+            "ivf_flat": f"nlist={config.nlist} nprobe={config.nprobe}",
+            "ivf_pq": f"nlist={config.nlist} nprobe={config.nprobe} PQ{config.pq_m}x{config.pq_nbits}",
+        }.get(config.kind, "")
+        if config.quantization != "none":
+            params = f"{params} {config.quantization}".strip()
+        if config.truncate_dim:
+            params = f"{params} dim={config.truncate_dim}".strip()
+        if config.rescores:
+            params = f"{params} rescore x{config.rescore_factor}".strip()
+        row = {
+            "kind": config.kind, "params": params, "build_s": build_s,
+            "latency_ms": latency, "memory_mb": vector_index.memory_bytes() / 2 ** 20,
+        }
+        return row, found
+
+    baseline, exact = run(IndexConfig(kind="flat"))
+    baseline["recall_at_k"] = 1.0
+    rows = [baseline]
+    for config in configs:
+        row, found = run(config)
+        hits = sum(len(set(f) & set(e)) for f, e in zip(found, exact))
+        row["recall_at_k"] = hits / (len(queries) * k)
+        rows.append(row)
+    return rows
+
+
+def format_recall_report(rows: list[dict], k: int = 10) -> str:
+    lines = [
+        f"{'index':<10} {'params':<48} {'build s':>8} {'ms/query':>9} "
+        f"{'codes MB':>9} {f'recall@{k}':>10}"
+    ]
+    for row in rows:
+        lines.append(
+            f"{row['kind']:<10} {row['params']:<48} {row['build_s']:>8.2f} "
+            f"{row['latency_ms']:>9.3f} {row['memory_mb']:>9.1f} {row['recall_at_k']:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # Synthetic clustered vectors: python -m src.retrieval.vector_index [n_vectors] [dimension]
+    # Recall vs truncated dimension: python -m src.retrieval.vector_index --dimensions [n_vectors] [dimension]
+    sweep = "--dimensions" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--dimensions"]
+    n = int(args[0]) if args else 50_000
+    dimension = int(args[1]) if len(args) > 1 else (1536 if sweep else 256)
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((256, dimension)).astype("float32")
+    vectors = centers[rng.integers(0, 256, n)] + 2.0 * rng.standard_normal((n, dimension)).astype("float32")
+    queries = vectors[rng.choice(n, 200, replace=False)] + 0.5 * rng.standard_normal((200, dimension)).astype("float32")
+
+    if sweep:
+        # Matryoshka training front-loads information; mimic it with a decaying per-dimension scale
+        scale = (1 + np.arange(dimension, dtype="float32")) ** -0.5
+        vectors, queries = vectors * scale, queries * scale
+        configs = [
+            IndexConfig(truncate_dim=dim, full_rerank=full_rerank)
+            for dim in (256, 512, 768) if dim < dimension
+            for full_rerank in (False, True)
+        ]
+        print(format_recall_report(recall_report(vectors, queries, configs), k=10))
+        sys.exit(0)
+
+    configs = [
+        IndexConfig(kind="hnsw", ef_search=32),
+        IndexConfig(kind="hnsw", ef_search=128),
+        IndexConfig(kind="ivf_flat", nlist=256, nprobe=8),
+        IndexConfig(kind="ivf_flat", nlist=256, nprobe=32),
+        IndexConfig(kind="ivf_pq", nlist=256, nprobe=32, pq_m=dimension // 8),
+        IndexConfig(kind="flat", quantization="int8"),
+        IndexConfig(kind="flat", quantization="binary", rescore_factor=4),
+        IndexConfig(kind="flat", quantization="binary", rescore_factor=16),
+    ]
+    print(format_recall_report(recall_report(vectors, queries, configs), k=10))
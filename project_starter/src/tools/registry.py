@@ -1,18 +1,49 @@
+import asyncio
+import contextvars
+import functools
+import hashlib
 import inspect
-from typing import Any, Callable, Dict
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, NotRequired, TypedDict
+
+from pydantic import BaseModel, TypeAdapter, create_model
+
+
+def schema_hash(schema: Any) -> str:
+    """Stable SHA-256 of a JSON-serializable schema (key order does not matter)."""
+    payload = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def toolset_hash(tools: list["Tool"]) -> str:
+    """Hash of a list of tools' schemas, from their cached per-tool hashes."""
+    return schema_hash([tool.schema_hash for tool in tools])
 
-from pydantic import BaseModel, create_model
 
 class Tool:
-    """A callable tool with schema."""
+    """
+    A callable tool with schema.
+
+    The OpenAI schema and its hash are built once, when the tool is created
+    (registering a name again creates a new Tool). Arguments are validated
+    against the same signature by a TypeAdapter over a TypedDict, which
+    parses an LLM's raw JSON arguments straight into the keyword-argument
+    dict (`validate_json`), with no intermediate model instance or dump.
+    """
     def __init__(self, name: str, func: Callable, description: str):
         self.name = name
         self.func = func
         self.description = description
-        self.model = self._create_pydantic_model(func)
-
-    def _create_pydantic_model(self, func: Callable) -> type[BaseModel]:
-        """Create a Pydantic model from function signature."""
+        fields = self._signature_fields(func)
+        self.model = self._create_pydantic_model(fields)
+        self._arguments = self._create_arguments_adapter(fields)
+        self._schema = self._build_openai_schema()
+        self.schema_hash = schema_hash(self._schema)
+
+    @staticmethod
+    def _signature_fields(func: Callable) -> dict[str, tuple[Any, Any]]:
+        """Map each parameter to (annotation, default), with ... for required ones."""
         sig = inspect.signature(func)
         fields = {}
         for name, param in sig.parameters.items():
@@ -28,10 +59,25 @@ class Tool:
                 fields[name] = (annotation, ...)
             else:
                 fields[name] = (annotation, default)
+        return fields
 
+    def _create_pydantic_model(self, fields: dict[str, tuple[Any, Any]]) -> type[BaseModel]:
+        """Create a Pydantic model from function signature."""
         return create_model(f"{self.name}Schema", **fields)
 
+    def _create_arguments_adapter(self, fields: dict[str, tuple[Any, Any]]) -> TypeAdapter:
+        # Optional parameters may be left out; func then applies its own default
+        keys = {
+            name: annotation if default is ... else NotRequired[annotation]
+            for name, (annotation, default) in fields.items()
+        }
+        return TypeAdapter(TypedDict(f"{self.name}Arguments", keys))
+
     def to_openai_schema(self) -> dict:
+        """The tool's OpenAI function schema (built once; do not mutate it)."""
+        return self._schema
+
+    def _build_openai_schema(self) -> dict:
         """Convert tool to OpenAI function schema format using Pydantic."""
         schema = self.model.model_json_schema()
 
@@ -50,16 +96,26 @@ class Tool:
             },
         }
 
+    def validate(self, kwargs: dict) -> dict:
+        """Validated (and type-converted) keyword arguments for `func`."""
+        return self._arguments.validate_python(kwargs)
+
+    def validate_json(self, arguments: str) -> dict:
+        """Like `validate`, parsing the raw JSON arguments of an LLM tool call directly."""
+        return self._arguments.validate_json(arguments or "{}")
+
     def execute(self, **kwargs) -> Any:
         # Validate arguments using the model
-        validated_args = self.model(**kwargs)
-        return self.func(**validated_args.model_dump())
+        return self.func(**self.validate(kwargs))
 
 class ToolRegistry:
     """Registry for managing available tools."""
-    def __init__(self):
+    def __init__(self, max_workers: int = 8):
         self._tools: Dict[str, Tool] = {}
         self._categories: Dict[str, list[str]] = {}
+        # Synchronous tools run here when executed from async code
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
 
     def register(self, name: str, description: str, category: str = "general"):
         """
@@ -77,6 +133,12 @@ class ToolRegistry:
     
         def decorator(func: Callable):
             tool = Tool(name=name, description=description, func=func)
+            previous = self._tools.get(name)
+            if previous is not None:
+                # Re-registration replaces the tool (and its cached schema) everywhere
+                for tools in self._categories.values():
+                    if previous in tools:
+                        tools.remove(previous)
             self._tools[name]=tool
             if category not in self._categories:
                 self._categories[category] = []
@@ -104,8 +166,30 @@ class ToolRegistry:
         if tool is None:
             raise ValueError(f"Tool '{name}' not found")
         # Convert types based on pydantic model
-        validated = tool.model(**kwargs)
-        return tool.func(**validated.model_dump())
+        return tool.func(**tool.validate(kwargs))
+
+    async def aexecute_tool(self, name: str, **kwargs) -> Any:
+        """Async variant of execute_tool that never blocks the event loop (see `arun`)."""
+        tool = self.get_tool(name)
+        if tool is None:
+            raise ValueError(f"Tool '{name}' not found")
+        return await self.arun(tool, tool.validate(kwargs))
+
+    async def arun(self, tool: Tool, validated: dict) -> Any:
+        """
+        Call `tool` with arguments already checked by `tool.validate` or
+        `tool.validate_json`. Coroutine tools are awaited; plain functions run
+        in a thread pool of `max_workers` threads shared by every caller of
+        this registry, with the caller's context variables (such as the
+        request deadline, see src/deadline.py).
+        """
+        if inspect.iscoroutinefunction(tool.func):
+            return await tool.func(**validated)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, context.run, functools.partial(tool.func, **validated))
 
 # Global registry instance
 registry = ToolRegistry()
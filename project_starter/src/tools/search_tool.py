@@ -5,6 +5,7 @@ from urllib.parse import urlparse
 import requests
 from bs4 import BeautifulSoup
 
+from src.deadline import request_timeout
 from src.tools.registry import registry
 
 logger = logging.getLogger(__name__)
@@ -57,7 +58,8 @@ def search_web(query: str, max_results: int = 5) -> list[dict]:
     headers = {"User-Agent": "Mozilla/5.0"}
 
     try:
-        response = requests.post(url, data={"q": query}, headers=headers, timeout=10)
+        # Never outlive the request deadline (requests cannot be cancelled from the event loop)
+        response = requests.post(url, data={"q": query}, headers=headers, timeout=request_timeout(10))
         response.raise_for_status()
     except Exception as e:
         logger.error(f"Search request failed: {e}")
@@ -101,7 +103,7 @@ def read_webpage(url: str) -> str:
 
         logger.info(f"Reading webpage: {url}")
         headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        response = requests.get(url, headers=headers, timeout=request_timeout(10))
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, "html.parser")
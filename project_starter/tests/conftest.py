@@ -0,0 +1,87 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+# Tests import `src.*` from the project root, as the application does
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# Use litellm's bundled model cost map instead of fetching it at import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from litellm import ModelResponse  # noqa: E402
+from litellm.types.utils import (  # noqa: E402
+    ChatCompletionDeltaToolCall, Delta, Function, ModelResponseStream, StreamingChoices,
+)
+
+import src.agent.observable_agent as observable_agent  # noqa: E402
+
+
+class FakeLLM:
+    """
+    Stands in for litellm's acompletion: every call is recorded in `calls`
+    and answered by `reply(params)` after `delay` seconds. With
+    `stream=True` the reply is sent as one chunk per word or tool call,
+    `gap` seconds apart.
+    """
+    def __init__(self):
+        self.calls = []
+        self.delay = 0.0
+        self.gap = 0.0
+        self.reply = lambda params: self.text("done")
+
+    @staticmethod
+    def text(content, usage=(100, 20)) -> ModelResponse:
+        return ModelResponse(
+            model="gpt-4o-mini",
+            choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            usage={"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)},
+        )
+
+    @staticmethod
+    def tool_calls(*calls, usage=(100, 20)) -> ModelResponse:
+        """A response calling each (tool name, arguments dict) in `calls`."""
+        return ModelResponse(
+            model="gpt-4o-mini",
+            choices=[{"index": 0, "finish_reason": "tool_calls", "message": {
+                "role": "assistant", "content": None,
+                "tool_calls": [
+                    {"id": f"call_{i}", "type": "function",
+                     "function": {"name": name, "arguments": json.dumps(arguments)}}
+                    for i, (name, arguments) in enumerate(calls)
+                ],
+            }}],
+            usage={"prompt_tokens": usage[0], "completion_tokens": usage[1], "total_tokens": sum(usage)},
+        )
+
+    async def __call__(self, **params):
+        self.calls.append(params)
+        await asyncio.sleep(self.delay)
+        response = self.reply(params)
+        return self._stream(response) if params.get("stream") else response
+
+    async def _stream(self, response: ModelResponse):
+        message = response.choices[0].message
+        deltas = [Delta(content=word) for word in (message.content or "").split(" ") if word]
+        deltas = [Delta(content=d.content if i == 0 else " " + d.content) for i, d in enumerate(deltas)]
+        for i, call in enumerate(message.tool_calls or []):
+            deltas.append(Delta(tool_calls=[ChatCompletionDeltaToolCall(
+                index=i, id=call.id, type="function",
+                function=Function(name=call.function.name, arguments=call.function.arguments),
+            )]))
+        for delta in deltas:
+            await asyncio.sleep(self.gap)
+            yield ModelResponseStream(model="gpt-4o-mini", choices=[StreamingChoices(index=0, delta=delta)])
+        yield ModelResponseStream(model="gpt-4o-mini", choices=[
+            StreamingChoices(index=0, delta=Delta(), finish_reason=response.choices[0].finish_reason)
+        ])
+
+
+@pytest.fixture
+def fake_llm(monkeypatch) -> FakeLLM:
+    """Route the agents' LLM calls to a FakeLLM; every call costs $0.001."""
+    llm = FakeLLM()
+    monkeypatch.setattr(observable_agent, "acompletion", llm)
+    monkeypatch.setattr(observable_agent, "completion_cost", lambda completion_response: 0.001)
+    return llm
@@ -0,0 +1,101 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.budget import COST, DEADLINE, INPUT_TOKENS, OUTPUT_TOKENS, BudgetUsage, RunBudget
+from src.agent.observable_agent import ObservableAgent
+from src.tools.registry import registry
+
+
+@registry.register("lookup_budget_test", "Look up one fact", category="budget_test")
+async def lookup_budget_test(n: int) -> str:
+    await asyncio.sleep(0.05)
+    return f"fact {n}"
+
+
+def researcher(fake_llm, answer_after=None):
+    """Calls the tool every round (until `answer_after` rounds, if given); tool-less calls synthesize."""
+    def reply(params):
+        rounds = sum(1 for m in params["messages"] if isinstance(m, dict) and m.get("role") == "tool")
+        if "tools" not in params:
+            return fake_llm.text(f"Synthesis of {rounds} facts.")
+        if answer_after is not None and rounds >= answer_after:
+            return fake_llm.text(f"Answer from {rounds} facts.")
+        return fake_llm.tool_calls(("lookup_budget_test", {"n": rounds}))
+
+    fake_llm.reply = reply
+
+
+def run(budget=None, max_steps=10):
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, max_steps=max_steps,
+                            tools=registry.get_tools_by_category("budget_test"))
+    return asyncio.run(agent.run("Collect facts.", budget=budget))
+
+
+def test_runs_several_rounds_until_the_model_answers(fake_llm):
+    researcher(fake_llm, answer_after=3)
+    result = run()
+    assert (result["stop_reason"], result["steps"], result["answer"]) == ("answer", 4, "Answer from 3 facts.")
+
+
+def test_last_step_synthesizes_without_tools(fake_llm):
+    researcher(fake_llm)
+    result = run(max_steps=3)
+    assert result["stop_reason"] == "max_steps"
+    assert ["tools" in call for call in fake_llm.calls] == [True, True, False]
+    assert result["answer"] == "Synthesis of 2 facts."
+
+
+def test_deadline_stops_the_run_with_an_answer(fake_llm):
+    researcher(fake_llm)
+    fake_llm.delay = 0.1
+    start = time.monotonic()
+    result = run(budget=RunBudget(deadline_s=1.0))
+    assert result["stop_reason"] == DEADLINE
+    assert time.monotonic() - start < 1.0
+    assert result["answer"].startswith("Synthesis of")
+    assert "tools" not in fake_llm.calls[-1]
+
+
+@pytest.mark.parametrize("budget, reason", [
+    (RunBudget(max_input_tokens=450), INPUT_TOKENS),
+    (RunBudget(max_output_tokens=70), OUTPUT_TOKENS),
+    (RunBudget(max_cost_usd=0.0045), COST),
+])
+def test_token_and_cost_limits_stop_the_run(fake_llm, budget, reason):
+    researcher(fake_llm)  # every call: 100 tokens in, 20 out, $0.001
+    result = run(budget=budget)
+    assert result["stop_reason"] == reason
+    assert result["answer"].startswith("Synthesis of")
+    if budget.max_input_tokens is not None:
+        assert len(fake_llm.calls) * 100 <= budget.max_input_tokens
+    if budget.max_output_tokens is not None:
+        assert len(fake_llm.calls) * 20 <= budget.max_output_tokens
+        assert all(call["max_tokens"] <= budget.max_output_tokens for call in fake_llm.calls)
+    if budget.max_cost_usd is not None:
+        assert result["total_cost"] <= budget.max_cost_usd
+
+
+def test_a_spent_budget_makes_no_call(fake_llm):
+    researcher(fake_llm)
+    result = run(budget=RunBudget(deadline_s=0))
+    assert result["stop_reason"] == DEADLINE
+    assert result["answer"] == "Stopped before answering: the deadline budget ran out."
+    assert fake_llm.calls == []
+
+
+def test_usage_projection():
+    usage = BudgetUsage()
+    usage.add_call(input_tokens=100, output_tokens=20, cost_usd=0.01, duration_s=0.5)
+    budget = RunBudget(max_input_tokens=300, max_output_tokens=60, max_cost_usd=0.03)
+    assert usage.exceeds(budget, input_tokens=100, output_tokens=20, cost_usd=0.01) is None
+    assert usage.exceeds(budget, input_tokens=100, output_tokens=20, cost_usd=0.01, calls=2) == OUTPUT_TOKENS
+    assert usage.exceeds(budget, input_tokens=250, output_tokens=1, cost_usd=0.0) == INPUT_TOKENS
+    assert usage.exceeds(budget, input_tokens=1, output_tokens=1, cost_usd=0.03) == COST
+    assert usage.exhausted(budget) is None
+    assert usage.exhausted(RunBudget(max_cost_usd=0.01)) == COST
+    # Two more 0.5 s calls do not fit in the second left of a 1.5 s deadline
+    usage.started -= 0.5
+    assert usage.exceeds(RunBudget(deadline_s=1.5), 0, 0, 0.0, calls=2) == DEADLINE
+    assert usage.exceeds(RunBudget(deadline_s=1.5), 0, 0, 0.0, calls=1) is None
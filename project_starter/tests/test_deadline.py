@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.observable_agent import ObservableAgent
+from src.agent.orchestrator import Orchestrator
+from src.deadline import Deadline, DeadlineExceeded, request_timeout
+from src.tools.registry import registry
+
+seen_timeouts = []
+
+
+@registry.register("fetch_deadline_test", "Blocking fetch", category="deadline_test")
+def fetch_deadline_test(n: int) -> str:
+    # A thread-pool tool: it cannot be cancelled, so it bounds its own I/O
+    seen_timeouts.append(request_timeout(10))
+    time.sleep(0.02)
+    return f"page {n}"
+
+
+def agent():
+    return ObservableAgent(model="gpt-4o-mini", verbose=False, tools=registry.get_tools_by_category("deadline_test"))
+
+
+def fetcher(fake_llm, hang_after=None):
+    """Fetches a page every round; the calls after the first `hang_after` never return."""
+    def reply(params):
+        if hang_after is not None and len(fake_llm.calls) >= hang_after:
+            fake_llm.delay = 100
+        if "tools" not in params:
+            return fake_llm.text("Synthesis.")
+        return fake_llm.tool_calls(("fetch_deadline_test", {"n": len(fake_llm.calls)}))
+
+    fake_llm.reply = reply
+
+
+def test_remaining_and_timeouts():
+    assert Deadline().remaining() is None and Deadline().timeout(5) == 5
+    deadline = Deadline(10)
+    assert 9 < deadline.remaining() <= 10
+    assert deadline.timeout(5) == 5 and deadline.timeout() <= 10
+    expired = Deadline(0)
+    assert expired.expired and expired.timeout(5) == 0.001  # never 0, which means "no timeout" to HTTP clients
+    cancelled = Deadline(10)
+    cancelled.cancel()
+    assert cancelled.expired and str(cancelled.exceeded()) == "request cancelled"
+
+
+def test_scope_raises_deadline_exceeded():
+    async def main():
+        async with Deadline(0.05).scope():
+            await asyncio.sleep(1)
+
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded, match="deadline exceeded"):
+        asyncio.run(main())
+    assert time.monotonic() - start < 0.5
+
+
+def test_scope_keeps_other_timeouts_and_nests():
+    async def main():
+        deadline = Deadline(5)
+        with pytest.raises(TimeoutError) as error:
+            async with deadline.scope():
+                raise TimeoutError("an inner timeout")
+        assert not isinstance(error.value, DeadlineExceeded)
+        async with deadline.scope():
+            async with deadline.scope():
+                assert Deadline.current() is deadline
+            assert Deadline.current() is deadline
+        assert Deadline.current() is None
+
+    asyncio.run(main())
+
+
+def test_cancel_stops_the_scope_at_once():
+    async def main():
+        deadline = Deadline()
+        asyncio.get_running_loop().call_later(0.05, deadline.cancel)
+        async with deadline.scope():
+            await asyncio.sleep(1)
+
+    with pytest.raises(DeadlineExceeded, match="request cancelled"):
+        asyncio.run(main())
+
+
+def test_hung_llm_call_is_cancelled_at_the_deadline(fake_llm):
+    fetcher(fake_llm, hang_after=2)
+    seen_timeouts.clear()
+    runner = agent()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(runner.run("Fetch pages.", deadline=Deadline(0.9)))
+    assert time.monotonic() - start < 1.2
+    assert [trace.status for trace in runner.tracer._traces.values()] == ["cancelled"]
+    # LLM and tool calls got timeouts bounded by the deadline
+    assert all(call["timeout"] <= 0.9 for call in fake_llm.calls)
+    assert seen_timeouts and all(timeout <= 0.9 for timeout in seen_timeouts)
+
+
+def test_current_deadline_is_picked_up_by_agents(fake_llm):
+    fetcher(fake_llm)
+    fake_llm.delay = 100
+
+    async def main():
+        async with Deadline(0.2).scope():
+            await agent().run("Fetch pages.")
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(main())
+
+
+def test_failed_call_past_the_deadline_raises_in_streams(fake_llm):
+    def timed_out(params):
+        raise TimeoutError("HTTP read timeout")
+
+    fake_llm.reply = timed_out
+    fake_llm.delay = 0.25
+    runner = agent()
+
+    async def consume():
+        async for _ in runner.stream("Fetch pages.", deadline=Deadline(0.2)):
+            pass
+
+    with pytest.raises(DeadlineExceeded) as error:
+        asyncio.run(consume())
+    assert isinstance(error.value.__cause__, TimeoutError)
+    assert [trace.status for trace in runner.tracer._traces.values()] == ["cancelled"]
+
+
+def test_enough_time_left_ends_with_an_answer(fake_llm):
+    fetcher(fake_llm)
+    fake_llm.delay = 0.15
+    result = asyncio.run(agent().run("Fetch pages.", deadline=Deadline(1.0)))
+    assert result["stop_reason"] == "deadline"
+    assert result["answer"] == "Synthesis."
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_orchestrator_raises_deadline_exceeded(fake_llm, pipelined):
+    fake_llm.delay = 100
+    orchestrator = Orchestrator()
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(orchestrator.run("Summarize cloud pricing", deadline=Deadline(0.2), pipelined=pipelined))
+    assert time.monotonic() - start < 0.5
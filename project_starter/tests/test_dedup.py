@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from src.retrieval.dedup import MinHashDeduplicator
+
+
+def text(seed, n_words=80):
+    rng = np.random.default_rng(seed)
+    return " ".join(f"w{i}" for i in rng.integers(0, 5000, size=n_words))
+
+
+def edited(original, n_edits):
+    words = original.split()
+    for i in range(n_edits):
+        words[-1 - 2 * i] = f"edit{i}"
+    return " ".join(words)
+
+
+def test_exact_and_near_copies_map_to_the_first_chunk():
+    deduplicator = MinHashDeduplicator(threshold=0.8)
+    base = text(0)
+    found = deduplicator.add([1, 2, 3, 4], [base, text(1), base, edited(base, 1)])
+    assert found == [None, None, 1, 1]
+    assert len(deduplicator) == 2
+
+
+def test_distinct_or_heavily_edited_chunks_are_kept():
+    deduplicator = MinHashDeduplicator(threshold=0.9)
+    base = text(0)
+    assert deduplicator.add([1, 2, 3], [base, edited(base, 20), text(2)]) == [None, None, None]
+
+
+def test_empty_text_is_never_a_duplicate():
+    deduplicator = MinHashDeduplicator()
+    assert deduplicator.add([1, 2], ["...", "..."]) == [None, None]
+    assert len(deduplicator) == 0
+
+
+@pytest.mark.parametrize("flush", [False, True])
+def test_removed_chunks_are_no_longer_matched(flush):
+    deduplicator = MinHashDeduplicator()
+    base = text(0)
+    deduplicator.add([1], [base])
+    if flush:
+        deduplicator.flush()
+    deduplicator.remove(np.array([1]))
+    assert deduplicator.add([2], [base]) == [None]
+    assert deduplicator.add([3], [base]) == [2]
+
+
+def test_save_load_round_trip(tmp_path):
+    deduplicator = MinHashDeduplicator(threshold=0.85, num_perm=128)
+    texts = [text(seed) for seed in range(50)]
+    deduplicator.add(list(range(50)), texts)
+    deduplicator.save(str(tmp_path))
+
+    loaded = MinHashDeduplicator.load(str(tmp_path))
+    assert (loaded.threshold, loaded.num_perm, len(loaded)) == (0.85, 128, 50)
+    np.testing.assert_array_equal(loaded.signature(texts[7]), deduplicator.signature(texts[7]))
+    assert loaded.add([100, 101], [texts[7], text(99)]) == [7, None]
+
+
+def test_band_size_puts_the_s_curve_below_the_threshold():
+    for threshold in (0.5, 0.8, 0.9, 0.95):
+        deduplicator = MinHashDeduplicator(threshold=threshold)
+        assert (1 / deduplicator.bands) ** (1 / deduplicator.rows) <= threshold
@@ -0,0 +1,57 @@
+import numpy as np
+
+from src.retrieval.embedding_backends import HashingEmbeddingBackend
+from src.retrieval.embedding_cache import EmbeddingCache
+from src.retrieval.embeddings import BatchEmbedder
+
+
+class CountingBackend(HashingEmbeddingBackend):
+    def __init__(self):
+        super().__init__(dimensions=32)
+        self.texts = []
+
+    def embed_batch(self, texts):
+        self.texts.extend(texts)
+        return super().embed_batch(texts)
+
+
+def test_key_ignores_whitespace_but_not_model_or_dimension():
+    key = EmbeddingCache.make_key("m", 32, "hello  world\n")
+    assert key == EmbeddingCache.make_key("m", 32, " hello world")
+    assert key != EmbeddingCache.make_key("other", 32, "hello world")
+    assert key != EmbeddingCache.make_key("m", 64, "hello world")
+
+
+def test_vectors_persist_across_reopen(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = EmbeddingCache(path)
+    cache.put_many({"a": np.arange(4, dtype="float32")})
+    cache.close()
+
+    cache = EmbeddingCache(path)
+    found = cache.get_many(["a", "b"])
+    assert list(found) == ["a"]
+    np.testing.assert_array_equal(found["a"], np.arange(4, dtype="float32"))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+    vector = np.zeros(2, dtype="float32")
+    cache.put_many({"old": vector})
+    cache.put_many({"used": vector})
+    cache.get_many(["old"])
+    cache.put_many({"new": vector})
+    assert len(cache) == 2
+    assert set(cache.get_many(["old", "used", "new"])) == {"old", "new"}
+
+
+def test_embedder_only_sends_uncached_texts(tmp_path):
+    backend = CountingBackend()
+    embedder = BatchEmbedder(backend=backend, cache=EmbeddingCache(str(tmp_path / "cache.sqlite")))
+    first = embedder.embed(["alpha", "beta", "alpha"])
+    assert backend.texts == ["alpha", "beta"]
+
+    second = embedder.embed(["beta", "gamma"])
+    assert backend.texts == ["alpha", "beta", "gamma"]
+    np.testing.assert_array_equal(second[0], first[1])
@@ -0,0 +1,147 @@
+import asyncio
+import copy
+
+import pytest
+
+import src.agent.history as history_module
+from src.agent.history import ConversationHistory, load_encoding
+from src.agent.observable_agent import ObservableAgent
+from src.tools.registry import registry
+
+PAGE = "Regulators published new rules on cross-border data transfers and cloud hosting. " * 40
+
+
+@registry.register("read_page_history_test", "Read a long page", category="history_test")
+def read_page_history_test(n: int) -> str:
+    return f"page {n}: {PAGE}"
+
+
+@pytest.fixture(params=["bpe", "chars"])
+def tokenizer(request, monkeypatch):
+    """Run each test with the BPE encoding (when it can be loaded here) and with the offline estimate."""
+    if request.param == "chars":
+        monkeypatch.setattr(history_module, "load_encoding", lambda name=None: None)
+    elif load_encoding() is None:
+        pytest.skip("the BPE encoding is not available offline")
+    return request.param
+
+
+def tool_turn(step, content=PAGE):
+    return [
+        {"role": "assistant", "content": None, "tool_calls": [{
+            "id": f"call_{step}", "type": "function",
+            "function": {"name": "read_page", "arguments": f'{{"n": {step}}}'},
+        }]},
+        {"role": "tool", "tool_call_id": f"call_{step}", "name": "read_page", "content": content},
+    ]
+
+
+def new_history(max_tokens=None):
+    history = ConversationHistory(max_tokens=max_tokens or 10 ** 9, keep_recent_turns=2, tool_output_tokens=50)
+    if max_tokens is None:
+        # Room for the two recent turns and a few truncated ones, whatever the tokenizer
+        history.max_tokens = 3 * history._count_text(PAGE)
+    history.extend([{"role": "system", "content": "You are a research agent."},
+                    {"role": "user", "content": "Summarize the new data transfer rules."}])
+    return history
+
+
+def test_running_total_matches_a_recount(tokenizer):
+    history = new_history(max_tokens=10 ** 9)
+    for step in range(3):
+        history.extend(tool_turn(step))
+    assert history.tokens == sum(history._count(message) for message in history.messages())
+    assert history.compacted == 0
+
+
+def test_old_tool_outputs_are_compacted_oldest_first(tokenizer):
+    history = new_history()
+    for step in range(16):
+        history.extend(tool_turn(step))
+        assert history.tokens <= history.max_tokens
+    assert history.tokens == sum(history._count(message) for message in history.messages())
+
+    tool_outputs = [m["content"] for m in history.messages() if m["role"] == "tool"]
+    # Recent turns verbatim, older ones truncated, the oldest replaced by a stub
+    assert tool_outputs[-2:] == [PAGE, PAGE]
+    assert "truncated to save context" in tool_outputs[-3]
+    assert tool_outputs[0].startswith("[read_page output of") and tool_outputs[0].endswith("omitted to save context]")
+    assert history.messages()[:2] == [
+        {"role": "system", "content": "You are a research agent."},
+        {"role": "user", "content": "Summarize the new data transfer rules."},
+    ]
+
+
+def test_compacted_messages_never_change_again(tokenizer):
+    history = new_history()
+    sent = []
+    for step in range(16):
+        history.extend(tool_turn(step))
+        sent.append(copy.deepcopy(history.messages()))
+    for before, after in zip(sent, sent[1:]):
+        compacted = [i for i, m in enumerate(before) if m["role"] == "tool" and m["content"] != PAGE]
+        # A message compacted to a level keeps that exact text until it is compacted further
+        for i in compacted:
+            assert after[i]["content"] == before[i]["content"] or "omitted" in after[i]["content"]
+
+
+def test_callers_messages_are_not_modified(tokenizer):
+    history = new_history()
+    turns = [tool_turn(step) for step in range(16)]
+    for turn in turns:
+        history.extend(turn)
+    assert all(turn[1]["content"] == PAGE for turn in turns)
+
+
+def test_prompt_and_recent_turns_are_kept_over_budget(tokenizer):
+    history = new_history(max_tokens=100)
+    history.extend(tool_turn(0))
+    assert history.tokens > history.max_tokens
+    assert history.messages()[-1]["content"] == PAGE
+
+
+def test_unloadable_encoding_is_cached_as_none(monkeypatch):
+    calls = []
+
+    def failing(name=None):
+        calls.append(name)
+        raise ValueError("no such encoding")
+
+    monkeypatch.setattr(history_module, "get_encoding", failing)
+    history_module._load_encoding.cache_clear()
+    try:
+        assert load_encoding("missing") is None
+        assert load_encoding("missing") is None
+        assert calls == ["missing"]
+        # The history still counts, at CHARS_PER_TOKEN characters per token
+        history = ConversationHistory(max_tokens=1000, encoding_name="missing")
+        history.append({"role": "user", "content": "x" * 40})
+        assert history.tokens == history_module.MESSAGE_OVERHEAD_TOKENS + 10
+    finally:
+        history_module._load_encoding.cache_clear()
+
+
+def test_agent_and_its_histories_load_the_encoding_once(fake_llm):
+    history_module._load_encoding.cache_clear()
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, tools=[])
+    asyncio.run(agent.run("Summarize the new data transfer rules."))
+    ConversationHistory()
+    info = history_module._load_encoding.cache_info()
+    assert (info.misses, info.currsize) == (1, 1)
+
+
+def test_agent_prompts_stay_under_the_context_budget(fake_llm, tokenizer):
+    def reply(params):
+        rounds = sum(1 for m in params["messages"] if isinstance(m, dict) and m.get("role") == "tool")
+        if "tools" not in params or rounds >= 8:
+            return fake_llm.text("Summary.")
+        return fake_llm.tool_calls(("read_page_history_test", {"n": rounds}))
+
+    fake_llm.reply = reply
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, max_steps=12, max_context_tokens=2500,
+                            tools=registry.get_tools_by_category("history_test"))
+    result = asyncio.run(agent.run("Summarize the new data transfer rules."))
+    assert result["stop_reason"] == "answer"
+    last_prompt = fake_llm.calls[-1]["messages"]
+    assert sum(1 for m in last_prompt if isinstance(m, dict) and m.get("role") == "tool") == 8
+    assert any("omitted to save context" in (m.get("content") or "") for m in last_prompt if isinstance(m, dict))
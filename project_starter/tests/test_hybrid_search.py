@@ -0,0 +1,95 @@
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.retrieval.hybrid import weighted_rrf
+from src.retrieval.keyword_index import KeywordIndex, tokenize
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    # Zipf-distributed words, so queries mix common and rare terms
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(300)]
+    p = 1 / np.arange(1, len(words) + 1)
+    p /= p.sum()
+    return [" ".join(rng.choice(words, size=rng.integers(5, 40), p=p)) for _ in range(500)]
+
+
+def brute_force_bm25(texts, query, k1=1.5, b=0.75):
+    docs = [Counter(tokenize(text)) for text in texts]
+    avgdl = sum(sum(doc.values()) for doc in docs) / len(docs)
+    scores = np.zeros(len(docs))
+    for term, count in Counter(tokenize(query)).items():
+        df = sum(term in doc for doc in docs)
+        if not df:
+            continue
+        idf = math.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        for i, doc in enumerate(docs):
+            tf = doc[term]
+            norm = k1 * (1 - b + b * sum(doc.values()) / avgdl)
+            scores[i] += count * idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def build(texts):
+    index = KeywordIndex()
+    index.add(list(range(len(texts))), texts)
+    return index
+
+
+@pytest.mark.parametrize("query", ["w0 w1 w250", "w3 w120", "w0 w0 w7 w42 w299", "w1"])
+def test_maxscore_matches_exhaustive_bm25(corpus, query):
+    index = build(corpus)
+    index.flush()
+    expected = brute_force_bm25(corpus, query)
+    hits = index.search(query, 10)
+    top = np.sort(expected)[::-1][:len(hits)]
+    np.testing.assert_allclose([score for _, score in hits], top, rtol=1e-4)
+    for chunk_id, score in hits:
+        assert expected[chunk_id] == pytest.approx(score, rel=1e-4)
+
+
+def test_unmerged_chunks_are_searchable(corpus):
+    index = build(corpus)
+    index.flush()
+    index.add([1000, 1001], ["w0 zebra zebra", "w1 zebra"])
+    assert [chunk_id for chunk_id, _ in index.search("zebra", 5)] == [1000, 1001]
+    assert 1000 in {chunk_id for chunk_id, _ in index.search("w0 zebra", 3)}
+
+
+def test_removed_chunks_are_not_returned_and_stay_gone_after_reload(corpus, tmp_path):
+    index = build(corpus)
+    top = [chunk_id for chunk_id, _ in index.search("w9 w31", 5)]
+    assert index.remove(np.array(top[:2])) == 2
+    assert len(index) == len(corpus) - 2
+    assert not set(top[:2]) & {chunk_id for chunk_id, _ in index.search("w9 w31", 20)}
+
+    index.save(str(tmp_path))
+    loaded = KeywordIndex.load(str(tmp_path))
+    assert len(loaded) == len(corpus) - 2
+    assert loaded.search("w9 w31", 5) == index.search("w9 w31", 5)
+    assert not set(top[:2]) & {chunk_id for chunk_id, _ in loaded.search("w9 w31", 20)}
+
+
+def test_stopwords_and_unknown_terms_match_nothing(corpus):
+    index = build(corpus)
+    assert index.search("the of and", 5) == []
+    assert index.search("nonexistent", 5) == []
+
+
+def test_rrf_rewards_agreement_between_lists():
+    keyword = [("a", 9.0), ("b", 5.0), ("c", 1.0)]
+    vector = [("b", 0.9), ("d", 0.8), ("c", 0.1)]
+    fused = weighted_rrf([keyword, vector], k=60)
+    assert [doc_id for doc_id, _ in fused] == ["b", "c", "a", "d"]
+    assert fused[0][1] == pytest.approx(1 / 61 + 1 / 60)
+
+
+def test_rrf_weights_favour_a_list():
+    keyword = [("a", 1.0), ("b", 0.5)]
+    vector = [("b", 1.0), ("a", 0.5)]
+    assert weighted_rrf([keyword, vector], weights=[2.0, 1.0])[0][0] == "a"
+    assert weighted_rrf([keyword, vector], weights=[1.0, 2.0])[0][0] == "b"
@@ -0,0 +1,107 @@
+import asyncio
+import re
+
+import pytest
+
+from src.agent.orchestrator import Orchestrator, StageLatency, _Segmenter, latency_report, plan_research
+from src.config import Config
+
+FINDINGS = 30
+
+
+def specialists(fake_llm):
+    """Researcher: FINDINGS sentences; analyst: counts the findings it got; writer: counts the analyses."""
+    def reply(params):
+        prompt = params["messages"][1]["content"]
+        if prompt.startswith("Analyze these findings"):
+            return fake_llm.text(f"Analysis of {prompt.count('Finding ')} findings.")
+        if prompt.startswith("Write a report"):
+            return fake_llm.text(f"Report on {prompt.count('Analysis of ')} analyses.")
+        return fake_llm.text(" ".join(f"Finding {i} about cloud pricing." for i in range(FINDINGS)))
+
+    fake_llm.reply = reply
+    fake_llm.gap = 0.002
+
+
+def analysed(result):
+    return sum(int(n) for n in re.findall(r"Analysis of (\d+) findings", result["stages"]["analysis"]))
+
+
+def test_segmenter_cuts_at_sentence_ends():
+    segmenter = _Segmenter(min_chars=20)
+    assert segmenter.feed("One short. ") is None
+    assert segmenter.feed("Another sentence here. And more") == "One short. Another sentence here."
+    assert segmenter.flush() == "And more"
+    assert segmenter.flush() == ""
+
+
+def test_latency_report_measures_overlap():
+    latency = {"research": StageLatency(busy_s=1.0), "analysis": StageLatency(busy_s=0.8)}
+    assert latency_report(latency, total_s=1.2)["overlap_s"] == pytest.approx(0.6)
+    assert latency_report(latency, total_s=2.0)["overlap_s"] == 0.0
+
+
+def test_sequential_stages_run_one_after_another(fake_llm):
+    specialists(fake_llm)
+    result = asyncio.run(Orchestrator().run("Summarize cloud pricing", pipelined=False))
+    latency = result["latency"]
+    assert result["answer"] == "Report on 1 analyses."
+    assert analysed(result) == FINDINGS
+    assert latency["analysis"]["start_s"] >= latency["research"]["end_s"]
+    assert latency["writing"]["start_s"] >= latency["analysis"]["end_s"]
+
+
+def test_pipelined_stages_overlap_and_see_all_findings(fake_llm, monkeypatch):
+    monkeypatch.setattr(Config, "PIPELINE_CHUNK_CHARS", 100)
+    specialists(fake_llm)
+    result = asyncio.run(Orchestrator().run("Summarize cloud pricing", pipelined=True))
+    latency = result["latency"]
+
+    # Every finding was analyzed exactly once, in several batches
+    assert analysed(result) == FINDINGS
+    assert latency["analysis"]["runs"] > 1
+    assert latency["analysis"]["start_s"] < latency["research"]["end_s"]
+    assert latency["overlap_s"] > 0
+    # The answer is written from the complete analysis
+    final_prompt = fake_llm.calls[-1]["messages"][1]["content"]
+    assert final_prompt.count("Analysis of ") == latency["analysis"]["runs"]
+    assert result["answer"].startswith("Report on")
+
+
+@pytest.mark.parametrize("query, topics", [
+    ("Compare AWS, Azure and GCP pricing", ["AWS", "Azure", "GCP"]),
+    ("Compare Johnson & Johnson and Pfizer", ["Johnson & Johnson", "Pfizer"]),
+    ("python vs rust for web backends", ["python", "rust"]),
+    ("Is Coca-Cola better than Pepsi?", ["Coca-Cola", "Pepsi"]),
+    ("What are the differences between the iPhone 15 and the Pixel 8?", ["iPhone 15", "Pixel 8"]),
+    ("macOS vs Linux for developers", ["macOS", "Linux"]),
+    ("Tell me about Bonnie and Clyde", []),
+    ("Research Tom and Jerry", []),
+    ("Which is more expensive than rent?", []),
+    ("Summarize cloud pricing", []),
+])
+def test_plan_research(query, topics):
+    assert plan_research(query) == topics
+
+
+def test_plan_research_limits(monkeypatch):
+    assert plan_research("Compare A1, B2, C3, D4 and E5", max_branches=4) == []
+    monkeypatch.setattr(Config, "WORKFLOW_FAN_OUT", False)
+    assert plan_research("Compare AWS and Azure") == []
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_comparisons_fan_out_into_concurrent_research(fake_llm, pipelined):
+    specialists(fake_llm)
+    fake_llm.delay = 0.2
+    result = asyncio.run(Orchestrator().run("Compare AWS, Azure and GCP pricing", pipelined=pipelined))
+    research_prompts = [call["messages"][1]["content"] for call in fake_llm.calls
+                        if call["messages"][1]["content"].startswith("Research ")]
+    assert sorted(research_prompts) == [
+        f"Research {topic} for this question: Compare AWS, Azure and GCP pricing" for topic in ("AWS", "Azure", "GCP")
+    ]
+    latency = result["latency"]["research"]
+    assert latency["runs"] == 3
+    # Side by side: the three branches together took well under their summed run time
+    assert latency["end_s"] - latency["start_s"] < latency["busy_s"] / 2
+    assert analysed(result) == 3 * FINDINGS
@@ -0,0 +1,136 @@
+import fitz
+import pytest
+
+from src.RAG import RAGIndex
+from src.retrieval.embedding_backends import HashingEmbeddingBackend
+from src.retrieval.embeddings import BatchEmbedder
+from src.retrieval.vector_index import IndexConfig
+
+
+def make_pdf(path, pages):
+    doc = fitz.open()
+    for text in pages:
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 800), text, fontsize=9)
+    doc.save(str(path))
+    return str(path)
+
+
+def page(word, sentences=30):
+    return " ".join(f"{word}{i} alpha beta gamma." for i in range(sentences))
+
+
+def embedder():
+    return BatchEmbedder(backend=HashingEmbeddingBackend(dimensions=64))
+
+
+def new_index(**kwargs):
+    return RAGIndex(embedder=embedder(), index_config=IndexConfig(), **kwargs)
+
+
+def sources(hits):
+    return {hit.metadata["source"] for hit in hits}
+
+
+@pytest.fixture
+def pdfs(tmp_path):
+    return {
+        "a": make_pdf(tmp_path / "a.pdf", [page("apple"), page("banana")]),
+        "b": make_pdf(tmp_path / "b.pdf", [page("cherry")]),
+    }
+
+
+def test_build_save_load_round_trip(pdfs, tmp_path):
+    index = new_index().build(list(pdfs.values()))
+    queries = ["apple7 alpha", "cherry3 gamma"]
+    before = index.search_many(queries, k=3)
+    assert [hits[0].metadata["source"] for hits in before] == ["a.pdf", "b.pdf"]
+
+    index.save(str(tmp_path / "index"))
+    loaded = RAGIndex.load(str(tmp_path / "index"), embedder=embedder())
+    after = loaded.search_many(queries, k=3)
+    assert [[hit.text for hit in hits] for hits in after] == [[hit.text for hit in hits] for hits in before]
+    assert len(loaded.store) == len(index.store)
+
+
+def test_upserting_an_unchanged_document_embeds_nothing(pdfs):
+    index = new_index().build(list(pdfs.values()))
+    update = index.upsert_document(pdfs["a"])
+    assert update.chunks > 0
+    assert update.reused == update.chunks
+    assert (update.embedded, update.removed) == (0, 0)
+
+
+def test_upsert_replaces_changed_chunks(pdfs, tmp_path):
+    index = new_index().build(list(pdfs.values()))
+    ntotal = index.index.ntotal
+    make_pdf(pdfs["a"], [page("apricot"), page("banana")])
+
+    update = index.upsert_document(pdfs["a"])
+    assert update.chunks == update.reused + update.embedded + update.duplicates
+    assert update.embedded == update.removed > 0
+    assert index.index.ntotal == ntotal
+
+    index.save(str(tmp_path / "index"))
+    loaded = RAGIndex.load(str(tmp_path / "index"), embedder=embedder())
+    texts = " ".join(hit.text for hit in loaded.search("apple7 apricot7", k=10, mode="hybrid"))
+    assert "apricot7" in texts and "apple7" not in texts
+
+
+def test_upsert_adds_a_new_document(pdfs, tmp_path):
+    index = new_index().build([pdfs["a"]])
+    update = index.upsert_document(pdfs["b"])
+    assert update.embedded == update.chunks > 0
+    assert sources(index.search("cherry3 gamma", k=1)) == {"b.pdf"}
+
+
+def test_failed_upsert_leaves_the_index_unchanged(pdfs):
+    index = new_index().build(list(pdfs.values()))
+    before = [hit.text for hit in index.search("apple7 alpha", k=3)]
+    with open(pdfs["a"], "wb") as f:
+        f.write(b"not a pdf")
+
+    with pytest.raises(fitz.FileDataError):
+        index.upsert_document(pdfs["a"])
+    assert [hit.text for hit in index.search("apple7 alpha", k=3)] == before
+    assert len(index.store.document_chunks("a.pdf")) > 0
+
+
+def test_saving_over_a_loaded_directory_keeps_the_loaded_index_valid(pdfs, tmp_path):
+    directory = str(tmp_path / "index")
+    index = new_index().build(list(pdfs.values()))
+    index.save(directory)
+    loaded = RAGIndex.load(directory, embedder=embedder())
+    before = [[hit.text for hit in hits] for hits in loaded.search_many(["apple7 alpha", "cherry3 gamma"], k=3)]
+
+    # Shrinks every file the loaded index has memory-mapped
+    index.delete_document("a.pdf")
+    index.save(directory)
+    after = [[hit.text for hit in hits] for hits in loaded.search_many(["apple7 alpha", "cherry3 gamma"], k=3)]
+    assert after == before
+
+
+def test_delete_round_trip(pdfs, tmp_path):
+    index = new_index().build(list(pdfs.values()))
+    chunks_of_b = len(index.store.document_chunks("b.pdf"))
+    ntotal = index.index.ntotal
+
+    assert index.delete_document("b.pdf") == chunks_of_b
+    assert index.index.ntotal == ntotal - chunks_of_b
+    index.save(str(tmp_path / "index"))
+    loaded = RAGIndex.load(str(tmp_path / "index"), embedder=embedder())
+    assert sources(loaded.search("cherry3 gamma", k=5)) == {"a.pdf"}
+    assert len(loaded.store.document_chunks("b.pdf")) == 0
+
+
+def test_duplicates_are_promoted_when_their_canonical_chunk_goes(pdfs, tmp_path):
+    index = new_index(dedup_threshold=0.9).build([pdfs["a"]])
+    copy = make_pdf(tmp_path / "copy.pdf", [page("apple")])
+    update = index.upsert_document(copy)
+    assert update.duplicates == update.chunks > 0 and update.embedded == 0
+
+    index.delete_document("a.pdf")
+    # The copy's chunks are searchable again, under their own ids
+    hits = index.search("apple7 alpha", k=3, mode="vector")
+    assert sources(hits) == {"copy.pdf"}
+    assert all("duplicate_of" not in hit.metadata for hit in hits)
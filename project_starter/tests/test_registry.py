@@ -0,0 +1,69 @@
+import pytest
+from pydantic import ValidationError
+
+from src.tools.registry import ToolRegistry, schema_hash, toolset_hash
+
+
+@pytest.fixture
+def tools():
+    tools = ToolRegistry()
+
+    @tools.register("search", "Search the web", category="web")
+    def search(query: str, max_results: int = 5) -> str:
+        return f"{max_results} results for {query}"
+
+    return tools
+
+
+def test_schema_is_built_once_and_hashed(tools):
+    tool = tools.get_tool("search")
+    schema = tool.to_openai_schema()
+    assert tool.to_openai_schema() is schema
+    assert tool.schema_hash == schema_hash(schema)
+    parameters = schema["function"]["parameters"]
+    assert set(parameters["properties"]) == {"query", "max_results"}
+    assert parameters["required"] == ["query"]
+    assert toolset_hash([tool]) == schema_hash([tool.schema_hash])
+
+
+def test_registering_a_name_again_replaces_the_tool_and_its_schema(tools):
+    old = tools.get_tool("search")
+    old_toolset = toolset_hash(tools.get_tools_by_category("web"))
+
+    @tools.register("search", "Search the web, newest first", category="news")
+    def search(query: str, since: str = None) -> str:
+        return query
+
+    new = tools.get_tool("search")
+    assert new is not old and new.schema_hash != old.schema_hash
+    assert "since" in new.to_openai_schema()["function"]["parameters"]["properties"]
+    assert tools.get_all_tools() == [new]
+    assert tools.get_tools_by_category("web") == [] and tools.get_tools_by_category("news") == [new]
+    assert toolset_hash(tools.get_tools_by_category("news")) != old_toolset
+
+
+def test_validate_json_parses_arguments_into_keyword_arguments(tools):
+    tool = tools.get_tool("search")
+    assert tool.validate_json('{"query": "faiss", "max_results": 3}') == {"query": "faiss", "max_results": 3}
+    # Optional parameters left out stay out, so the function's own default applies
+    assert tool.validate_json('{"query": "faiss"}') == {"query": "faiss"}
+    assert tools.execute_tool("search", query="faiss") == "5 results for faiss"
+
+
+@pytest.mark.parametrize("arguments", [
+    "",
+    '{"max_results": 3}',
+    '{"query": "faiss", "max_results": "many"}',
+    '{"query": ["faiss"]}',
+    '{"query": "faiss",',
+])
+def test_validate_json_rejects_invalid_arguments(tools, arguments):
+    with pytest.raises(ValidationError):
+        tools.get_tool("search").validate_json(arguments)
+
+
+def test_unknown_tools_and_bad_keyword_arguments_raise(tools):
+    with pytest.raises(ValueError, match="not found"):
+        tools.execute_tool("missing", query="faiss")
+    with pytest.raises(ValidationError):
+        tools.execute_tool("search", max_results=3)
@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.observable_agent import ObservableAgent
+from src.agent.response_cache import ResponseCache
+from src.retrieval.embedding_backends import HashingEmbeddingBackend
+
+from conftest import FakeLLM
+
+
+def request(prompt, model="gpt-4o-mini", **params):
+    return {"model": model, "messages": [{"role": "system", "content": "Be brief."},
+                                         {"role": "user", "content": prompt}], **params}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite"))
+
+
+@pytest.fixture
+def semantic_cache(tmp_path):
+    return ResponseCache(str(tmp_path / "responses.sqlite"),
+                         embed_fn=HashingEmbeddingBackend(dimensions=256).embed_batch)
+
+
+def test_exact_hit_replays_the_response_and_its_cost(cache):
+    cache.store(cache.lookup(request("capital of France?")), FakeLLM.text("Paris"), 0.002)
+    lookup = cache.lookup(request("capital of France?", timeout=5))
+    assert lookup.hit and lookup.tier == "exact"
+    assert lookup.response.choices[0].message.content == "Paris"
+    assert lookup.cost_usd == 0.002
+    assert not cache.lookup(request("capital of France?", model="gpt-4o")).hit
+    assert not cache.lookup(request("capital of France?", temperature=0.7)).hit
+
+
+def test_semantic_hit_for_a_reworded_prompt(semantic_cache):
+    semantic_cache.store(semantic_cache.lookup(request("What is the capital of France?")), FakeLLM.text("Paris"), 0)
+    lookup = semantic_cache.lookup(request("what is the capital of france"))
+    assert lookup.hit and lookup.tier == "semantic"
+    assert not semantic_cache.lookup(request("Explain how transformers use attention")).hit
+    assert (semantic_cache.hits, semantic_cache.semantic_hits, semantic_cache.misses) == (1, 1, 2)
+
+
+def test_tool_calls_are_only_replayed_for_the_exact_request(semantic_cache):
+    response = FakeLLM.tool_calls(("search_web", {"query": "capital of France"}))
+    semantic_cache.store(semantic_cache.lookup(request("What is the capital of France?")), response, 0)
+    assert semantic_cache.lookup(request("What is the capital of France?")).tier == "exact"
+    assert not semantic_cache.lookup(request("what is the capital of france")).hit
+
+
+def test_semantic_tier_skips_conversations_with_tool_turns(semantic_cache):
+    params = request("What is the capital of France?")
+    semantic_cache.store(semantic_cache.lookup(params), FakeLLM.text("Paris"), 0)
+    params["messages"].append({"role": "tool", "tool_call_id": "call_0", "content": "Paris"})
+    assert semantic_cache.make_keys(params)[2] is None
+    assert not semantic_cache.lookup(params).hit
+
+
+def test_entries_expire_and_least_recently_used_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), ttl_s=0.05)
+    cache.store(cache.lookup(request("a")), FakeLLM.text("a"), 0)
+    time.sleep(0.1)
+    assert not cache.lookup(request("a")).hit
+
+    cache = ResponseCache(str(tmp_path / "lru.sqlite"), max_entries=2)
+    for prompt in ("old", "used"):
+        cache.store(cache.lookup(request(prompt)), FakeLLM.text(prompt), 0)
+    cache.lookup(request("old"))
+    cache.store(cache.lookup(request("new")), FakeLLM.text("new"), 0)
+    assert len(cache) == 2
+    assert [cache.lookup(request(p)).hit for p in ("old", "used", "new")] == [True, False, True]
+
+
+def test_agent_serves_a_repeated_query_from_the_cache(fake_llm, cache):
+    fake_llm.reply = lambda params: FakeLLM.text("Paris is the capital.")
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, tools=[], response_cache=cache)
+    first = asyncio.run(agent.run("What is the capital of France?"))
+    second = asyncio.run(agent.run("What is the capital of France?"))
+    assert len(fake_llm.calls) == 1
+    assert second["answer"] == first["answer"] == "Paris is the capital."
+    assert first["total_cost"] > 0 and second["total_cost"] == 0
+
+
+def test_streamed_runs_replay_cached_tokens(fake_llm, cache):
+    fake_llm.reply = lambda params: FakeLLM.text("Paris is the capital.")
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, tools=[], response_cache=cache)
+
+    async def tokens():
+        return "".join([event.content async for event in agent.stream("capital?") if event.type == "token"])
+
+    assert asyncio.run(tokens()) == "Paris is the capital."
+    assert asyncio.run(tokens()) == "Paris is the capital."
+    assert len(fake_llm.calls) == 1
+
+
+def test_expired_semantic_match_falls_back_to_the_runner_up(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), similarity_threshold=0.9,
+                          embed_fn=HashingEmbeddingBackend(dimensions=256).embed_batch)
+    best = cache.lookup(request("What is the capital of France?"))
+    cache.store(best, FakeLLM.text("Paris (expired)"), 0)
+    cache.store(cache.lookup(request("What is the capital of France, please?")), FakeLLM.text("Paris"), 0)
+    first = cache.lookup(request("what is the capital of france"))
+    assert first.response.choices[0].message.content == "Paris (expired)"
+    # Age the best match past the TTL without a store to evict it
+    cache._conn.execute("UPDATE responses SET created = 0 WHERE key = ?", (best.key,))
+
+    lookup = cache.lookup(request("what is the capital of france"))
+    assert lookup.tier == "semantic"
+    assert lookup.response.choices[0].message.content == "Paris"
+    assert best.key not in cache._semantic[best.scope][0]
+
+
+def test_evicted_rows_leave_the_semantic_index(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite"), max_entries=2,
+                          embed_fn=HashingEmbeddingBackend(dimensions=256).embed_batch)
+    lookups = []
+    for prompt in ("first prompt", "second prompt", "third prompt", "fourth prompt"):
+        lookups.append(cache.lookup(request(prompt)))
+        cache.store(lookups[-1], FakeLLM.text(prompt), 0)
+    assert cache._semantic[lookups[0].scope][0] == [lookups[2].key, lookups[3].key]
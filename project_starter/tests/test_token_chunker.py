@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from src.agent.history import load_encoding
+from src.RAG import TokenChunker
+from src.retrieval.tokenizer import NOT_A_BOUNDARY, WORD, TokenOffsets
+
+ENGLISH = "The ministry published new guidance on data protection for cloud providers. "
+ARABIC = "تنص اللائحة على حماية البيانات الشخصية في الخدمات السحابية الحكومية. "
+CODE = "def load(path):\n    with open(path) as f:\n        return json.load(f)\n"
+TEXT = "\n\n".join([ENGLISH * 6, ARABIC * 5 + "🙂 emoji-ending line 🙂", CODE * 4, ENGLISH * 8])
+
+
+@pytest.fixture(scope="module")
+def encoding():
+    encoding = load_encoding()
+    if encoding is None:
+        pytest.skip("the BPE encoding is not available offline")
+    return encoding
+
+
+def spans(chunker, text):
+    offsets = TokenOffsets(text, chunker.encoding_name)
+    return offsets, list(chunker._spans(offsets))
+
+
+def test_offsets_map_tokens_back_to_the_text(encoding):
+    offsets = TokenOffsets(TEXT)
+    assert len(offsets) == len(encoding.encode_ordinary(TEXT))
+    assert offsets.char_offsets[0] == 0 and offsets.char_offsets[-1] == len(TEXT)
+    assert "".join(offsets.span_text(i, i + 1) for i in range(len(offsets))) == TEXT
+    # Wherever a token starts on a character, the text before it decodes from the tokens before it
+    for i in np.flatnonzero(offsets.boundaries != NOT_A_BOUNDARY):
+        assert encoding.decode(offsets.tokens[:i].tolist()) == TEXT[:offsets.char_offsets[i]]
+
+
+def test_chunks_stay_within_the_token_budget(encoding):
+    chunker = TokenChunker(chunk_size=40, chunk_overlap=8)
+    chunks = chunker.chunk_document(TEXT)
+    assert len(chunks) > 5
+    for chunk in chunks:
+        n_tokens = len(encoding.encode_ordinary(chunk["text"]))
+        assert n_tokens <= 40
+        assert chunk["metadata"]["token_count"] >= n_tokens
+
+
+def test_consecutive_chunks_overlap_from_a_word_boundary(encoding):
+    chunker = TokenChunker(chunk_size=40, chunk_overlap=8)
+    offsets, chunk_spans = spans(chunker, ENGLISH * 10)
+    chunks = chunker.split_text(ENGLISH * 10)
+    assert chunks == [offsets.span_text(start, end).strip() for start, end, _ in chunk_spans]
+    for i, ((_, end, _), (start, _, _)) in enumerate(zip(chunk_spans, chunk_spans[1:])):
+        assert end - 8 <= start < end
+        assert offsets.boundaries[start] >= WORD
+        shared = offsets.span_text(start, end).strip()
+        assert chunks[i].endswith(shared) and chunks[i + 1].startswith(shared)
+
+
+def test_chunks_cover_the_text_in_order(encoding):
+    chunker = TokenChunker(chunk_size=40, chunk_overlap=0)
+    chunks = chunker.split_text(TEXT)
+    assert "".join("".join(chunk.split()) for chunk in chunks) == "".join(TEXT.split())
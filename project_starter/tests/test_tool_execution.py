@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.observable_agent import ObservableAgent
+from src.tools.registry import registry
+
+
+@registry.register("wait_tool_test", "Wait, then report", category="tool_test")
+async def wait_tool_test(n: int, seconds: float) -> str:
+    await asyncio.sleep(seconds)
+    return f"result {n}"
+
+
+@registry.register("block_tool_test", "Block a thread, then report", category="tool_test")
+def block_tool_test(n: int, seconds: float) -> str:
+    time.sleep(seconds)
+    return f"result {n}"
+
+
+def one_round(fake_llm, response):
+    """The first call replies with the tool calls in `response`; the next one answers."""
+    def reply(params):
+        if not any(isinstance(m, dict) and m.get("role") == "tool" for m in params["messages"]):
+            return response
+        return fake_llm.text("Done.")
+
+    fake_llm.reply = reply
+
+
+def tool_results(fake_llm) -> list[str]:
+    """Tool results the model saw in its last call, in history order."""
+    return [m["content"] for m in fake_llm.calls[-1]["messages"] if isinstance(m, dict) and m.get("role") == "tool"]
+
+
+def run(**kwargs):
+    agent = ObservableAgent(model="gpt-4o-mini", verbose=False, tools=registry.get_tools_by_category("tool_test"),
+                            **kwargs)
+    return asyncio.run(agent.run("Run the tools."))
+
+
+@pytest.mark.parametrize("tool", ["wait_tool_test", "block_tool_test"])
+def test_calls_run_concurrently_and_keep_call_order(fake_llm, tool):
+    # The first call finishes last: results still follow the order of the calls
+    calls = [(tool, {"n": n, "seconds": seconds}) for n, seconds in enumerate((0.3, 0.1, 0.2))]
+    one_round(fake_llm, fake_llm.tool_calls(*calls))
+    start = time.monotonic()
+    result = run()
+    assert time.monotonic() - start < 0.5  # the slowest call, not the 0.6s sum
+    assert result["answer"] == "Done."
+    assert tool_results(fake_llm) == ["result 0", "result 1", "result 2"]
+
+
+def test_timed_out_call_becomes_an_error_result(fake_llm):
+    one_round(fake_llm, fake_llm.tool_calls(
+        ("wait_tool_test", {"n": 0, "seconds": 5}), ("wait_tool_test", {"n": 1, "seconds": 0})
+    ))
+    start = time.monotonic()
+    result = run(tool_timeout=0.1)
+    assert time.monotonic() - start < 1
+    assert result["answer"] == "Done."
+    assert tool_results(fake_llm) == ["Error: 'wait_tool_test' timed out after 0.1s", "result 1"]
+
+
+def test_bad_arguments_and_unknown_tools_become_error_results(fake_llm):
+    response = fake_llm.tool_calls(
+        ("wait_tool_test", {"n": 0, "seconds": 0}),
+        ("wait_tool_test", {}),
+        ("wait_tool_test", {"n": "zero", "seconds": 0}),
+        ("missing_tool_test", {}),
+    )
+    response.choices[0].message.tool_calls[1].function.arguments = '{"n": 1, "seconds":'
+    one_round(fake_llm, response)
+    result = run()
+    assert (result["stop_reason"], result["answer"]) == ("answer", "Done.")
+    results = tool_results(fake_llm)
+    assert results[0] == "result 0"
+    assert all(r.startswith("Error: ") for r in results[1:])
+    assert "Invalid JSON" in results[1] and "n" in results[2]
+    assert results[3] == "Error: Tool 'missing_tool_test' not found"
@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+
+from src.retrieval.embedding_backends import HashingEmbeddingBackend
+from src.retrieval.vector_index import IndexConfig, VectorIndex, normalize
+
+DIMENSION = 32
+
+
+@pytest.fixture(scope="module")
+def vectors():
+    return np.random.default_rng(0).standard_normal((1000, DIMENSION)).astype("float32")
+
+
+def exact_neighbours(vectors, queries, k):
+    scores = normalize(queries) @ normalize(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall(found, expected):
+    return np.mean([len(set(f) & set(e)) / len(e) for f, e in zip(found, expected)])
+
+
+def build(config, vectors):
+    index = VectorIndex(config)
+    index.add(vectors, np.arange(len(vectors)) + 100)
+    return index
+
+
+CONFIGS = {
+    "flat": IndexConfig(),
+    "hnsw": IndexConfig(kind="hnsw", hnsw_m=16),
+    "ivf_flat": IndexConfig(kind="ivf_flat", nlist=8, nprobe=8),
+    "ivf_pq": IndexConfig(kind="ivf_pq", nlist=8, nprobe=8, pq_m=8, pq_nbits=4, rescore_factor=16),
+}
+
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_index_kinds_find_the_nearest_neighbours(name, vectors):
+    index = build(CONFIGS[name], vectors)
+    queries = vectors[:20]
+    _, ids = index.search(queries, 10)
+    assert index.ntotal == len(vectors)
+    assert recall(ids - 100, exact_neighbours(vectors, queries, 10)) >= 0.9
+    # A stored vector is its own nearest neighbour
+    assert (ids[:, 0] == np.arange(20) + 100).all()
+
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_save_load_round_trip(name, vectors, tmp_path):
+    index = build(CONFIGS[name], vectors)
+    queries = vectors[:5]
+    before = index.search(queries, 5)
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert loaded.config == index.config
+    after = loaded.search(queries, 5)
+    np.testing.assert_array_equal(after[1], before[1])
+    np.testing.assert_allclose(after[0], before[0], atol=1e-5)
+
+
+@pytest.mark.parametrize("name", CONFIGS)
+def test_removed_ids_are_not_returned(name, vectors, tmp_path):
+    index = build(CONFIGS[name], vectors)
+    removed = np.arange(100, 110)
+    assert index.remove(np.concatenate([removed, [99_999]])) == len(removed)
+    assert index.ntotal == len(vectors) - len(removed)
+    _, ids = index.search(vectors[:10], 5)
+    assert not np.isin(ids, removed).any()
+
+    index.save(str(tmp_path))
+    _, ids = VectorIndex.load(str(tmp_path)).search(vectors[:10], 5)
+    assert not np.isin(ids, removed).any()
+    assert (ids != -1).all()
+
+
+def test_training_waits_for_vectors_or_a_flush(vectors):
+    index = VectorIndex(IndexConfig(kind="ivf_flat", nlist=8, train_sample=500))
+    index.add(vectors[:300], np.arange(300))
+    assert index.index is None and index.ntotal == 300
+    index.add(vectors[300:600], np.arange(300, 600))
+    assert index.index is not None and index.index.is_trained
+
+
+def test_invalid_configs_are_rejected():
+    with pytest.raises(ValueError):
+        IndexConfig(kind="annoy")
+    with pytest.raises(ValueError):
+        IndexConfig(kind="ivf_flat", quantization="binary")
+
+
+QUANTIZED = {
+    "int8": IndexConfig(quantization="int8", rescore_factor=8),
+    "binary": IndexConfig(quantization="binary", rescore_factor=32),
+    "hnsw_int8": IndexConfig(kind="hnsw", quantization="int8", rescore_factor=8),
+}
+
+
+@pytest.mark.parametrize("name", QUANTIZED)
+def test_quantized_indexes_rescore_exactly(name, vectors):
+    index = build(QUANTIZED[name], vectors)
+    queries = vectors[:20]
+    scores, ids = index.search(queries, 10)
+    assert recall(ids - 100, exact_neighbours(vectors, queries, 10)) >= 0.9
+    # Final scores come from the float16 originals, not the compressed codes
+    exact = np.einsum("qkd,qd->qk", normalize(vectors)[ids - 100], normalize(queries))
+    np.testing.assert_allclose(scores, exact, atol=1e-2)
+    assert index.memory_bytes() < len(vectors) * DIMENSION * 4
+
+
+@pytest.mark.parametrize("name", QUANTIZED)
+def test_quantized_round_trip_memory_maps_originals(name, vectors, tmp_path):
+    index = build(QUANTIZED[name], vectors)
+    index.remove(np.arange(100, 150))
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert isinstance(loaded.originals, np.memmap)
+    # Originals of removed vectors are dropped on save
+    assert len(loaded.original_ids) == len(vectors) - 50
+    assert not np.isin(loaded.original_ids, np.arange(100, 150)).any()
+    _, ids = loaded.search(vectors[50:60], 1)
+    np.testing.assert_array_equal(ids[:, 0], np.arange(150, 160))
+
+
+@pytest.mark.parametrize("name", QUANTIZED)
+def test_emptied_quantized_index_saves_and_loads(name, vectors, tmp_path):
+    index = build(QUANTIZED[name], vectors)
+    index.remove(np.arange(100, 1100))
+    index.save(str(tmp_path))
+
+    loaded = VectorIndex.load(str(tmp_path))
+    assert loaded.ntotal == 0 and len(loaded.original_ids) == 0
+    _, ids = loaded.search(vectors[:2], 3)
+    assert (ids == -1).all()
+    # Vectors added after the reload are searchable and saved again
+    loaded.add(vectors[:100], np.arange(2000, 2100))
+    loaded.save(str(tmp_path))
+    _, ids = VectorIndex.load(str(tmp_path)).search(vectors[:5], 1)
+    np.testing.assert_array_equal(ids[:, 0], np.arange(2000, 2005))
+
+
+@pytest.fixture(scope="module")
+def hashed():
+    """Hashing-backend embeddings of random word documents, queried with a third of their words plus noise."""
+    rng = np.random.default_rng(0)
+    words = [f"w{i}" for i in range(300)]
+    texts = [" ".join(rng.choice(words, 12)) for _ in range(1000)]
+    queries = [" ".join(text.split()[:4] + list(rng.choice(words, 8))) for text in texts[:100]]
+    backend = HashingEmbeddingBackend(dimensions=256)
+    return backend.embed_batch(texts), backend.embed_batch(queries)
+
+
+def test_full_rerank_restores_what_truncation_loses(hashed):
+    vectors, queries = hashed
+    expected = exact_neighbours(vectors, queries, 5)
+    truncated = build(IndexConfig(truncate_dim=64), vectors)
+    reranked = build(IndexConfig(truncate_dim=64, full_rerank=True, rescore_factor=8), vectors)
+    assert truncated.dimension == reranked.dimension == 64
+    _, truncated_ids = truncated.search(queries, 5)
+    _, reranked_ids = reranked.search(queries, 5)
+    assert recall(reranked_ids - 100, expected) >= recall(truncated_ids - 100, expected) + 0.2
+
+
+def test_truncated_scores_come_from_the_ranking_dimension(hashed, tmp_path):
+    vectors, queries = hashed
+    full = normalize(queries) @ normalize(vectors).T
+    head = normalize(queries[:, :64]) @ normalize(vectors[:, :64]).T
+    for config, exact in ((IndexConfig(truncate_dim=64), head),
+                          (IndexConfig(truncate_dim=64, full_rerank=True, rescore_factor=8), full)):
+        index = build(config, vectors)
+        scores, ids = index.search(queries, 5)
+        assert (np.diff(scores, axis=1) <= 1e-6).all()
+        np.testing.assert_allclose(scores, np.take_along_axis(exact, ids - 100, axis=1), atol=2e-3)
+        index.save(str(tmp_path / str(config.full_rerank)))
+        _, loaded_ids = VectorIndex.load(str(tmp_path / str(config.full_rerank))).search(queries, 5)
+        np.testing.assert_array_equal(loaded_ids, ids)
+
+
+def test_truncate_dim_cannot_exceed_the_embedding_dimension(vectors):
+    with pytest.raises(ValueError, match="truncate_dim"):
+        build(IndexConfig(truncate_dim=DIMENSION * 2), vectors)
@@ -0,0 +1,93 @@
+import asyncio
+import time
+
+import pytest
+
+from src.agent.workflow import Node, Workflow, WorkflowError
+
+
+class SleepingAgent:
+    """Answers every prompt after `delay` seconds, tracking how many runs overlap."""
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.finished = []
+
+    async def run(self, prompt):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        self.finished.append(prompt)
+        return {"answer": prompt}
+
+
+def joined(inputs):
+    return "+".join(inputs[name]["answer"] for name in sorted(inputs))
+
+
+def test_invalid_graphs_are_rejected():
+    agent = SleepingAgent()
+    with pytest.raises(ValueError, match="Duplicate"):
+        Workflow([Node("a", agent, joined), Node("a", agent, joined)])
+    with pytest.raises(ValueError, match="unknown node 'b'"):
+        Workflow([Node("a", agent, joined, after=("b",))])
+    with pytest.raises(ValueError, match="cycle through a, b"):
+        Workflow([Node("a", agent, joined, after=("b",)), Node("b", agent, joined, after=("a",)),
+                  Node("c", agent, joined)])
+
+
+def test_nodes_run_as_soon_as_their_inputs_are_ready():
+    agent = SleepingAgent()
+    runs = asyncio.run(Workflow([
+        Node("join", agent, joined, after=("left", "right")),
+        Node("left", agent, lambda inputs: "L"),
+        Node("right", agent, lambda inputs: "R"),
+    ]).run())
+    assert runs["join"].result == {"answer": "L+R"}
+    # The two branches ran side by side, the join after both
+    assert agent.peak == 2
+    assert runs["join"].start_s >= max(runs["left"].end_s, runs["right"].end_s)
+    assert runs["join"].end_s < 3 * agent.delay
+
+
+def test_limiter_caps_concurrent_runs_across_workflows():
+    agent = SleepingAgent()
+    limiter = asyncio.Semaphore(2)
+
+    async def main():
+        workflows = [Workflow([Node(f"n{i}", agent, lambda inputs, i=i: str(i)) for i in range(3)], limiter=limiter)
+                     for _ in range(2)]
+        return await asyncio.gather(*(workflow.run() for workflow in workflows))
+
+    start = time.monotonic()
+    asyncio.run(main())
+    assert agent.peak == 2
+    assert time.monotonic() - start >= 3 * agent.delay
+
+
+def test_failed_check_cancels_running_nodes():
+    fast, slow = SleepingAgent(delay=0.01), SleepingAgent(delay=1)
+    workflow = Workflow([
+        Node("bad", fast, lambda inputs: "bad", check=lambda result: "no findings"),
+        Node("slow", slow, lambda inputs: "slow"),
+        Node("after", fast, joined, after=("bad", "slow")),
+    ])
+    start = time.monotonic()
+    with pytest.raises(WorkflowError, match="no findings") as error:
+        asyncio.run(workflow.run())
+    assert error.value.node == "bad"
+    assert slow.finished == [] and fast.finished == ["bad"]
+    assert time.monotonic() - start < 0.5
+
+
+def test_agent_errors_propagate():
+    class FailingAgent:
+        async def run(self, prompt):
+            raise RuntimeError("model unavailable")
+
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        asyncio.run(Workflow([Node("a", FailingAgent(), joined), Node("b", SleepingAgent(), joined)]).run())